@@ -0,0 +1,392 @@
+import json
+import os
+import shutil
+
+import joblib
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from compact_embeddings import CompactEmbeddings, embedding_precision
+from job_recommendation_model import ModelVersion, build_metadata_index
+from posting_table import PostingTable, SkillListColumn, StringColumn, ValueIds, as_posting_table
+
+
+# Memory-Mapped Artifacts
+# A model directory holds the small fitted vectorizers (joblib) next to flat .npy files
+# for everything that grows with the corpus: the CSR arrays of the embeddings, the
+# inverted index and one offsets/bytes pair per metadata column. Loading opens the flat
+# files with mmap_mode='r', so startup does not read them and every worker process on
+# the host shares the same page-cached copy. The embedding values are written in their
+# storage precision (see compact_embeddings), plus one scale per row for int8. The
+# job-to-job similarity graph (see similarity_graph) and the low-rank projection (see
+# low_rank) are stored there too when built. So is the filter index of
+# build_metadata_index, as sorted distinct values plus grouped posting ids per field
+# (ValueIds) and the remote mask, so serving does not decode every location and company
+# at startup.
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+
+def _save_array(dirpath, name, array):
+    np.save(os.path.join(dirpath, f"{name}.npy"), np.ascontiguousarray(array))
+
+def _load_array(dirpath, name):
+    return np.load(os.path.join(dirpath, f"{name}.npy"), mmap_mode='r')
+
+def _index_dtype(array):
+    return np.int32 if len(array) == 0 or array.max() <= np.iinfo(np.int32).max else np.int64
+
+METADATA_FIELDS = ("location", "company")
+
+COPY_CHUNK = 1 << 20  # elements copied / scanned per step when finishing a directory
+
+
+class MmapArtifactWriter:
+    """Writes a model directory block by block, with memory bounded by the block size.
+
+    append() adds consecutive row blocks of the embeddings and their postings to raw
+    files in a temporary directory; close() turns those into the .npy layout read by
+    load_mmap_artifacts, builds the inverted index from the mapped arrays and swaps the
+    directory in. save_mmap_artifacts is the one-block case.
+    """
+
+    def __init__(self, dirpath, columns):
+        self.dirpath = dirpath
+        self.tmp_dir = f"{dirpath}.tmp"
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        os.makedirs(self.tmp_dir)
+
+        self.columns = [name for name in columns if name != 'skills_list']
+        self.rows = 0
+        self.nnz = 0
+        self.n_features = None
+        self.precision = None
+        self._raw = {}
+        self._string_sizes = [0] * len(self.columns)
+        self._skill_vocabulary = []
+        self._known_skills = set()
+        self._skill_count = 0
+        self._version = ModelVersion()
+        self._index_ids = {field: {} for field in METADATA_FIELDS}
+
+        self._write("embeddings_indptr", np.zeros(1, dtype=np.int64))
+        self._write("skills_indptr", np.zeros(1, dtype=np.int64))
+        for i in range(len(self.columns)):
+            self._write(f"column{i}_offsets", np.zeros(1, dtype=np.int64))
+
+    def _write(self, name, array):
+        dtype, count = self._raw.get(name, (array.dtype, 0))
+        with open(os.path.join(self.tmp_dir, f"{name}.bin"), "ab") as f:
+            f.write(np.ascontiguousarray(array, dtype=dtype).tobytes())
+        self._raw[name] = (dtype, count + len(array))
+
+    def append(self, embeddings, df):
+        """Adds the next rows: their embeddings (CSR or CompactEmbeddings) and cleaned postings.
+
+        df is a DataFrame or PostingTable; every block must have the same precision.
+        """
+        block = embeddings if isinstance(embeddings, CompactEmbeddings) else embeddings.tocsr()
+        precision = embedding_precision(block)
+        if self.precision is None:
+            self.precision = precision
+        elif precision != self.precision:
+            raise ValueError(f"Expected {self.precision} embeddings, got {precision}")
+        postings = as_posting_table(df)
+        start = self.rows
+        if block.shape[0] != len(postings):
+            raise ValueError(f"{block.shape[0]} embedding rows for {len(postings)} postings")
+        if self.n_features is None:
+            self.n_features = block.shape[1]
+        elif block.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {block.shape[1]}")
+
+        self._write("embeddings_data", block.data)
+        self._write("embeddings_indices", block.indices.astype(np.int32 if self.n_features <= np.iinfo(np.int32).max else np.int64))
+        self._write("embeddings_indptr", block.indptr[1:].astype(np.int64) + self.nnz)
+        if precision == "int8":
+            self._write("embeddings_row_scale", block.row_scale)
+        self._version.update(block)
+        self.rows += block.shape[0]
+        self.nnz += block.nnz
+
+        # Metadata: strings as offsets + UTF-8 bytes, skill lists as ids into the skill vocabulary
+        for i, name in enumerate(self.columns):
+            column = StringColumn.from_values(postings[name] if name in postings else [None] * len(postings))
+            self._write(f"column{i}_bytes", column.buffer)
+            self._write(f"column{i}_offsets", column.offsets[1:] + self._string_sizes[i])
+            self._string_sizes[i] += len(column.buffer)
+
+        skills_lists = list(postings['skills_list'])
+        new_skills = sorted({s for skills in skills_lists for s in skills} - self._known_skills)
+        self._known_skills.update(new_skills)
+        self._skill_vocabulary.extend(new_skills)
+        skills = SkillListColumn.from_values(skills_lists, self._skill_vocabulary)
+        self._write("skills_ids", skills.ids)
+        self._write("skills_indptr", skills.indptr[1:] + self._skill_count)
+        self._skill_count += len(skills.ids)
+
+        index = build_metadata_index(postings)
+        for field in METADATA_FIELDS:
+            for value, ids in index[field].items():
+                self._index_ids[field].setdefault(value, []).append(ids + start)
+        self._write("index_remote", index["remote"])
+
+    def _finish_array(self, name, dtype=None):
+        """Converts a raw file into <name>.npy (optionally narrowing its dtype) in bounded steps."""
+        raw_dtype, count = self._raw.pop(name, (dtype or np.float64, 0))
+        raw_path = os.path.join(self.tmp_dir, f"{name}.bin")
+        out = np.lib.format.open_memmap(
+            os.path.join(self.tmp_dir, f"{name}.npy"), mode='w+', dtype=dtype or raw_dtype, shape=(count,)
+        )
+        if count:
+            raw = np.memmap(raw_path, dtype=raw_dtype, mode='r', shape=(count,))
+            for start in range(0, count, COPY_CHUNK):
+                out[start:start + COPY_CHUNK] = raw[start:start + COPY_CHUNK]
+            del raw
+        out.flush()
+        del out
+        if os.path.exists(raw_path):
+            os.remove(raw_path)
+        return _load_array(self.tmp_dir, name)
+
+    def _finish_inverted_index(self, embeddings, row_scale=None):
+        """Transposes the mapped embeddings into the CSC posting lists of build_inverted_index.
+
+        Counts entries per feature, then scatters row blocks into place; rows arrive in
+        order, so every posting list comes out sorted by posting id. Compact values (float16,
+        int8 with row_scale) are restored to float32 weights, as build_inverted_index does.
+        """
+        n_rows, n_features = embeddings.shape
+        indptr, indices, data = embeddings.indptr, embeddings.indices, embeddings.data
+        weight_dtype = data.dtype if data.dtype in (np.float32, np.float64) else np.dtype(np.float32)
+        counts = np.zeros(n_features, dtype=np.int64)
+        for start in range(0, len(indices), COPY_CHUNK):
+            counts += np.bincount(indices[start:start + COPY_CHUNK], minlength=n_features)
+        col_ptr = np.zeros(n_features + 1, dtype=np.int64)
+        np.cumsum(counts, out=col_ptr[1:])
+        col_ptr = col_ptr.astype(_index_dtype(col_ptr))
+
+        out = {
+            "indices": np.lib.format.open_memmap(
+                os.path.join(self.tmp_dir, "inverted_indices.npy"), mode='w+',
+                dtype=_index_dtype(np.array([max(n_rows - 1, 0)])), shape=(len(indices),)
+            ),
+            "data": np.lib.format.open_memmap(
+                os.path.join(self.tmp_dir, "inverted_data.npy"), mode='w+', dtype=weight_dtype, shape=(len(data),)
+            )
+        }
+        fill = col_ptr[:-1].astype(np.int64)
+        max_weights = np.zeros(n_features, dtype=weight_dtype)
+        start_row = 0
+        while start_row < n_rows:
+            # Enough rows to cover about COPY_CHUNK entries (at least one row)
+            end_row = max(int(np.searchsorted(indptr, indptr[start_row] + COPY_CHUNK, side='right')) - 1, start_row + 1)
+            end_row = min(end_row, n_rows)
+            lo, hi = indptr[start_row], indptr[end_row]
+            cols = np.asarray(indices[lo:hi])
+            vals = np.asarray(data[lo:hi])
+            rows = np.repeat(np.arange(start_row, end_row), np.diff(indptr[start_row:end_row + 1]))
+            vals = vals.astype(weight_dtype, copy=False)
+            if row_scale is not None:
+                vals *= row_scale[rows]
+
+            order = np.argsort(cols, kind='stable')
+            cols = cols[order]
+            uniq, first, count = np.unique(cols, return_index=True, return_counts=True)
+            positions = fill[cols] + (np.arange(len(cols)) - np.repeat(first, count))
+            out["indices"][positions] = rows[order]
+            out["data"][positions] = vals[order]
+            fill[uniq] += count
+            np.maximum.at(max_weights, cols, vals[order])
+            start_row = end_row
+
+        for array in out.values():
+            array.flush()
+        del out
+        _save_array(self.tmp_dir, "inverted_indptr", col_ptr)
+        _save_array(self.tmp_dir, "inverted_max_weights", max_weights)
+
+    def close(self, tfidf, mlb, inverted=None, version=None):
+        """Finishes the directory and replaces the previous one (if any) atomically."""
+        joblib.dump({"tfidf": tfidf, "mlb": mlb}, os.path.join(self.tmp_dir, "vectorizers.joblib"))
+
+        n_features = self.n_features if self.n_features is not None else len(tfidf.vocabulary_) + len(mlb.classes_)
+        embeddings = csr_matrix(
+            (
+                self._finish_array("embeddings_data"),
+                self._finish_array("embeddings_indices", np.int32 if n_features <= np.iinfo(np.int32).max else np.int64),
+                self._finish_array("embeddings_indptr", _index_dtype(np.array([self.nnz])))
+            ),
+            shape=(self.rows, n_features),
+            copy=False
+        )
+
+        row_scale = self._finish_array("embeddings_row_scale", np.float32) if self.precision == "int8" else None
+        if inverted is None or inverted["size"] != self.rows:
+            self._finish_inverted_index(embeddings, row_scale)
+        else:
+            for name in ("indptr", "indices", "data", "max_weights"):
+                _save_array(self.tmp_dir, f"inverted_{name}", inverted[name])
+        del embeddings, row_scale
+
+        for i in range(len(self.columns)):
+            self._finish_array(f"column{i}_offsets")
+            self._finish_array(f"column{i}_bytes", np.uint8)
+        self._finish_array("skills_indptr")
+        self._finish_array("skills_ids", np.int32)
+        vocabulary = StringColumn.from_values(self._skill_vocabulary)
+        _save_array(self.tmp_dir, "skill_vocabulary_offsets", vocabulary.offsets)
+        _save_array(self.tmp_dir, "skill_vocabulary_bytes", vocabulary.buffer)
+
+        for field in METADATA_FIELDS:
+            value_ids = ValueIds.from_dict({value: np.concatenate(parts) for value, parts in self._index_ids[field].items()})
+            _save_array(self.tmp_dir, f"index_{field}_values_offsets", value_ids.values.offsets)
+            _save_array(self.tmp_dir, f"index_{field}_values_bytes", value_ids.values.buffer)
+            _save_array(self.tmp_dir, f"index_{field}_bounds", value_ids.bounds)
+            _save_array(self.tmp_dir, f"index_{field}_ids", value_ids.ids.astype(_index_dtype(np.array([max(self.rows - 1, 0)]))))
+        self._finish_array("index_remote", np.bool_)
+
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "version": version or self._version.hexdigest(n_features, len(mlb.classes_)),
+            "shape": [self.rows, n_features],
+            "rows": self.rows,
+            "precision": self.precision or "float64",
+            "columns": self.columns
+        }
+        with open(os.path.join(self.tmp_dir, MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        # Swap directories so a reader never sees a half-written model
+        old_dir = f"{self.dirpath}.old"
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.exists(self.dirpath):
+            os.replace(self.dirpath, old_dir)
+        os.replace(self.tmp_dir, self.dirpath)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        print(f"Model artifacts saved to {self.dirpath}")
+        return manifest["version"]
+
+
+def load_metadata_index(dirpath, size):
+    """Opens the filter index of a model directory in the layout of build_metadata_index, or None.
+
+    Location and company are ValueIds over the mapped arrays and remote is the mapped
+    mask; only the alive mask is allocated. Directories written before the index was
+    stored return None (the caller builds it from the columns).
+    """
+    if not os.path.exists(os.path.join(dirpath, "index_remote.npy")):
+        return None
+    index = {
+        field: ValueIds(
+            StringColumn(_load_array(dirpath, f"index_{field}_values_offsets"), _load_array(dirpath, f"index_{field}_values_bytes")),
+            _load_array(dirpath, f"index_{field}_bounds"),
+            _load_array(dirpath, f"index_{field}_ids")
+        )
+        for field in METADATA_FIELDS
+    }
+    index.update(size=size, remote=_load_array(dirpath, "index_remote"), alive=np.ones(size, dtype=bool), deleted=0, tail=None)
+    return index
+
+def save_mmap_artifacts(dirpath, tfidf, mlb, embeddings, df, inverted=None, version=None):
+    """Writes a model directory; the previous one (if any) is replaced atomically."""
+    postings = as_posting_table(df)
+    writer = MmapArtifactWriter(dirpath, postings.columns)
+    writer.append(embeddings, postings)
+    return writer.close(tfidf, mlb, inverted=inverted, version=version)
+
+SIMILARITY_ARRAYS = ("indices", "scores", "indptr")
+
+def save_similarity_graph(dirpath, graph):
+    """Adds a similarity graph to a model directory (also one that is already live).
+
+    Each file is renamed into place and indptr comes last, so a loader sees either no
+    graph or a complete one.
+    """
+    for name in SIMILARITY_ARRAYS:
+        tmp_path = os.path.join(dirpath, f"similar_{name}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(graph[name]))
+        os.replace(tmp_path, os.path.join(dirpath, f"similar_{name}.npy"))
+
+def load_similarity_graph(dirpath):
+    """Opens the similarity graph of a model directory (memory-mapped), or None."""
+    if not os.path.exists(os.path.join(dirpath, "similar_indptr.npy")):
+        return None
+    graph = {name: _load_array(dirpath, f"similar_{name}") for name in SIMILARITY_ARRAYS}
+    rows = np.diff(graph["indptr"])
+    graph["neighbors"] = int(rows.max()) if len(rows) else 0
+    return graph
+
+LOW_RANK_ARRAYS = ("components", "postings")
+
+def save_low_rank(dirpath, low_rank):
+    """Adds a low-rank projection to a model directory; postings comes last (see save_similarity_graph)."""
+    for name in LOW_RANK_ARRAYS:
+        tmp_path = os.path.join(dirpath, f"low_rank_{name}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(low_rank[name], dtype=np.float32))
+        os.replace(tmp_path, os.path.join(dirpath, f"low_rank_{name}.npy"))
+
+def load_low_rank(dirpath):
+    """Opens the low-rank projection of a model directory (memory-mapped), or None."""
+    if not os.path.exists(os.path.join(dirpath, "low_rank_postings.npy")):
+        return None
+    return {name: _load_array(dirpath, f"low_rank_{name}") for name in LOW_RANK_ARRAYS}
+
+def load_mmap_artifacts(dirpath):
+    """Opens a model directory written by save_mmap_artifacts.
+
+    Returns the same keys as load_model_artifacts plus "inverted", "index" and "version";
+    "df" is a PostingTable backed by the memory-mapped columns, "index" the filter index
+    (see load_metadata_index), "similar" the similarity graph and "low_rank" the low-rank
+    projection (None if not built). Returns None if there is no model.
+    """
+    manifest_path = os.path.join(dirpath, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest["format_version"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format {manifest['format_version']} in {dirpath}")
+
+    vectorizers = joblib.load(os.path.join(dirpath, "vectorizers.joblib"))
+
+    # copy=False keeps scipy pointing at the mapped pages instead of private copies
+    arrays = (
+        _load_array(dirpath, "embeddings_data"),
+        _load_array(dirpath, "embeddings_indices"),
+        _load_array(dirpath, "embeddings_indptr")
+    )
+    precision = manifest.get("precision", "float64")
+    if precision in ("float16", "int8"):
+        row_scale = _load_array(dirpath, "embeddings_row_scale") if precision == "int8" else None
+        embeddings = CompactEmbeddings(*arrays, tuple(manifest["shape"]), row_scale=row_scale)
+    else:
+        embeddings = csr_matrix(arrays, shape=tuple(manifest["shape"]), copy=False)
+
+    inverted = {name: _load_array(dirpath, f"inverted_{name}") for name in ("indptr", "indices", "data", "max_weights")}
+    inverted["size"] = manifest["shape"][0]
+
+    columns = {
+        name: StringColumn(_load_array(dirpath, f"column{i}_offsets"), _load_array(dirpath, f"column{i}_bytes"))
+        for i, name in enumerate(manifest["columns"])
+    }
+    vocabulary = list(StringColumn(
+        _load_array(dirpath, "skill_vocabulary_offsets"), _load_array(dirpath, "skill_vocabulary_bytes")
+    ))
+    columns['skills_list'] = SkillListColumn(
+        _load_array(dirpath, "skills_indptr"), _load_array(dirpath, "skills_ids"), vocabulary
+    )
+
+    return {
+        "tfidf": vectorizers["tfidf"],
+        "mlb": vectorizers["mlb"],
+        "embeddings": embeddings,
+        "df": PostingTable(columns),
+        "inverted": inverted,
+        "index": load_metadata_index(dirpath, manifest["rows"]),
+        "similar": load_similarity_graph(dirpath),
+        "low_rank": load_low_rank(dirpath),
+        "version": manifest["version"]
+    }
@@ -0,0 +1,353 @@
+"""
+Synthetic-Corpus Benchmark Suite
+Measures training, artifact I/O, backend cold start and query latency at several corpus
+sizes and writes the results as JSON so runs from different commits can be compared.
+
+Usage:
+    python benchmark.py --scales 10k,100k --output bench.json
+    python benchmark.py --scales 1M --compare bench.json   # flags regressions vs a previous run
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "Phase4_Frontend_Backend", "backend"))
+TEST_DATA_PATH = os.path.join(SCRIPT_DIR, "job_postings_test.csv")
+
+# A metric regresses when it is this much worse than in the compared run
+# (timings and RSS going up, qps going down)
+REGRESSION_THRESHOLD = 0.2
+
+
+# ======================== SYNTHETIC DATA ========================
+def load_vocabulary(path=TEST_DATA_PATH):
+    """Roles (title + skills) and the skill vocabulary of the hand-labelled test postings."""
+    df = pd.read_csv(path).dropna(subset=['Job Title', 'Required Skills'])
+    roles = [
+        (title, [s.strip() for s in skills.split(',')])
+        for title, skills in zip(df['Job Title'], df['Required Skills'])
+    ]
+    skills = sorted({s for _, role_skills in roles for s in role_skills})
+    return roles, skills
+
+def _skill_popularity(n_skills, rng):
+    # Zipf-like: a few skills appear everywhere, most are rare (as in real postings)
+    weights = 1.0 / np.arange(1, n_skills + 1) ** 0.8
+    return rng.permutation(weights / weights.sum())
+
+def generate_postings(n, seed=0):
+    """n postings built from the test roles plus popularity-weighted extra skills."""
+    rng = np.random.default_rng(seed)
+    roles, skills = load_vocabulary()
+    popularity = _skill_popularity(len(skills), rng)
+    levels = np.array(["", "Senior ", "Junior ", "Lead ", "Associate "], dtype=object)
+    locations = np.array(["Remote", "New York", "London", "Bangalore", "Berlin", "Pune"], dtype=object)
+
+    role_ids = rng.integers(len(roles), size=n)
+    n_extra = rng.integers(0, 4, size=n)
+    extra = rng.choice(len(skills), size=(n, 3), p=popularity)
+    required = []
+    for role_id, k, extra_ids in zip(role_ids, n_extra, extra):
+        role_skills = roles[role_id][1]
+        picked = list(dict.fromkeys(role_skills[:rng.integers(2, len(role_skills) + 1)] + [skills[i] for i in extra_ids[:k]]))
+        required.append(", ".join(picked))
+
+    return pd.DataFrame({
+        "Job Title": levels[rng.integers(len(levels), size=n)] + np.array([roles[i][0] for i in role_ids], dtype=object),
+        "Company": np.char.add("Company ", rng.integers(max(n // 20, 1), size=n).astype(str)).astype(object),
+        "Required Skills": required,
+        "Location": locations[rng.integers(len(locations), size=n)]
+    })
+
+def generate_profiles(n, seed=1):
+    """n user skill profiles of 2-6 popularity-weighted skills."""
+    rng = np.random.default_rng(seed)
+    _, skills = load_vocabulary()
+    popularity = _skill_popularity(len(skills), np.random.default_rng(0))
+    return [
+        [skills[i] for i in rng.choice(len(skills), size=rng.integers(2, 7), replace=False, p=popularity)]
+        for _ in range(n)
+    ]
+
+def parse_scale(text):
+    text = text.strip().lower()
+    factor = {"k": 1_000, "m": 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip("km")) * factor)
+
+
+# ======================== MEASUREMENTS ========================
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where resource is unavailable)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def latency_summary(seconds):
+    """p50/p95/p99 in milliseconds plus sequential throughput."""
+    ms = np.asarray(seconds) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "qps": round(len(ms) / (ms.sum() / 1000), 1) if ms.sum() else None
+    }
+
+def train_stage(csv_path, model_root, joblib_path):
+    """Cleans, trains and saves one corpus. Runs in a fresh process so peak RSS is its own."""
+    sys.path.insert(0, SCRIPT_DIR)
+    from job_recommendation_model import clean_job_data, extract_features, save_model_artifacts
+    from retrain import publish_model
+
+    results = {}
+    start = time.perf_counter()
+    df = clean_job_data(csv_path)
+    results["clean_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tfidf, mlb, embeddings = extract_features(df)
+    results["extract_features_s"] = time.perf_counter() - start
+    results["extract_features_peak_rss_mb"] = peak_rss_mb()
+    results["nnz"] = int(embeddings.nnz)
+    results["n_features"] = int(embeddings.shape[1])
+
+    start = time.perf_counter()
+    publish_model(model_root, tfidf, mlb, embeddings, df)
+    results["save_mmap_s"] = time.perf_counter() - start
+
+    if joblib_path:
+        start = time.perf_counter()
+        save_model_artifacts(joblib_path, tfidf, mlb, embeddings, df)
+        results["save_joblib_s"] = time.perf_counter() - start
+    results["peak_rss_mb"] = peak_rss_mb()
+    return {key: round(value, 4) if isinstance(value, float) else value for key, value in results.items()}
+
+COLD_START_SCRIPT = """
+import json, os, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {backend_dir!r})
+import main
+imported = time.perf_counter()
+main.MODEL_ROOT = {model_root!r}
+main.PHASE3_DIR = os.path.dirname(main.MODEL_ROOT)
+from fastapi.testclient import TestClient
+with TestClient(main.app):
+    ready = time.perf_counter()
+    assert main.model_store.current["tfidf"] is not None, "model did not load"
+print(json.dumps({{"import_s": imported - start, "startup_s": ready - imported}}))
+"""
+
+def measure_cold_start(model_root):
+    """Launches a fresh interpreter that imports backend/main.py and runs its startup."""
+    script = COLD_START_SCRIPT.format(backend_dir=BACKEND_DIR, model_root=model_root)
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True,
+        env={**os.environ, "SKILLSYNC_ARTIFACT_FORMAT": "mmap"}
+    )
+    total = time.perf_counter() - start
+    phases = json.loads(completed.stdout.strip().splitlines()[-1])
+    return {"total_s": round(total, 4), **{key: round(value, 4) for key, value in phases.items()}}
+
+def measure_model_queries(artifacts, profiles, top_k):
+    """Direct get_recommendations latency for each retrieval mode."""
+    from job_recommendation_model import get_recommendations
+
+    results = {}
+    modes = {"exact": {}, "maxscore": {"inverted_index": artifacts["inverted"], "early_termination": True}}
+    for mode, kwargs in modes.items():
+        timings = []
+        for skills in profiles:
+            start = time.perf_counter()
+            get_recommendations(
+                skills, artifacts["tfidf"], artifacts["mlb"], artifacts["embeddings"], artifacts["df"],
+                top_k=top_k, **kwargs
+            )
+            timings.append(time.perf_counter() - start)
+        results[mode] = latency_summary(timings)
+    return results
+
+def measure_api_queries(artifacts, profiles, top_k, concurrency):
+    """/recommend through an in-process ASGI client: sequential latency and concurrent throughput."""
+    import httpx
+    sys.path.insert(0, BACKEND_DIR)
+    import main
+    from query_cache import QueryCache
+
+    main.install_snapshot(main.snapshot_from_artifacts(artifacts))
+    # Every request must reach the model
+    main.recommendation_cache = QueryCache(max_entries=0)
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            timings = []
+            for skills in profiles:
+                start = time.perf_counter()
+                response = await client.post("/recommend", json={"skills": skills, "top_k": top_k})
+                response.raise_for_status()
+                timings.append(time.perf_counter() - start)
+            results = {"sequential": latency_summary(timings)}
+
+            semaphore = asyncio.Semaphore(concurrency)
+            async def one(skills):
+                async with semaphore:
+                    response = await client.post("/recommend", json={"skills": skills, "top_k": top_k})
+                    response.raise_for_status()
+            start = time.perf_counter()
+            await asyncio.gather(*(one(skills) for skills in profiles))
+            elapsed = time.perf_counter() - start
+            results["concurrent"] = {"concurrency": concurrency, "qps": round(len(profiles) / elapsed, 1)}
+            return results
+
+    return asyncio.run(run())
+
+
+# ======================== SUITE ========================
+def run_scale(n, workdir, args):
+    print(f"\n{'='*80}\n📏 SCALE: {n:,} postings\n{'='*80}")
+    scale_dir = os.path.join(workdir, str(n))
+    os.makedirs(scale_dir, exist_ok=True)
+    csv_path = os.path.join(scale_dir, "postings.csv")
+    model_root = os.path.join(scale_dir, "models")
+    joblib_path = None if args.skip_joblib else os.path.join(scale_dir, "model.pkl")
+
+    start = time.perf_counter()
+    generate_postings(n, seed=args.seed).to_csv(csv_path, index=False)
+    result = {"postings": n, "generate_s": round(time.perf_counter() - start, 4)}
+
+    print("🔧 Training (fresh process)...")
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1) as pool:
+        result["train"] = pool.apply(train_stage, (csv_path, model_root, joblib_path))
+    print(f"   extract_features: {result['train']['extract_features_s']:.2f}s, "
+          f"peak RSS {result['train']['extract_features_peak_rss_mb']} MB")
+
+    from retrain import current_model_dir
+    from artifact_store import load_mmap_artifacts
+    start = time.perf_counter()
+    artifacts = load_mmap_artifacts(current_model_dir(model_root))
+    result["load_mmap_s"] = round(time.perf_counter() - start, 4)
+    if joblib_path:
+        from job_recommendation_model import load_model_artifacts
+        start = time.perf_counter()
+        load_model_artifacts(joblib_path)
+        result["load_joblib_s"] = round(time.perf_counter() - start, 4)
+
+    print("🚀 Backend cold start...")
+    result["cold_start"] = measure_cold_start(model_root)
+
+    print("⏱️  Query latency...")
+    profiles = generate_profiles(args.queries, seed=args.seed + 1)
+    result["get_recommendations"] = measure_model_queries(artifacts, profiles, args.top_k)
+    result["api_recommend"] = measure_api_queries(artifacts, profiles, args.top_k, args.concurrency)
+    print(f"   get_recommendations p50 {result['get_recommendations']['exact']['p50_ms']} ms, "
+          f"/recommend p50 {result['api_recommend']['sequential']['p50_ms']} ms")
+
+    if not args.keep_files:
+        del artifacts
+        shutil.rmtree(scale_dir, ignore_errors=True)
+    return result
+
+def _flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def compare_runs(current, previous, threshold=REGRESSION_THRESHOLD):
+    """Metrics more than threshold worse than in previous, per scale."""
+    regressions = []
+    old_scales = {scale["postings"]: _flatten(scale) for scale in previous["scales"]}
+    for scale in current["scales"]:
+        old = old_scales.get(scale["postings"])
+        if old is None:
+            continue
+        for name, value in _flatten(scale).items():
+            before = old.get(name)
+            if not before or not name.endswith(("_s", "_ms", "_mb", "qps")):
+                continue
+            change = (before - value) / before if name.endswith("qps") else (value - before) / before
+            if change > threshold:
+                regressions.append({"postings": scale["postings"], "metric": name,
+                                    "before": before, "after": value, "worse_by": round(change, 3)})
+    return regressions
+
+def environment_info():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=SCRIPT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    import scipy
+    import sklearn
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "sklearn": sklearn.__version__
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SkillSync on synthetic corpora.")
+    parser.add_argument("--scales", default="10k,100k", help="Comma-separated corpus sizes, e.g. 10k,100k,1M,10M")
+    parser.add_argument("--queries", type=int, default=200, help="Skill profiles per latency measurement")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=32, help="In-flight /recommend requests for throughput")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-joblib", action="store_true", help="Skip the joblib pickle (slow at large scales)")
+    parser.add_argument("--keep-files", action="store_true", help="Keep generated CSVs and models")
+    parser.add_argument("--workdir", default=None, help="Where corpora and models are written (default: temp dir)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", default=None, help="Previous results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Relative change counted as a regression (default 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    sys.path.insert(0, SCRIPT_DIR)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="skillsync-bench-")
+    results = {"environment": environment_info(), "settings": vars(args), "scales": []}
+    for scale in args.scales.split(","):
+        results["scales"].append(run_scale(parse_scale(scale), workdir, args))
+
+    if args.compare:
+        with open(args.compare) as f:
+            results["regressions"] = compare_runs(results, json.load(f), args.threshold)
+        for regression in results["regressions"]:
+            print(f"⚠️  {regression['postings']:,}: {regression['metric']} "
+                  f"{regression['before']} -> {regression['after']} ({regression['worse_by']:.0%} worse)")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results saved to: {args.output}")
+    if not args.workdir and not args.keep_files:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 1 if results.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,379 @@
+import argparse
+import os
+
+import numpy as np
+from scipy.sparse import csr_matrix, issparse, vstack
+
+from posting_table import _ragged_bounds, _ragged_gather
+
+
+# Compact Embedding Storage
+# extract_features builds float64 embeddings. Every row is L2-normalized, so rankings
+# survive much less precision, and the matrix can be stored (in memory, in the joblib
+# pickle and in the memory-mapped directory) as:
+#   float64 - as built
+#   float32 - plain CSR with half the value bytes; scoring runs in float32
+#   float16 - a quarter of the value bytes; scipy cannot slice or stack float16 CSR, so the
+#             matrix is wrapped in CompactEmbeddings
+#   int8    - value / row scale rounded to int8 with one float32 scale per row
+#             (max |value| / 127); scores are rescaled per row after the product
+# scipy has no kernel that reads float16 or int8 values: a product would upcast the whole
+# value array on every query. CompactEmbeddings therefore scores row blocks of at most
+# SCORE_BLOCK_NNZ values, converting only the block at hand to float32, so memory stays at
+# 2 (float16) or 1 (int8) bytes per value plus one small temporary. Rows are summed in the
+# same order as over a full float32 copy, so the scores are identical to it.
+# Index arrays are narrowed to int32 in every mode. score_postings scores queries against
+# any of these forms; ranking_agreement measures how much a compact matrix changes the
+# top-k against float64 on a set of profiles before it is deployed.
+# Postings added through the API go to a small separate tail (TailedEmbeddings, see
+# append_rows), so an insert copies the tail only; IDF refreshes and rebuilds re-embed
+# every row into one matrix again.
+
+PRECISIONS = ("float64", "float32", "float16", "int8")
+INT8_LEVELS = 127
+# Above this many (features x queries) elements the query block stays sparse in score_postings
+DENSE_QUERY_LIMIT = 1 << 22
+# Largest dense (postings x queries) score block a batch builds at once (see score_chunk_size)
+SCORE_BLOCK_BYTES = 64 << 20
+# Stored values converted to float32 at a time when CompactEmbeddings scores
+SCORE_BLOCK_NNZ = 1 << 20
+
+def _narrow_index(array):
+    array = np.asarray(array)
+    if len(array) == 0 or array.max() <= np.iinfo(np.int32).max:
+        return array.astype(np.int32, copy=False)
+    return array
+
+
+class CompactEmbeddings:
+    """CSR embedding matrix holding float16 or int8 (per-row scaled) values.
+
+    Offers what the model needs from its embedding matrix: shape, scoring with @ (always
+    returns a dense ndarray), row selection and tocsr()/tocsc(), which give float32 CSR
+    with the values restored. Scoring converts one row block at a time (see above).
+    """
+
+    def __init__(self, data, indices, indptr, shape, row_scale=None):
+        # copy=False keeps memory-mapped arrays mapped
+        self.matrix = csr_matrix((data, indices, indptr), shape=shape, copy=False)
+        self.row_scale = row_scale
+
+    @property
+    def precision(self):
+        return "int8" if self.row_scale is not None else "float16"
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    @property
+    def nnz(self):
+        return self.matrix.nnz
+
+    @property
+    def dtype(self):
+        # Dtype scores come out in
+        return np.dtype(np.float32)
+
+    @property
+    def data(self):
+        return self.matrix.data
+
+    @property
+    def indices(self):
+        return self.matrix.indices
+
+    @property
+    def indptr(self):
+        return self.matrix.indptr
+
+    def _score_blocks(self):
+        """Row bounds of blocks holding at most SCORE_BLOCK_NNZ values (longer rows go alone)."""
+        indptr = np.asarray(self.indptr)
+        cuts = np.searchsorted(indptr, np.arange(SCORE_BLOCK_NNZ, self.nnz, SCORE_BLOCK_NNZ), side='right') - 1
+        bounds = np.unique(np.concatenate([[0], cuts, [self.shape[0]]]))
+        return bounds if len(bounds) > 1 else np.array([0, 0])
+
+    def __matmul__(self, other):
+        indptr = np.asarray(self.indptr)
+        scores = None
+        bounds = self._score_blocks()
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            first, last = int(indptr[start]), int(indptr[stop])
+            block = csr_matrix(
+                (np.asarray(self.matrix.data[first:last], dtype=np.float32), self.indices[first:last],
+                 indptr[start:stop + 1] - first),
+                shape=(stop - start, self.shape[1]), copy=False
+            ) @ other
+            block = block.toarray() if issparse(block) else np.asarray(block)
+            if scores is None:
+                scores = np.empty((self.shape[0],) + block.shape[1:], dtype=block.dtype)
+            scores[start:stop] = block
+        if self.row_scale is not None:
+            scores *= self.row_scale.reshape(-1, *([1] * (scores.ndim - 1)))
+        return scores
+
+    def _values(self, positions, rows, lengths):
+        values = np.asarray(self.matrix.data[positions], dtype=np.float32)
+        if self.row_scale is not None:
+            values *= np.repeat(np.asarray(self.row_scale)[rows], lengths)
+        return values
+
+    def __getitem__(self, key):
+        """Selects rows (int, slice or index array) as float32 CSR."""
+        rows = np.arange(*key.indices(self.shape[0])) if isinstance(key, slice) else np.atleast_1d(np.asarray(key))
+        starts, lengths = _ragged_bounds(self.indptr, rows)
+        positions = _ragged_gather(starts, lengths)
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        return csr_matrix(
+            (self._values(positions, rows, lengths), np.asarray(self.indices)[positions], _narrow_index(indptr)),
+            shape=(len(rows), self.shape[1])
+        )
+
+    def tocsr(self):
+        lengths = np.diff(self.indptr)
+        values = self._values(slice(None), np.arange(self.shape[0]), lengths)
+        return csr_matrix((values, np.asarray(self.indices), np.asarray(self.indptr)), shape=self.shape)
+
+    def tocsc(self):
+        return self.tocsr().tocsc()
+
+
+class TailedEmbeddings:
+    """An embedding matrix (main) followed by rows appended since it was built (tail).
+
+    Both parts are stored in the same precision; the tail may have more columns (skills
+    added with it), which the main rows simply do not use. Offers the same scoring and
+    row selection as the matrices above, over the full width.
+    """
+
+    def __init__(self, main, tail):
+        self.main = main
+        self.tail = tail
+
+    @property
+    def precision(self):
+        return embedding_precision(self.main)
+
+    @property
+    def shape(self):
+        return (self.main.shape[0] + self.tail.shape[0], self.tail.shape[1])
+
+    @property
+    def nnz(self):
+        return self.main.nnz + self.tail.nnz
+
+    @property
+    def dtype(self):
+        return self.main.dtype
+
+    def __matmul__(self, other):
+        head = self.main @ other[:self.main.shape[1]]
+        tail = self.tail @ other
+        head = head.toarray() if issparse(head) else np.asarray(head)
+        tail = tail.toarray() if issparse(tail) else np.asarray(tail)
+        return np.concatenate([head, tail])
+
+    def __getitem__(self, key):
+        """Selects rows (int, slice or index array) as CSR over the full width."""
+        rows = np.arange(*key.indices(self.shape[0])) if isinstance(key, slice) else np.atleast_1d(np.asarray(key))
+        split = self.main.shape[0]
+        in_main = rows < split
+        parts = [_widen(self.main[rows[in_main]], self.shape[1]), _widen(self.tail[rows[~in_main] - split], self.shape[1])]
+        selected = vstack(parts, format='csr')
+        if in_main.all() or not in_main.any():
+            return selected
+        # Main rows were stacked first; put every row back where it was asked for
+        order = np.empty(len(rows), dtype=np.int64)
+        order[in_main] = np.arange(in_main.sum())
+        order[~in_main] = np.arange(in_main.sum(), len(rows))
+        return selected[order]
+
+    def tocsr(self):
+        return stack_rows([self.main, self.tail], self.shape[1]).tocsr()
+
+    def tocsc(self):
+        return self.tocsr().tocsc()
+
+
+def _widen(block, n_features):
+    return csr_matrix((block.data, block.indices, block.indptr), shape=(block.shape[0], n_features))
+
+def embedding_precision(embeddings):
+    """Storage precision of an embedding matrix (one of PRECISIONS)."""
+    if isinstance(embeddings, (CompactEmbeddings, TailedEmbeddings)):
+        return embeddings.precision
+    return "float32" if embeddings.dtype == np.float32 else "float64"
+
+def embedding_nbytes(embeddings):
+    """Bytes held by the matrix arrays (values, indices, row pointers, row scales)."""
+    if isinstance(embeddings, TailedEmbeddings):
+        return embedding_nbytes(embeddings.main) + embedding_nbytes(embeddings.tail)
+    arrays = [embeddings.data, embeddings.indices, embeddings.indptr, getattr(embeddings, "row_scale", None)]
+    return sum(array.nbytes for array in arrays if array is not None)
+
+def _row_max(values, indptr):
+    row_max = np.zeros(len(indptr) - 1, dtype=np.float64)
+    nonempty = np.diff(indptr) > 0
+    if nonempty.any():
+        # Empty rows add no elements, so reducing from the non-empty starts only is exact
+        row_max[nonempty] = np.maximum.reduceat(np.abs(values), indptr[:-1][nonempty])
+    return row_max
+
+def compact_embeddings(embeddings, precision="float32"):
+    """Converts an embedding matrix (any of the stored forms) to the given precision."""
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision {precision!r}; expected one of {PRECISIONS}")
+    matrix = embeddings.tocsr()
+    data, indices, indptr = np.asarray(matrix.data), _narrow_index(matrix.indices), _narrow_index(matrix.indptr)
+
+    if precision in ("float64", "float32"):
+        return csr_matrix((data.astype(precision, copy=False), indices, indptr), shape=matrix.shape)
+    if precision == "float16":
+        return CompactEmbeddings(data.astype(np.float16), indices, indptr, matrix.shape)
+
+    row_scale = (_row_max(data, indptr) / INT8_LEVELS).astype(np.float32)
+    divisor = np.repeat(np.where(row_scale > 0, row_scale, 1), np.diff(indptr))
+    values = np.rint(data / divisor).clip(-INT8_LEVELS, INT8_LEVELS).astype(np.int8)
+    return CompactEmbeddings(values, indices, indptr, matrix.shape, row_scale=row_scale)
+
+def stack_rows(blocks, n_features=None):
+    """Stacks row blocks stored in one precision; n_features widens them with empty columns."""
+    n_features = n_features or max(block.shape[1] for block in blocks)
+    if not isinstance(blocks[0], CompactEmbeddings):
+        widened = [csr_matrix((block.data, block.indices, block.indptr), shape=(block.shape[0], n_features)) for block in blocks]
+        return vstack(widened, format='csr')
+
+    offsets = np.cumsum([0] + [block.nnz for block in blocks])
+    indptr = np.concatenate([[0]] + [np.asarray(block.indptr[1:], dtype=np.int64) + offset for block, offset in zip(blocks, offsets)])
+    return CompactEmbeddings(
+        np.concatenate([block.data for block in blocks]),
+        _narrow_index(np.concatenate([block.indices for block in blocks])),
+        _narrow_index(indptr),
+        (sum(block.shape[0] for block in blocks), n_features),
+        row_scale=None if blocks[0].row_scale is None else np.concatenate([block.row_scale for block in blocks])
+    )
+
+def append_rows(embeddings, rows):
+    """embeddings followed by rows (same precision); only the appended tail is copied."""
+    if isinstance(embeddings, TailedEmbeddings):
+        return TailedEmbeddings(embeddings.main, stack_rows([embeddings.tail, rows], rows.shape[1]))
+    return TailedEmbeddings(embeddings, rows)
+
+def row_block(embeddings, start, stop):
+    """Rows [start, stop) of an embedding matrix in its storage precision, without copying the values.
+
+    Values and column indices are views, so a block of a memory-mapped matrix stays mapped.
+    """
+    indptr = np.asarray(embeddings.indptr)
+    first, last = int(indptr[start]), int(indptr[stop])
+    arrays = (embeddings.data[first:last], embeddings.indices[first:last], indptr[start:stop + 1] - first)
+    shape = (stop - start, embeddings.shape[1])
+    if isinstance(embeddings, CompactEmbeddings):
+        row_scale = None if embeddings.row_scale is None else embeddings.row_scale[start:stop]
+        return CompactEmbeddings(*arrays, shape, row_scale=row_scale)
+    return csr_matrix(arrays, shape=shape, copy=False)
+
+def score_postings(embeddings, queries):
+    """Dense (postings x queries) scores of normalized query rows (CSR) against the embeddings.
+
+    The product runs in the embeddings' own precision. The query block is densified when
+    small, which is also faster than a sparse-sparse product.
+    """
+    dtype = np.float64 if embeddings.dtype == np.float64 else np.float32
+    right = queries.T.astype(dtype)
+    if right.shape[0] * right.shape[1] <= DENSE_QUERY_LIMIT:
+        right = right.toarray()
+    scores = embeddings @ right
+    return scores.toarray() if issparse(scores) else np.asarray(scores)
+
+def score_chunk_size(n_postings, chunk_size):
+    """Queries per score_postings call so the float64 score block fits SCORE_BLOCK_BYTES."""
+    return max(1, min(chunk_size, SCORE_BLOCK_BYTES // (8 * max(n_postings, 1))))
+
+
+# ======================== RANKING AGREEMENT ========================
+def ranking_agreement(reference, embeddings, queries, k=10, chunk_size=512):
+    """Compares the top-k rankings of a compact matrix with the reference (float64) one.
+
+    queries is the normalized CSR query matrix of the profile set (see vectorize_users).
+    Judged by reference scores, so reordering tied postings is not a disagreement:
+      overlap         - share of the compact top k that scores at least the reference k-th
+                        best (mean and worst profile)
+      identical_share - profiles whose compact top k has exactly the reference score sequence
+      score_ratio     - reference score mass of the compact top k / of the reference top k
+    plus the largest absolute score difference.
+    """
+    from ranking import top_k_indices
+
+    overlaps, ratios, identical, max_error = [], [], 0, 0.0
+    for start in range(0, queries.shape[0], chunk_size):
+        chunk = queries[start:start + chunk_size]
+        expected, actual = score_postings(reference, chunk), score_postings(embeddings, chunk)
+        max_error = max(max_error, float(np.abs(expected - actual).max(initial=0.0)))
+        for col in range(chunk.shape[0]):
+            scores = expected[:, col]
+            want = scores[top_k_indices(scores, k)]
+            got = scores[top_k_indices(actual[:, col], k)]
+            if len(want) == 0:
+                continue
+            overlaps.append(float(np.mean(got >= want[-1])))
+            ratios.append(float(got.sum() / want.sum()) if want.sum() > 0 else 1.0)
+            identical += np.array_equal(got, want)
+    return {
+        "profiles": len(overlaps),
+        "k": k,
+        "mean_overlap": round(float(np.mean(overlaps)), 4) if overlaps else 1.0,
+        "min_overlap": round(float(np.min(overlaps)), 4) if overlaps else 1.0,
+        "identical_share": round(identical / len(overlaps), 4) if overlaps else 1.0,
+        "score_ratio": round(float(np.mean(ratios)), 6) if ratios else 1.0,
+        "max_score_error": max_error
+    }
+
+def _load_model(path):
+    if os.path.isdir(path):
+        from artifact_store import load_mmap_artifacts
+        return load_mmap_artifacts(path)
+    from job_recommendation_model import load_model_artifacts
+    return load_model_artifacts(path)
+
+def main():
+    from job_recommendation_model import vectorize_users, clean_user_skills
+    from posting_table import take_postings
+
+    parser = argparse.ArgumentParser(description="Check ranking agreement of compact embedding precisions against float64.")
+    parser.add_argument("model", help="joblib model file or memory-mapped model directory")
+    parser.add_argument("--precisions", default="float32,float16,int8")
+    parser.add_argument("--profiles", default=None,
+                        help="Text file with one comma-separated skill profile per line (default: sampled postings' skills)")
+    parser.add_argument("--sample", type=int, default=1000, help="Postings sampled as profiles without --profiles")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    model = _load_model(args.model)
+    if args.profiles:
+        with open(args.profiles) as f:
+            profiles = [clean_user_skills(line.split(",")) for line in f if line.strip()]
+    else:
+        if "df" not in model:
+            parser.error("the model holds no postings to sample profiles from; pass --profiles")
+        n_postings = len(model["df"])
+        rows = np.random.default_rng(args.seed).choice(n_postings, size=min(args.sample, n_postings), replace=False)
+        profiles = [list(skills) for skills in take_postings(model["df"], rows, ['skills_list'])['skills_list']]
+
+    queries = vectorize_users(profiles, model["tfidf"], model["mlb"])
+    reference = compact_embeddings(model["embeddings"], "float64")
+    print(f"{len(profiles)} profiles, top {args.k}, reference float64: {embedding_nbytes(reference) / 2**20:.1f} MB")
+    for precision in args.precisions.split(","):
+        compact = compact_embeddings(reference, precision)
+        report = ranking_agreement(reference, compact, queries, args.k)
+        print(f"{precision:>8}: {embedding_nbytes(compact) / 2**20:8.1f} MB | "
+              f"overlap@{args.k} mean {report['mean_overlap']:.4f} min {report['min_overlap']:.4f} | "
+              f"identical {report['identical_share']:.2%} | score ratio {report['score_ratio']:.6f} | "
+              f"max score error {report['max_score_error']:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,30 @@
 """
 Standalone Model Evaluation Script
 Evaluates the job recommendation model with proper recommendation metrics
+
+Usage:
+    python evaluate_model.py                       # production settings, built-in test set
+    python evaluate_model.py --sweep --max-features 500,1000,2000 --ngrams 1-1,1-2 --skill-weights 1,2,3
+    python evaluate_model.py --sweep --data postings.csv --ground-truth labels.json --workers 8
 """
+import argparse
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.preprocessing import MultiLabelBinarizer, normalize
-from scipy.sparse import hstack
+from scipy.sparse import diags
+
+from job_recommendation_model import (
+    SKILL_WEIGHT, TFIDF_PARAMS, clean_job_frame, clean_user_skills, extract_features,
+    skill_matrix, vectorize_users
+)
+
+KS = (3, 5, 10)
 
 # ======================== DATA PREPARATION ========================
 def create_test_dataset():
@@ -83,69 +101,93 @@ def create_test_dataset():
 
 # ======================== MODEL TRAINING ========================
 def train_model(df):
-    """Train the recommendation model (Mirroring job_recommendation_model.py)."""
-    # Clean data
-    df = df.dropna(subset=['Job Title', 'Required Skills']).copy()
-    df['skills_list'] = df['Required Skills'].apply(
-        lambda x: [s.strip().lower() for s in str(x).split(',')]
-    )
-    
-    # Extract features
-    text_corpus = df['Job Title'] + " " + df['Required Skills']
-    
-    # IMPROVEMENT: Use ngram_range=(1, 2)
-    tfidf = TfidfVectorizer(stop_words='english', max_features=2000, ngram_range=(1, 2))
-    text_features = tfidf.fit_transform(text_corpus)
-    
-    mlb = MultiLabelBinarizer()
-    skill_features = mlb.fit_transform(df['skills_list'])
-    
-    # IMPROVEMENT: Weight skills higher (2x importance)
-    skill_features = skill_features.astype(float) * 2.0
-    
-    combined = hstack([text_features, skill_features])
-    embeddings = normalize(combined, norm='l2')
-    
+    """Train the recommendation model with the production cleaning and feature code."""
+    df = clean_job_frame(df)
+    tfidf, mlb, embeddings = extract_features(df)
     return tfidf, mlb, embeddings, df
 
 
 # ======================== EVALUATION METRICS ========================
-def precision_at_k(recommended, relevant, k):
+# Metrics are computed for all profiles at once: hits is a (profiles x K) boolean matrix
+# marking which of each profile's top K recommendations are relevant.
+def precision_at_k(hits, k):
     """Precision@K: % of recommendations that are relevant"""
-    top_k = recommended[:k]
-    return len(set(top_k) & set(relevant)) / k if k > 0 else 0
+    return hits[:, :k].sum(axis=1) / k
 
 
-def recall_at_k(recommended, relevant, k):
+def recall_at_k(hits, n_relevant, k):
     """Recall@K: % of relevant items that were recommended"""
-    top_k = recommended[:k]
-    return len(set(top_k) & set(relevant)) / len(relevant) if len(relevant) > 0 else 0
+    return np.divide(hits[:, :k].sum(axis=1), n_relevant, out=np.zeros(len(hits)), where=n_relevant > 0)
 
 
 def f1_at_k(precision, recall):
     """F1 Score: Harmonic mean of precision and recall"""
-    if precision + recall == 0:
-        return 0
-    return 2 * (precision * recall) / (precision + recall)
+    total = precision + recall
+    return np.divide(2 * precision * recall, total, out=np.zeros(len(total)), where=total > 0)
 
 
-def ndcg_at_k(recommended, relevant, k):
+def ndcg_at_k(hits, n_relevant, k):
     """NDCG@K: Normalized Discounted Cumulative Gain (ranking quality)"""
-    dcg = sum([1 / np.log2(i + 2) for i, idx in enumerate(recommended[:k]) if idx in relevant])
-    idcg = sum([1 / np.log2(i + 2) for i in range(min(len(relevant), k))])
-    return dcg / idcg if idcg > 0 else 0
+    discounts = 1 / np.log2(np.arange(k) + 2)
+    dcg = hits[:, :k] @ discounts[:hits[:, :k].shape[1]]
+    # Ideal DCG: all min(n_relevant, k) relevant jobs at the top
+    idcg = np.concatenate([[0.0], np.cumsum(discounts)])[np.minimum(n_relevant, k)]
+    return np.divide(dcg, idcg, out=np.zeros(len(hits)), where=idcg > 0)
+
+
+def mrr(first_ranks):
+    """MRR: Mean Reciprocal Rank (position of first relevant item, 0 = none)"""
+    return np.divide(1.0, first_ranks, out=np.zeros(len(first_ranks)), where=first_ranks > 0)
+
+
+def relevance_matrix(ground_truth, n_jobs):
+    """Boolean (profiles x jobs) matrix of the labelled relevant jobs."""
+    relevance = np.zeros((len(ground_truth), n_jobs), dtype=bool)
+    for row, data in enumerate(ground_truth.values()):
+        relevance[row, data["relevant_jobs"]] = True
+    return relevance
+
+
+def rank_top_k(scores, k):
+    """Top k job indices for every profile row of scores, best first (ties: lower index first)."""
+    k = min(k, scores.shape[1])
+    # argpartition is O(n) per row; only the k survivors get sorted
+    top = np.sort(np.argpartition(-scores, k - 1, axis=1)[:, :k], axis=1)
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(top, order, axis=1)
 
 
-def mrr(recommended, relevant):
-    """MRR: Mean Reciprocal Rank (position of first relevant item)"""
-    for i, idx in enumerate(recommended):
-        if idx in relevant:
-            return 1 / (i + 1)
-    return 0
+def first_relevant_rank(scores, relevance):
+    """1-based rank of each profile's best ranked relevant job (0 if it has none), without sorting."""
+    best = np.where(relevance, scores, -np.inf).argmax(axis=1)
+    best_scores = np.take_along_axis(scores, best[:, None], axis=1)
+    ahead = (scores > best_scores) | ((scores == best_scores) & (np.arange(scores.shape[1]) < best[:, None]))
+    # A relevant job scoring 0 shares nothing with the profile and is never recommended
+    return np.where(best_scores[:, 0] > 0, ahead.sum(axis=1) + 1, 0)
+
+
+def ranking_metrics(scores, relevance, ks=KS):
+    """Scores every metric for all profiles from a (profiles x jobs) score matrix.
+
+    Returns (top, per_k, reciprocal_ranks): the top max(ks) job indices per profile,
+    {k: {"Precision", "Recall", "F1", "NDCG"}} of per-profile arrays, and per-profile MRR.
+    """
+    top = rank_top_k(scores, max(ks))
+    # Zero-score jobs are not recommendations (see get_recommendations): their tie order
+    # must not count as hits
+    hits = (np.take_along_axis(relevance, top, axis=1) & (np.take_along_axis(scores, top, axis=1) > 0)).astype(float)
+    n_relevant = relevance.sum(axis=1)
+
+    per_k = {}
+    for k in ks:
+        p = precision_at_k(hits, k)
+        r = recall_at_k(hits, n_relevant, k)
+        per_k[k] = {"Precision": p, "Recall": r, "F1": f1_at_k(p, r), "NDCG": ndcg_at_k(hits, n_relevant, k)}
+    return top, per_k, mrr(first_relevant_rank(scores, relevance))
 
 
 # ======================== MAIN EVALUATION ========================
-def evaluate():
+def evaluate(jobs_df=None, ground_truth=None, output="evaluation_metrics.csv"):
     print("\n" + "="*80)
     print("JOB RECOMMENDATION MODEL - ACCURACY EVALUATION")
     print("="*80)
@@ -162,49 +204,35 @@ def evaluate():
     print("-" * 80)
     
     # Create test data
-    print("\n📊 Creating test dataset...")
-    jobs_df, ground_truth = create_test_dataset()
-    print(f"✅ Dataset created: {len(jobs_df)} job postings")
+    if jobs_df is None:
+        print("\n📊 Creating test dataset...")
+        jobs_df, ground_truth = create_test_dataset()
+        print(f"✅ Dataset created: {len(jobs_df)} job postings")
     
     # Train model
     print("🔧 Training recommendation model...")
     tfidf, mlb, embeddings, jobs_df = train_model(jobs_df)
     print("✅ Model trained successfully")
     
-    # Evaluate
+    # Score every profile in one batched product, then all metrics at once
+    user_skills = [clean_user_skills(data["skills"]) for data in ground_truth.values()]
+    scores = (vectorize_users(user_skills, tfidf, mlb) @ embeddings.T).toarray()
+    top, per_k, reciprocal_ranks = ranking_metrics(scores, relevance_matrix(ground_truth, len(jobs_df)))
+    
     all_results = []
     
-    for profile_name, data in ground_truth.items():
-        user_skills = data["skills"]
+    for row, (profile_name, data) in enumerate(ground_truth.items()):
         relevant_jobs = data["relevant_jobs"]
         
         print(f"\n\n{'='*80}")
         print(f"🎯 TESTING: {profile_name}")
         print(f"{'='*80}")
-        print(f"User Skills: {', '.join(user_skills)}")
+        print(f"User Skills: {', '.join(data['skills'])}")
         print(f"Expected Relevant Jobs: {len(relevant_jobs)}")
         print("-" * 80)
         
-        # Get recommendations
-        user_skills_clean = [s.strip().lower() for s in user_skills]  # Improved cleaning
-        user_text_vec = tfidf.transform([" ".join(user_skills_clean)])
-        user_skill_vec = mlb.transform([user_skills_clean])
-        
-        # IMPROVEMENT: Apply same weighting to user skills
-        user_skill_vec = user_skill_vec.astype(float) * 2.0
-        
-        user_combined = hstack([user_text_vec, user_skill_vec])
-        user_vec = normalize(user_combined, norm='l2')
-        
-        scores = (embeddings @ user_vec.T).toarray().flatten()
-        recommended_indices = scores.argsort()[::-1].tolist()
-        
-        # Calculate metrics
-        for k in [3, 5, 10]:
-            p = precision_at_k(recommended_indices, relevant_jobs, k)
-            r = recall_at_k(recommended_indices, relevant_jobs, k)
-            f = f1_at_k(p, r)
-            n = ndcg_at_k(recommended_indices, relevant_jobs, k)
+        for k, metrics in per_k.items():
+            p, r, f, n = (metrics[name][row] for name in ("Precision", "Recall", "F1", "NDCG"))
             
             all_results.append({
                 "Profile": profile_name,
@@ -222,15 +250,15 @@ def evaluate():
             print(f"   NDCG:      {n:.3f}")
         
         # MRR
-        m = mrr(recommended_indices, relevant_jobs)
-        print(f"\n   MRR: {m:.3f} (1st relevant at position #{int(1/m) if m > 0 else 'N/A'})")
+        m = reciprocal_ranks[row]
+        print(f"\n   MRR: {m:.3f} (1st relevant at position #{int(round(1/m)) if m > 0 else 'N/A'})")
         
         # Show recommendations
         print(f"\n   🔍 Top 5 Recommendations:")
-        for i, idx in enumerate(recommended_indices[:5], 1):
+        for i, idx in enumerate(top[row, :5], 1):
             job = jobs_df.iloc[idx]
             mark = "✅" if idx in relevant_jobs else "❌"
-            print(f"      {i}. {mark} {job['Job Title']} @ {job['Company']} | Score: {scores[idx]:.3f}")
+            print(f"      {i}. {mark} {job['Job Title']} @ {job['Company']} | Score: {scores[row, idx]:.3f}")
     
     # Overall stats
     df_results = pd.DataFrame(all_results)
@@ -239,7 +267,7 @@ def evaluate():
     print("📊 OVERALL MODEL PERFORMANCE")
     print(f"{'='*80}")
     
-    for k in [3, 5, 10]:
+    for k in KS:
         subset = df_results[df_results['K'] == k]
         print(f"\n@ K={k} (averaged across all test profiles):")
         print(f"   Avg Precision: {subset['Precision'].mean():.3f} ⭐")
@@ -257,11 +285,192 @@ def evaluate():
     print("="*80 + "\n")
     
     # Save results
-    df_results.to_csv("evaluation_metrics.csv", index=False)
-    print("💾 Results saved to: evaluation_metrics.csv\n")
+    df_results.to_csv(output, index=False)
+    print(f"💾 Results saved to: {output}\n")
     
     return df_results
 
 
+# ======================== PARAMETER SWEEP ========================
+# Evaluates a grid of (max_features, ngram_range, skill weight) settings. Most of the work
+# is shared between configs, so each piece is computed once and reused:
+#   - the skill block depends on none of the settings: the profile x job skill overlaps
+#     and skill counts are computed once in the parent and handed to every worker;
+#   - term counts depend only on ngram_range: a task counts a range once and cuts every
+#     max_features vocabulary out of those counts (TF-IDF of a column subset);
+#   - the weight only scales the skill block, so per weight the scores are an
+#     elementwise combination of the cached text and skill products, no new embedding:
+#     score = (text_u·text_j + w² skill_u·skill_j) / (|text_u + w skill_u| |text_j + w skill_j|)
+# Each config therefore costs one sparse product plus the vectorized metrics.
+SWEEP_MAX_FEATURES = (500, 1000, 2000, 5000)
+SWEEP_NGRAMS = ((1, 1), (1, 2), (1, 3))
+SWEEP_SKILL_WEIGHTS = (1.0, 1.5, 2.0, 3.0)
+
+_SWEEP_STATE = {}
+
+def _init_sweep_worker(state):
+    _SWEEP_STATE.update(state)
+
+
+def _count_terms(ngram_range):
+    """Job and profile term counts over the unlimited vocabulary of one ngram range (CSC)."""
+    params = {k: v for k, v in TFIDF_PARAMS.items() if k not in ("max_features", "ngram_range")}
+    counter = CountVectorizer(ngram_range=ngram_range, **params)
+    job_counts = counter.fit_transform(_SWEEP_STATE["job_texts"]).tocsc()
+    return job_counts, counter.transform(_SWEEP_STATE["user_texts"]).tocsc()
+
+
+def _text_block(job_counts, user_counts, max_features):
+    """Normalized TF-IDF rows TfidfVectorizer(max_features=...) would produce, from full counts."""
+    keep = np.arange(job_counts.shape[1])
+    if max_features is not None and len(keep) > max_features:
+        # Same selection as TfidfVectorizer: highest total counts, argsort over alphabetical terms
+        totals = np.asarray(job_counts.sum(axis=0)).ravel()
+        keep = np.sort((-totals).argsort()[:max_features])
+    job_counts = job_counts[:, keep]
+    doc_counts = np.diff(job_counts.indptr)
+    idf = diags(np.log((job_counts.shape[0] + 1) / (doc_counts + 1)) + 1)
+    return normalize(job_counts @ idf), normalize(user_counts[:, keep] @ idf)
+
+
+def _squared_norms(matrix):
+    return np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel()
+
+
+def _sweep_task(ngram_range, max_features_list):
+    """Metrics of every max_features x skill weight config of one ngram range (runs in a worker)."""
+    state = _SWEEP_STATE
+    job_counts, user_counts = _count_terms(ngram_range)
+    rows = []
+    for max_features in max_features_list:
+        jobs, users = _text_block(job_counts, user_counts, max_features)
+        text_dot = (users @ jobs.T).toarray()
+        text_users, text_jobs = _squared_norms(users), _squared_norms(jobs)
+        for weight in state["skill_weights"]:
+            w2 = weight ** 2
+            norms = np.sqrt(text_users + w2 * state["skill_users"])[:, None] * np.sqrt(text_jobs + w2 * state["skill_jobs"])
+            scores = np.divide(text_dot + w2 * state["skill_dot"], norms, out=np.zeros_like(text_dot), where=norms > 0)
+            _, per_k, reciprocal_ranks = ranking_metrics(scores, state["relevance"], state["ks"])
+
+            row = {"max_features": max_features, "ngram_range": f"{ngram_range[0]}-{ngram_range[1]}", "skill_weight": weight}
+            for k, metrics in per_k.items():
+                row.update({f"{name}@{k}": values.mean() for name, values in metrics.items()})
+            row["MRR"] = reciprocal_ranks.mean()
+            rows.append(row)
+    return rows
+
+
+def _sweep_tasks(ngram_ranges, max_features, n_workers):
+    # One task per ngram range keeps its term counts in one place; ranges are only split
+    # (each part recounting) when there are fewer of them than workers
+    parts = max(1, min(len(max_features), -(-n_workers // len(ngram_ranges))))
+    size = -(-len(max_features) // parts)
+    return [
+        (ngram_range, list(max_features[i:i + size]))
+        for ngram_range in ngram_ranges
+        for i in range(0, len(max_features), size)
+    ]
+
+
+def sweep(jobs_df, ground_truth, max_features=SWEEP_MAX_FEATURES, ngram_ranges=SWEEP_NGRAMS,
+          skill_weights=SWEEP_SKILL_WEIGHTS, n_jobs=None, ks=KS):
+    """Evaluates every combination of the given settings over n_jobs processes (None = all cores).
+
+    Returns one row of profile-averaged metrics per config, best NDCG@max(ks) first. The
+    profile x job score matrices are dense, so memory grows with profiles x postings.
+    """
+    jobs_df = clean_job_frame(jobs_df)
+    user_skills = [clean_user_skills(data["skills"]) for data in ground_truth.values()]
+    mlb = MultiLabelBinarizer().fit(jobs_df['skills_list'])
+    job_skills, user_skill = skill_matrix(jobs_df['skills_list'], mlb), skill_matrix(user_skills, mlb)
+    state = {
+        "job_texts": [f"{title} {skills}" for title, skills in zip(jobs_df['Job Title'], jobs_df['Required Skills'])],
+        "user_texts": [" ".join(skills) for skills in user_skills],
+        "skill_dot": (user_skill @ job_skills.T).toarray(),
+        "skill_users": _squared_norms(user_skill),
+        "skill_jobs": _squared_norms(job_skills),
+        "relevance": relevance_matrix(ground_truth, len(jobs_df)),
+        "skill_weights": list(skill_weights),
+        "ks": tuple(ks)
+    }
+
+    n_workers = n_jobs if n_jobs is not None and n_jobs >= 1 else os.cpu_count() or 1
+    tasks = _sweep_tasks(list(ngram_ranges), list(max_features), n_workers)
+    n_workers = min(n_workers, len(tasks))
+    if n_workers == 1:
+        _init_sweep_worker(state)
+        results = [_sweep_task(*task) for task in tasks]
+    else:
+        # Spawned, like parallel_features; the shared state is sent once per worker
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_sweep_worker, initargs=(state,)) as pool:
+            results = list(pool.map(_sweep_task, *zip(*tasks)))
+
+    df_results = pd.DataFrame([row for rows in results for row in rows])
+    return df_results.sort_values(f"NDCG@{max(ks)}", ascending=False, kind='stable').reset_index(drop=True)
+
+
+def run_sweep(jobs_df, ground_truth, output="sweep_results.csv", **settings):
+    print("\n" + "="*80)
+    print("JOB RECOMMENDATION MODEL - PARAMETER SWEEP")
+    print("="*80)
+    print(f"📊 {len(jobs_df)} job postings, {len(ground_truth)} labelled profiles")
+    print(f"🔧 Current settings: max_features={TFIDF_PARAMS['max_features']}, "
+          f"ngram_range={TFIDF_PARAMS['ngram_range']}, skill weight={SKILL_WEIGHT}")
+
+    df_results = sweep(jobs_df, ground_truth, **settings)
+
+    print(f"\n🏆 Top configurations ({len(df_results)} evaluated):")
+    print(df_results.head(10).round(3).to_string(index=False))
+
+    df_results.to_csv(output, index=False)
+    print(f"\n💾 Results saved to: {output}\n")
+    return df_results
+
+
+def _parse_list(text, parse):
+    return [parse(item) for item in text.split(",") if item.strip()]
+
+
+def _parse_ngram(text):
+    low, high = text.split("-")
+    return int(low), int(high)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the job recommender on labelled skill profiles.")
+    parser.add_argument("--sweep", action="store_true", help="Evaluate a grid of feature settings instead of the current ones")
+    parser.add_argument("--data", default=None, help="Postings CSV (default: the built-in test dataset)")
+    parser.add_argument("--ground-truth", default=None,
+                        help='JSON for --data: {"profile": {"skills": [...], "relevant_jobs": [row, ...]}}')
+    parser.add_argument("--max-features", default=",".join(map(str, SWEEP_MAX_FEATURES)))
+    parser.add_argument("--ngrams", default=",".join(f"{lo}-{hi}" for lo, hi in SWEEP_NGRAMS), help="e.g. 1-1,1-2")
+    parser.add_argument("--skill-weights", default=",".join(map(str, SWEEP_SKILL_WEIGHTS)))
+    parser.add_argument("--workers", type=int, default=None, help="Sweep worker processes (default: all cores)")
+    parser.add_argument("--output", default=None, help="CSV path (default: evaluation_metrics.csv / sweep_results.csv)")
+    args = parser.parse_args()
+
+    jobs_df = ground_truth = None
+    if args.data is not None:
+        if args.ground_truth is None:
+            parser.error("--data needs --ground-truth")
+        jobs_df = pd.read_csv(args.data)
+        with open(args.ground_truth) as f:
+            ground_truth = json.load(f)
+
+    if args.sweep:
+        if jobs_df is None:
+            jobs_df, ground_truth = create_test_dataset()
+        run_sweep(
+            jobs_df, ground_truth, output=args.output or "sweep_results.csv",
+            max_features=_parse_list(args.max_features, int),
+            ngram_ranges=_parse_list(args.ngrams, _parse_ngram),
+            skill_weights=_parse_list(args.skill_weights, float),
+            n_jobs=args.workers
+        )
+    else:
+        evaluate(jobs_df, ground_truth, output=args.output or "evaluation_metrics.csv")
+
+
 if __name__ == "__main__":
-    evaluate()
+    main()
@@ -0,0 +1,223 @@
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import MultiLabelBinarizer
+
+from compact_embeddings import append_rows, compact_embeddings, embedding_precision
+from job_recommendation_model import build_metadata_index, metadata_mask, transform_postings
+from inverted_index import build_inverted_index
+from low_rank import reproject
+from parallel_features import transform_postings_parallel
+from posting_table import as_posting_table
+
+
+# Incremental Index Updates
+# Every function takes the current model state (tfidf, mlb, embeddings, df, index, inverted)
+# and returns only the fields it replaced, leaving the inputs untouched so readers that
+# still hold the old objects keep a consistent view. Added postings go to small tail blocks
+# of the embeddings, posting table and metadata index, so an insert copies those tails
+# only; refresh_idf folds them into the main arrays (a rebuild starts without any).
+
+def make_postings(rows):
+    """Builds cleaned posting rows (same rules as clean_job_data) from dicts.
+
+    Each dict needs "Job Title", "Company" and "Required Skills" (a comma-separated string);
+    any extra columns such as "Location" are kept. Raises ValueError for a row without a
+    title or without any skill, which would otherwise add an empty skill to the vocabulary.
+    """
+    postings = pd.DataFrame(rows)
+    postings['skills_list'] = postings['Required Skills'].apply(
+        lambda x: [s.strip().lower() for s in str(x).split(',') if s.strip()]
+    )
+    for title, skills in zip(postings['Job Title'], postings['skills_list']):
+        if not str(title).strip():
+            raise ValueError("A posting needs a job title")
+        if not skills:
+            raise ValueError(f"Posting {title!r} lists no required skills")
+    return postings
+
+def grow_skill_vocabulary(mlb, skills_lists):
+    """Returns an MLB whose classes_ are the old ones plus any unseen skills appended at the end.
+
+    Appending keeps every existing skill column where it is, so the current embeddings
+    only need extra (empty) columns.
+    """
+    known = set(mlb.classes_)
+    new_skills = sorted({s for skills in skills_lists for s in skills} - known)
+    if not new_skills:
+        return mlb
+    return MultiLabelBinarizer(classes=list(mlb.classes_) + new_skills).fit([])
+
+def _merge_ids(ids, added, start):
+    merged = dict(ids)
+    for value, new_ids in added.items():
+        merged[value] = np.concatenate([ids.get(value, np.array([], dtype=int)), new_ids + start])
+    return merged
+
+def _extend_metadata_index(index, postings, start):
+    """The index with postings (ids from start) added to its tail block; main arrays are shared."""
+    added = build_metadata_index(postings)
+    tail = index["tail"] or {
+        "location": {}, "company": {}, "remote": np.zeros(0, dtype=bool), "alive": np.zeros(0, dtype=bool)
+    }
+    extended = dict(index, size=index["size"] + added["size"])
+    extended["tail"] = {
+        "location": _merge_ids(tail["location"], added["location"], start),
+        "company": _merge_ids(tail["company"], added["company"], start),
+        "remote": np.concatenate([tail["remote"], added["remote"]]),
+        "alive": np.concatenate([tail["alive"], added["alive"]])
+    }
+    return extended
+
+def fold_metadata_index(index):
+    """The index with its tail block merged into the main arrays."""
+    tail = index["tail"]
+    if tail is None:
+        return index
+    return dict(
+        index,
+        location=_merge_ids(index["location"], tail["location"], 0),
+        company=_merge_ids(index["company"], tail["company"], 0),
+        remote=metadata_mask(index, "remote"),
+        alive=metadata_mask(index, "alive"),
+        tail=None
+    )
+
+def add_postings(state, postings):
+    """Appends cleaned postings to the model without refitting anything.
+
+    Text is embedded with the current TF-IDF vocabulary and IDF (unseen words are ignored
+    until the next full retrain; IDF drifts until refresh_idf). Unseen skills grow the skill
+    vocabulary. The inverted index is left as is: search covers appended rows directly.
+    New rows are stored in the precision of the current embeddings, behind the existing
+    rows (see append_rows), so the cost depends on the postings added since the last
+    refresh, not on the corpus.
+
+    Returns (updated fields, new posting ids).
+    """
+    mlb = grow_skill_vocabulary(state["mlb"], postings['skills_list'])
+    embeddings = state["embeddings"]
+    start = embeddings.shape[0]
+    new_rows = compact_embeddings(transform_postings(postings, state["tfidf"], mlb), embedding_precision(embeddings))
+    updates = {
+        "mlb": mlb,
+        # New skill columns are simply empty for the old rows
+        "embeddings": append_rows(embeddings, new_rows),
+        "df": as_posting_table(state["df"]).append(postings),
+        "index": _extend_metadata_index(state["index"], postings, start),
+        "pending_updates": state.get("pending_updates", 0) + len(postings)
+    }
+    return updates, list(range(start, start + len(postings)))
+
+def remove_postings(state, job_ids):
+    """Tombstones postings so they are never returned; ids of other postings stay stable."""
+    index = dict(state["index"])
+    job_ids = np.asarray(job_ids, dtype=np.int64)
+    main = len(index["alive"])
+    was_alive = 0
+    in_main = job_ids[job_ids < main]
+    if len(in_main):
+        was_alive += int(index["alive"][np.unique(in_main)].sum())
+        index["alive"] = index["alive"].copy()
+        index["alive"][in_main] = False
+    in_tail = job_ids[job_ids >= main] - main
+    if len(in_tail):
+        tail = dict(index["tail"])
+        was_alive += int(tail["alive"][np.unique(in_tail)].sum())
+        tail["alive"] = tail["alive"].copy()
+        tail["alive"][in_tail] = False
+        index["tail"] = tail
+    index["deleted"] = index["deleted"] + was_alive
+    return {
+        "index": index,
+        "pending_updates": state.get("pending_updates", 0) + len(job_ids)
+    }
+
+def needs_idf_refresh(state, ratio):
+    """True once the postings added/removed since the last refresh exceed ratio of the corpus."""
+    return state.get("pending_updates", 0) > ratio * max(state["index"]["size"], 1)
+
+def refresh_idf(state, n_jobs=1):
+    """Recomputes IDF over the live postings and re-embeds every row with the same vocabularies.
+
+    Row positions (job ids) and tombstones are preserved; the inverted index is rebuilt so
+    it covers every row again, and a low-rank projection is re-applied to the new rows.
+    n_jobs > 1 re-embeds the rows on that many processes. The embeddings keep their storage
+    precision. Postings added since the last refresh are folded into the main arrays.
+    A similarity graph scored the old rows, so it is dropped: /jobs/{id}/similar scores
+    exactly until the next rebuild builds a new one (see build_similarity_graph).
+    """
+    index = fold_metadata_index(state["index"])
+    df, alive = as_posting_table(state["df"]).fold(), index["alive"]
+    live_corpus = [
+        f"{title} {skills}"
+        for title, skills, is_alive in zip(df['Job Title'], df['Required Skills'], alive) if is_alive
+    ]
+
+    params = state["tfidf"].get_params()
+    params["vocabulary"] = state["tfidf"].vocabulary_
+    tfidf = TfidfVectorizer(**params).fit(live_corpus)
+
+    embeddings = compact_embeddings(
+        transform_postings_parallel(df, tfidf, state["mlb"], n_jobs), embedding_precision(state["embeddings"])
+    )
+    updates = {
+        "tfidf": tfidf,
+        "embeddings": embeddings,
+        "df": df,
+        "index": index,
+        "inverted": build_inverted_index(embeddings),
+        "pending_updates": 0
+    }
+    if state.get("low_rank") is not None:
+        updates["low_rank"] = reproject(state["low_rank"], embeddings)
+    if state.get("similar") is not None:
+        updates["similar"] = None
+    return updates
+
+def posting_key(title, company, required_skills):
+    """Identifies a posting across rebuilds, where positions (job ids) change."""
+    return (str(title), str(company), str(required_skills))
+
+def replay_journal(state, journal):
+    """Re-applies postings added/removed through the API onto a freshly rebuilt model.
+
+    journal holds ("add", row dict) and ("delete", posting_key) entries in order; each
+    delete removes one live posting with that key. Entries the rebuilt corpus already
+    reflects are dropped instead of applied twice: an add whose posting it already has
+    (e.g. once the posting was written to the CSV) and a delete whose posting it no longer
+    has. Returns (the updated state, the entries that were applied), the latter being the
+    journal to keep for the next rebuild.
+    """
+    state = dict(state)
+    df, alive = state["df"], metadata_mask(state["index"], "alive")
+    live, absorbable = {}, {}
+    for job_id, key in enumerate(zip(df['Job Title'], df['Company'], df['Required Skills'])):
+        if alive[job_id]:
+            live.setdefault(posting_key(*key), []).append(job_id)
+    for key, job_ids in live.items():
+        absorbable[key] = len(job_ids)
+
+    applied, added, deleted = [], [], []
+    next_id = state["embeddings"].shape[0]
+    for op, entry in journal:
+        if op == "add":
+            key = posting_key(entry["Job Title"], entry["Company"], entry["Required Skills"])
+            if absorbable.get(key, 0):
+                absorbable[key] -= 1
+                continue
+            live.setdefault(key, []).append(next_id)
+            next_id += 1
+            added.append(entry)
+        else:
+            if not live.get(entry):
+                continue
+            deleted.append(live[entry].pop())
+        applied.append((op, entry))
+
+    if added:
+        updates, _ = add_postings(state, make_postings(added))
+        state.update(updates)
+    if deleted:
+        state.update(remove_postings(state, deleted))
+    return state, tuple(applied)
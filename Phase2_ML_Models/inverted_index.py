@@ -0,0 +1,101 @@
+import numpy as np
+
+
+# Inverted Index
+def build_inverted_index(embeddings):
+    """Turns the posting embeddings into per-feature posting lists.
+
+    Column j of the CSC matrix lists every posting that contains TF-IDF token / skill j
+    together with its (already normalized) weight. max_weights holds the largest weight
+    of each list, which bounds how much a feature can add to any posting's score.
+    """
+    postings = embeddings.tocsc()
+    postings.sort_indices()
+    max_weights = np.asarray(postings.max(axis=0).todense()).ravel()
+    return {
+        "indptr": postings.indptr,
+        "indices": postings.indices,
+        "data": postings.data,
+        "max_weights": max_weights,
+        "size": embeddings.shape[0]
+    }
+
+def _posting_list(index, col):
+    start, end = index["indptr"][col], index["indptr"][col + 1]
+    return index["indices"][start:end], index["data"][start:end]
+
+def _accumulate(rows, weights):
+    """Sums weights per posting id; returns (sorted unique ids, scores)."""
+    if len(rows) == 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=float)
+    ids, inverse = np.unique(rows, return_inverse=True)
+    return ids, np.bincount(inverse, weights=weights)
+
+def _allowed(rows, candidates):
+    return np.ones(len(rows), dtype=bool) if candidates is None else np.isin(rows, candidates)
+
+def search_inverted_index(index, user_vec, top_k=3, offset=0, candidates=None, early_termination=False):
+    """Scores only the postings that share at least one feature with the query.
+
+    user_vec is a single normalized query row. Work grows with the lengths of the
+    query's posting lists rather than with the number of postings. With
+    early_termination the max-score bound stops admitting new postings once no
+    unseen posting can still reach the requested page.
+
+    Returns (posting ids, scores) for a candidate set that contains the exact top
+    offset + top_k postings; the caller picks the final page from it.
+    """
+    cols, query_weights = user_vec.indices, user_vec.data
+    # Features added after the index was built (new skills) have no posting list here
+    known = cols < len(index["indptr"]) - 1
+    cols, query_weights = cols[known], query_weights[known]
+    if len(cols) == 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=float)
+
+    if not early_termination:
+        rows, weights = [], []
+        for col, q in zip(cols, query_weights):
+            plist, pdata = _posting_list(index, col)
+            keep = _allowed(plist, candidates)
+            rows.append(plist[keep])
+            weights.append(pdata[keep] * q)
+        return _accumulate(np.concatenate(rows), np.concatenate(weights))
+
+    # Max-score: visit features by decreasing upper bound of their contribution
+    upper_bounds = query_weights * index["max_weights"][cols]
+    order = np.argsort(-upper_bounds, kind='stable')
+    cols, query_weights, upper_bounds = cols[order], query_weights[order], upper_bounds[order]
+    # remaining[j] = best score a posting can still collect from features j onwards
+    remaining = np.append(np.cumsum(upper_bounds[::-1])[::-1], 0.0)
+    needed = offset + top_k
+
+    ids = np.array([], dtype=np.int64)
+    scores = np.array([], dtype=float)
+    admitting = True
+
+    for j, (col, q) in enumerate(zip(cols, query_weights)):
+        plist, pdata = _posting_list(index, col)
+
+        if admitting:
+            keep = _allowed(plist, candidates)
+            ids, scores = _accumulate(np.concatenate([ids, plist[keep]]),
+                                      np.concatenate([scores, pdata[keep] * q]))
+        else:
+            # Only postings already in the running can still change rank
+            pos = np.searchsorted(plist, ids)
+            hit = pos < len(plist)
+            hit[hit] = plist[pos[hit]] == ids[hit]
+            scores[hit] += pdata[pos[hit]] * q
+
+        if len(ids) < needed:
+            continue
+        # Partial scores are lower bounds (all weights are non-negative)
+        threshold = np.partition(scores, len(scores) - needed)[len(scores) - needed]
+        # An unseen posting could still tie the threshold and win on its lower id
+        if threshold > remaining[j + 1]:
+            admitting = False
+        # Drop postings that cannot reach the page even with every remaining feature
+        alive = scores + remaining[j + 1] >= threshold
+        ids, scores = ids[alive], scores[alive]
+
+    return ids, scores
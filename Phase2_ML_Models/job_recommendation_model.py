@@ -4,18 +4,32 @@ import os
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.preprocessing import MultiLabelBinarizer, normalize
 from sklearn.metrics.pairwise import cosine_similarity
-from scipy.sparse import hstack
+from scipy.sparse import csr_matrix, hstack
 import joblib
+import hashlib
+from compact_embeddings import score_chunk_size, score_postings
+from inverted_index import search_inverted_index
+from ranking import DUPLICATE_COLUMN, duplicate_counts, recommendation_record, top_k_indices
+from posting_table import as_posting_table, take_postings
+from stage_timing import timed_stage
 
 # Data Cleaning
-def clean_job_data(file_path):
-    """Loads and standardizes raw job data as per Phase 1."""
-    df = pd.read_csv(file_path)
+def clean_job_data(file_path, dedup_threshold=None):
+    """Loads and standardizes raw job data as per Phase 1.
+
+    dedup_threshold collapses near-duplicate postings (reposts) into one; see posting_dedup.
+    """
+    df = clean_job_frame(pd.read_csv(file_path))
+    if dedup_threshold:
+        from posting_dedup import collapse_near_duplicates
+        df = collapse_near_duplicates(df, dedup_threshold)
+    return df
+
+def clean_job_frame(df):
+    """Applies the Phase 1 cleaning rules to loaded rows (a whole file or one CSV chunk)."""
     # Drop rows where critical info is missing
     df = df.dropna(subset=['Job Title', 'Required Skills']).copy()
     
-
-    
     # Standardize skills into lowercase lists
     df['skills_list'] = df['Required Skills'].apply(
         lambda x: [s.strip().lower() for s in str(x).split(',')]
@@ -23,79 +37,421 @@ def clean_job_data(file_path):
     return df
 
 # Data Preprocessing
-def extract_features(df):
-    """Converts text and skills into mathematical vectors using Sparse Matrices."""
+# IMPROVEMENT: Use ngram_range=(1, 2) to capture phrases like "Data Scientist"
+TFIDF_PARAMS = {"stop_words": 'english', "max_features": 2000, "ngram_range": (1, 2)}
+# IMPROVEMENT: Weight skills higher than general text (2x importance)
+SKILL_WEIGHT = 2.0
+
+def extract_features(df, n_jobs=1):
+    """Converts text and skills into mathematical vectors using Sparse Matrices.
+
+    n_jobs > 1 shards the work over that many processes (None = all cores); see
+    parallel_features. The result is identical either way.
+    """
+    if n_jobs != 1:
+        from parallel_features import extract_features_parallel
+        return extract_features_parallel(df, n_jobs)
+
     # Combine Job Title and Required Skills for context
     text_corpus = df['Job Title'] + " " + df['Required Skills']
     
-    # TF-IDF for text features
-    # IMPROVEMENT: Use ngram_range=(1, 2) to capture phrases like "Data Scientist"
-    tfidf = TfidfVectorizer(stop_words='english', max_features=2000, ngram_range=(1, 2))
-    text_features = tfidf.fit_transform(text_corpus)
+    # TF-IDF for text features, multi-hot encoding for skills
+    tfidf = TfidfVectorizer(**TFIDF_PARAMS).fit(text_corpus)
+    mlb = MultiLabelBinarizer().fit(df['skills_list'])
     
-    # Multi-hot encoding for Skills
-    mlb = MultiLabelBinarizer()
-    skill_features = mlb.fit_transform(df['skills_list'])
+    # Rows are embedded independently once the vocabularies are fixed, so every build
+    # path (serial, parallel, streaming, incremental) produces bit-identical rows
+    return tfidf, mlb, transform_postings(df, tfidf, mlb)
+
+def skill_matrix(skills_lists, mlb):
+    """Sparse multi-hot encoding of skill lists against mlb.classes_ (unknown skills are ignored)."""
+    lookup = {skill: i for i, skill in enumerate(mlb.classes_)}
+    indptr, indices = [0], []
+    for skills in skills_lists:
+        indices.extend(sorted({lookup[s] for s in skills if s in lookup}))
+        indptr.append(len(indices))
+    return csr_matrix(
+        (np.ones(len(indices)), indices, indptr), shape=(len(indptr) - 1, len(mlb.classes_))
+    )
+
+def transform_postings(df, tfidf, mlb):
+    """Embeds postings with already fitted vectorizers.
+
+    df can be a cleaned DataFrame, a PostingTable or a dict of column lists.
+    """
+    text_corpus = [f"{title} {skills}" for title, skills in zip(df['Job Title'], df['Required Skills'])]
+    text_features = tfidf.transform(text_corpus)
     
-    # IMPROVEMENT: Weight skills higher than general text (2x importance)
+    # Skills weigh more than general text (SKILL_WEIGHT)
     # This ensures that exact skill matches drive the recommendation more than generic text
-    skill_features = skill_features.astype(float) * 2.0
+    skill_features = skill_matrix(df['skills_list'], mlb) * SKILL_WEIGHT
     
     # Combine text and skill features using sparse-safe hstack
     combined = hstack([text_features, skill_features])
     
     # L2 Normalization ensures fair similarity matching
-    normalized_embeddings = normalize(combined, norm='l2')
+    return normalize(combined, norm='l2')
+
+def clean_user_skills(user_skills):
+    """Applies the same lowercase/strip cleaning used for job skills."""
+    return [s.strip().lower() for s in user_skills]
+
+def vectorize_users(user_skills_batch, tfidf, mlb):
+    """Stacks many cleaned skill profiles into one normalized CSR query matrix."""
+    user_texts = [" ".join(skills) for skills in user_skills_batch]
+
+    # Vectorize all users in one call each (one row per user)
+    with timed_stage("tfidf_transform"):
+        user_text_vecs = tfidf.transform(user_texts)
+    with timed_stage("mlb_transform"):
+        user_skill_vecs = csr_matrix(mlb.transform(user_skills_batch))
+
+    with timed_stage("combine"):
+        # Apply same weighting to user skills
+        user_skill_vecs = user_skill_vecs.astype(float) * SKILL_WEIGHT
+
+        # Combine and normalize every user row
+        user_combined = hstack([user_text_vecs, user_skill_vecs], format='csr')
+        return normalize(user_combined, norm='l2')
+
+def _normalize_key(value):
+    if value is None or value != value:  # missing (None / NaN)
+        return ""
+    return str(value).strip().lower()
+
+# Short location names (the frontend sends "SF" and "NY") and the values they stand for
+LOCATION_ALIASES = {"sf": "san francisco", "nyc": "new york", "ny": "new york"}
+
+def _normalize_location(value):
+    key = _normalize_key(value)
+    return LOCATION_ALIASES.get(key, key)
+
+def normalize_filters(location=None, company=None, remote_only=False):
+    """The (location, company, remote_only) filters as the metadata index matches them.
+
+    Values are lowercased and stripped ("" = no filter) and location aliases expanded. The
+    location "remote" selects remote postings (as remote_only does), whatever their
+    Location says. Equal results mean equal candidates, so this also keys caches.
+    """
+    location, company = _normalize_location(location), _normalize_key(company)
+    if location == "remote":
+        location, remote_only = "", True
+    return location, company, bool(remote_only)
+
+def build_metadata_index(df):
+    """Builds the filter indexes once at model load.
+
+    Location and company map each lowercased value (location aliases expanded) to the
+    sorted posting indices that carry it; remote and alive are boolean masks over all postings. Postings added later
+    go to a separate "tail" block of the same fields (see incremental_index), so read the
+    masks through metadata_mask.
+    """
+    postings = as_posting_table(df)
+    size = len(postings)
+    index = {
+        "size": size, "location": {}, "company": {}, "remote": np.zeros(size, dtype=bool),
+        # Tombstones: deleted postings stay in the matrix but are never returned
+        "alive": np.ones(size, dtype=bool), "deleted": 0, "tail": None
+    }
+    
+    for field, column, normalize in (("location", "Location", _normalize_location), ("company", "Company", _normalize_key)):
+        if column not in postings:
+            continue
+        keys = np.array([normalize(v) for v in postings[column]], dtype=object)
+        values, codes = np.unique(keys, return_inverse=True)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(values) + 1))
+        index[field] = {
+            value: order[bounds[i]:bounds[i + 1]]
+            for i, value in enumerate(values) if value
+        }
+    
+    # A posting counts as remote if it has a truthy Remote flag or "remote" in its location
+    if "Remote" in postings:
+        index["remote"] |= np.array(
+            [_normalize_key(v) in ("1", "true", "yes", "remote") for v in postings["Remote"]], dtype=bool
+        )
+    if "Location" in postings:
+        index["remote"] |= np.array(["remote" in _normalize_key(v) for v in postings["Location"]], dtype=bool)
     
-    return tfidf, mlb, normalized_embeddings
+    return index
 
-def get_recommendations(user_skills, tfidf, mlb, embeddings, df, top_k=3):
-    """Matches user skills against the job database and identifies gaps."""
-    # Preprocess user input
-    user_skills_clean = [s.strip().lower() for s in user_skills]
+def metadata_mask(metadata_index, field):
+    """The "remote" or "alive" mask over every posting, appended ones included."""
+    tail = metadata_index.get("tail")
+    return metadata_index[field] if tail is None else np.concatenate([metadata_index[field], tail[field]])
+
+def metadata_ids(metadata_index, field, value):
+    """Sorted ids of the postings whose location or company is value (already normalized)."""
+    empty = np.array([], dtype=int)
+    ids = metadata_index[field].get(value, empty)
+    tail = metadata_index.get("tail")
+    return ids if tail is None else np.concatenate([ids, tail[field].get(value, empty)])
+
+def is_alive(metadata_index, job_id):
+    """True if job_id is a posting of the model that has not been deleted."""
+    if not 0 <= job_id < metadata_index["size"]:
+        return False
+    main = len(metadata_index["alive"])
+    return bool(metadata_index["alive"][job_id] if job_id < main else metadata_index["tail"]["alive"][job_id - main])
+
+def filter_candidates(metadata_index, location=None, company=None, remote_only=False):
+    """Resolves filters to the posting indices that satisfy all of them (None = no filter).
+
+    See normalize_filters for how values match; a corpus without a Location (or Company)
+    column matches no location (or company).
+    """
+    location, company, remote_only = normalize_filters(location, company, remote_only)
+    candidates = None
     
-    # Vectorize user input
-    user_text_vec = tfidf.transform([" ".join(user_skills_clean)])
-    user_skill_vec = mlb.transform([user_skills_clean])
+    for field, value in (("location", location), ("company", company)):
+        if not value:
+            continue
+        matches = metadata_ids(metadata_index, field, value)
+        candidates = matches if candidates is None else np.intersect1d(candidates, matches, assume_unique=True)
     
-    # Apply same weighting to user skills
-    user_skill_vec = user_skill_vec.astype(float) * 2.0
+    if remote_only:
+        remote = metadata_mask(metadata_index, "remote")
+        candidates = np.flatnonzero(remote) if candidates is None else candidates[remote[candidates]]
+    
+    if metadata_index["deleted"]:
+        alive = metadata_mask(metadata_index, "alive")
+        candidates = np.flatnonzero(alive) if candidates is None else candidates[alive[candidates]]
+        
+    return candidates
+
+def posting_skill_rows(embeddings, tfidf, indices):
+    """Skill ids of the given postings as CSR rows over mlb.classes_.
+
+    The skill block of the embeddings (every column after the TF-IDF vocabulary) is the
+    postings' multi-hot skill matrix built with the model, so nothing is parsed per posting.
+    """
+    return embeddings[indices][:, len(tfidf.vocabulary_):].tocsr()
+
+def build_recommendations(indices, scores, user_vec, tfidf, mlb, embeddings, df, job_ids=None):
+    """Turns ranked posting indices and their scores into the API response records.
+
+    Missing skills of all returned postings come from one boolean lookup of their skill
+    ids against the user's (taken from the skill block of the query row user_vec). df can
+    be a cleaned DataFrame or a PostingTable; rows are read by position. job_ids are the
+    ids reported for the rows (default: indices).
+    """
+    indices = np.asarray(indices, dtype=np.int64)
+    job_ids = indices if job_ids is None else np.asarray(job_ids, dtype=np.int64)
+    deduplicated = DUPLICATE_COLUMN in df
+    rows = take_postings(df, indices, ['Job Title', 'Company', 'skills_list'] + ([DUPLICATE_COLUMN] if deduplicated else []))
+    counts = duplicate_counts(rows[DUPLICATE_COLUMN]) if deduplicated else [1] * len(indices)
+    skill_rows = posting_skill_rows(embeddings, tfidf, indices)
     
-    # Combine and normalize user vector
-    user_combined = hstack([user_text_vec, user_skill_vec])
-    user_vec = normalize(user_combined, norm='l2')
+    # Skill Gap Analysis: a posting skill is missing unless the user has the same skill id
+    n_text = len(tfidf.vocabulary_)
+    user_skill_ids = user_vec.indices[user_vec.indices >= n_text] - n_text
+    user_has = np.zeros(skill_rows.shape[1], dtype=bool)
+    user_has[user_skill_ids[user_skill_ids < len(user_has)]] = True
+    missing = ~user_has[skill_rows.indices]
+    classes = np.asarray(mlb.classes_, dtype=object)
     
-    # Calculate Similarity Scores (Dot product of normalized vectors)
-    scores = (embeddings @ user_vec.T).toarray().flatten()
-    top_indices = scores.argsort()[-top_k:][::-1]
+    # Positions of each posting's first 3 missing skills, all rows at once
+    missing_at = np.flatnonzero(missing)
+    row_of = np.searchsorted(skill_rows.indptr, missing_at, side='right') - 1
+    first_of_row = np.searchsorted(missing_at, skill_rows.indptr[:-1])
+    rank = np.arange(len(missing_at)) - first_of_row[row_of]
+    top_missing = missing_at[rank < 3]
+    bounds = np.searchsorted(top_missing, skill_rows.indptr)
+    top_missing_names = classes[skill_rows.indices[top_missing]].tolist()
     
     recommendations = []
-    for idx in top_indices:
-        job = df.iloc[idx]
+    for row, (job_id, title, company, job_skills, score, count) in enumerate(
+        zip(job_ids.tolist(), rows['Job Title'], rows['Company'], rows['skills_list'], np.asarray(scores, dtype=float).tolist(), counts)
+    ):
+        recommendations.append(recommendation_record(
+            job_id, title, company, score, top_missing_names[bounds[row]:bounds[row + 1]], job_skills, count
+        ))
         
-        # Skill Gap Analysis: Identify missing skills for the user
-        job_skills_set = set(job['skills_list'])
-        user_skills_set = set(user_skills_clean)
-        missing_skills = list(job_skills_set - user_skills_set)
+    return recommendations
+
+def get_recommendations(user_skills, tfidf, mlb, embeddings, df, top_k=3, offset=0, candidates=None,
+                        inverted_index=None, early_termination=False):
+    """Matches user skills against the job database and identifies gaps.
+
+    offset pages through the ranking and candidates (see filter_candidates) restricts it.
+    Passing an inverted_index (see inverted_index.build_inverted_index) scores only the
+    postings that share a token or skill with the user instead of the whole matrix, so it
+    only ever returns postings with a positive score; exact scoring fills the page up to
+    top_k with zero-score postings (lowest index first), as it always has.
+    """
+    # Preprocess user input
+    with timed_stage("clean"):
+        user_skills_clean = clean_user_skills(user_skills)
+    
+    # Vectorize user input
+    user_vec = vectorize_users([user_skills_clean], tfidf, mlb)
+    
+    if inverted_index is not None:
+        # Candidate-pruned scoring over the query's posting lists only
+        with timed_stage("inverted_search"):
+            ids, candidate_scores = search_inverted_index(
+                inverted_index, user_vec, top_k, offset, candidates, early_termination
+            )
+            if early_termination and len(ids):
+                # Max-score adds features in bound order; the few survivors are re-scored
+                # from their rows so scores (and ties) are exactly those of full scoring
+                candidate_scores = score_postings(embeddings[ids], user_vec).ravel()
+            indexed = inverted_index["size"]
+            if embeddings.shape[0] > indexed:
+                # Postings appended after the index was built are scored directly
+                tail_scores = score_postings(embeddings[indexed:], user_vec).ravel()
+                tail_ids = np.arange(indexed, embeddings.shape[0])
+                keep = tail_scores > 0
+                if candidates is not None:
+                    keep &= np.isin(tail_ids, candidates)
+                ids = np.concatenate([ids, tail_ids[keep]])
+                candidate_scores = np.concatenate([candidate_scores, tail_scores[keep]])
+        with timed_stage("top_k"):
+            best = top_k_indices(candidate_scores, top_k, offset)
+        with timed_stage("assemble"):
+            return build_recommendations(ids[best], candidate_scores[best], user_vec, tfidf, mlb, embeddings, df)
+    
+    # Calculate Similarity Scores (Dot product of normalized vectors)
+    with timed_stage("score"):
+        scores = score_postings(embeddings, user_vec).ravel()
+    with timed_stage("top_k"):
+        top_indices = top_k_indices(scores, top_k, offset, candidates)
+    
+    with timed_stage("assemble"):
+        return build_recommendations(top_indices, scores[top_indices], user_vec, tfidf, mlb, embeddings, df)
+
+def get_recommendations_batch(user_skills_batch, tfidf, mlb, embeddings, df, top_k=3, chunk_size=512,
+                              candidates=None, offset=0):
+    """Scores many skill profiles at once with a single sparse matrix product per chunk.
+
+    top_k and offset are either one value for every profile or one value per profile.
+    Returns one recommendation list per profile, in the same order as the input.
+    """
+    with timed_stage("clean"):
+        users_clean = [clean_user_skills(skills) for skills in user_skills_batch]
+    top_ks = np.broadcast_to(top_k, len(users_clean))
+    offsets = np.broadcast_to(offset, len(users_clean))
+    results = []
+
+    # Chunk the users so the dense (postings x users) score block stays within SCORE_BLOCK_BYTES
+    chunk_size = score_chunk_size(embeddings.shape[0], chunk_size)
+    for start in range(0, len(users_clean), chunk_size):
+        chunk = users_clean[start:start + chunk_size]
+        query_matrix = vectorize_users(chunk, tfidf, mlb)
         
-        recommendations.append({
-            "Job Title": job['Job Title'],
-            "Company": job['Company'],
-            "Match Score": f"{round(scores[idx] * 100, 1)}%",
-            "Missing Skills": missing_skills[:3], # Suggest top 3 missing skills
-            "Required Skills": job['skills_list']  # Include all required skills for frontend
-        })
+        # One product scores every posting against every user in the chunk
+        with timed_stage("score"):
+            score_block = score_postings(embeddings, query_matrix)
         
-    return recommendations
+        for col in range(len(chunk)):
+            scores = score_block[:, col]
+            with timed_stage("top_k"):
+                top_indices = top_k_indices(scores, int(top_ks[start + col]), int(offsets[start + col]), candidates)
+            with timed_stage("assemble"):
+                results.append(build_recommendations(
+                    top_indices, scores[top_indices], query_matrix[col], tfidf, mlb, embeddings, df
+                ))
+            
+    return results
+
+def get_skill_gap(user_skills, tfidf, mlb, embeddings, top_n=500, max_skills=10, candidates=None):
+    """Ranks the skills a user lacks by demand among their top_n most similar postings.
+
+    Each posting in the pool (positive score only) adds its similarity score to every skill
+    it requires, so demand from close matches counts most. Demand, posting counts and the
+    user's own skills all come from one sparse product over the pool's skill rows.
+
+    Returns {"pool_size", "skills_to_develop", "matched_skills"}; each skill entry carries
+    its score-weighted "priority" (share of the pool's total score), "frequency" (postings
+    requiring it) and "share" (frequency / pool_size).
+    """
+    user_vec = vectorize_users([clean_user_skills(user_skills)], tfidf, mlb)
+    scores = score_postings(embeddings, user_vec).ravel()
+    pool = top_k_indices(scores, top_n, candidates=candidates)
+    pool = pool[scores[pool] > 0]
+    pool_scores = scores[pool]
+    
+    skill_rows = posting_skill_rows(embeddings, tfidf, pool)
+    skill_rows.data = np.ones_like(skill_rows.data)
+    demand = skill_rows.T @ pool_scores
+    frequency = np.bincount(skill_rows.indices, minlength=skill_rows.shape[1])
+    total_score = pool_scores.sum() or 1.0
+    
+    n_text = len(tfidf.vocabulary_)
+    user_has = np.zeros(skill_rows.shape[1], dtype=bool)
+    user_has[user_vec.indices[user_vec.indices >= n_text] - n_text] = True
+    classes = np.asarray(mlb.classes_, dtype=object)
+    
+    def ranked(mask, limit=None):
+        ids = np.flatnonzero(mask & (frequency > 0))
+        ids = ids[np.argsort(-demand[ids], kind='stable')][:limit]
+        return [
+            {
+                "skill": classes[i],
+                "priority": round(float(demand[i] / total_score), 4),
+                "frequency": int(frequency[i]),
+                "share": round(float(frequency[i] / max(len(pool), 1)), 4)
+            }
+            for i in ids
+        ]
+    
+    return {
+        "pool_size": len(pool),
+        "skills_to_develop": ranked(~user_has, max_skills),
+        "matched_skills": ranked(user_has)
+    }
 
-def save_model_artifacts(filepath, tfidf, mlb, embeddings, df):
-    """Saves the model artifacts to a single file using joblib."""
+class ModelVersion:
+    """Incremental content hash of an embedding matrix fed as consecutive row blocks.
+
+    Hashing the whole matrix at once or block by block gives the same version, so a model
+    written in chunks (see streaming_pipeline) gets the version of the equivalent matrix.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.nnz = 0
+        self._digests = {name: hashlib.blake2b(digest_size=8) for name in ("indptr", "indices", "data")}
+        self._digests["indptr"].update(np.zeros(1, dtype=np.int64).tobytes())
+
+    def update(self, block):
+        block = block.tocsr()
+        self._digests["indptr"].update((block.indptr[1:].astype(np.int64) + self.nnz).tobytes())
+        self._digests["indices"].update(block.indices.astype(np.int64).tobytes())
+        self._digests["data"].update(np.ascontiguousarray(block.data).tobytes())
+        self.rows += block.shape[0]
+        self.nnz += block.nnz
+
+    def hexdigest(self, n_features, n_skills):
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(repr(((self.rows, n_features), self.nnz, n_skills)).encode())
+        for part in self._digests.values():
+            digest.update(part.digest())
+        return digest.hexdigest()
+
+def model_version(embeddings, mlb):
+    """Content hash identifying a trained model (used to key caches)."""
+    version = ModelVersion()
+    version.update(embeddings)
+    return version.hexdigest(embeddings.shape[1], len(mlb.classes_))
+
+def save_model_artifacts(filepath, tfidf, mlb, embeddings, df, similar=None, low_rank=None):
+    """Saves the model artifacts to a single file using joblib.
+
+    similar is the optional job-to-job similarity graph (see similarity_graph) and
+    low_rank the optional low-rank projection (see low_rank).
+    """
     artifacts = {
         "tfidf": tfidf,
         "mlb": mlb,
         "embeddings": embeddings,
         "df": df
     }
+    if similar is not None:
+        artifacts["similar"] = similar
+    if low_rank is not None:
+        artifacts["low_rank"] = low_rank
     joblib.dump(artifacts, filepath)
     print(f"Model artifacts saved to {filepath}")
 
@@ -121,8 +477,10 @@ if __name__ == "__main__":
     # 1. Clean
     jobs_df = clean_job_data(DATA_PATH)
     
-    # 2. Preprocess
-    tfidf_model, mlb_model, job_vectors = extract_features(jobs_df)
+    # 2. Preprocess (SKILLSYNC_TRAIN_WORKERS > 1 vectorizes on several cores)
+    tfidf_model, mlb_model, job_vectors = extract_features(
+        jobs_df, n_jobs=int(os.environ.get("SKILLSYNC_TRAIN_WORKERS", "1"))
+    )
     
     # 3. Save Model (Local Test)
     # Target Phase 3 directory
@@ -0,0 +1,331 @@
+import json
+import math
+import os
+import re
+import shutil
+
+import numpy as np
+
+from posting_table import SkillListColumn, StringColumn, as_posting_table
+from ranking import DUPLICATE_COLUMN, duplicate_counts, recommendation_record, top_k_indices
+
+
+# Lite Serving Runtime
+# Answering a query needs only the fitted TF-IDF vocabulary and IDF weights, the
+# tokenization rules (lowercasing, token pattern, stop words, n-gram range), the skill
+# vocabulary and the embeddings. export_lite_model writes exactly those as flat .npy
+# files plus a JSON tokenizer spec; LiteModel serves them with numpy and the standard
+# library only, so an API worker never imports pandas, scikit-learn or scipy.
+#
+# Scores are bit-identical to get_recommendations (exact retrieval): the query row is
+# built with the same float operations as TfidfVectorizer.transform + normalize, and the
+# embeddings are stored by feature (CSC), so every posting's score is accumulated in the
+# same order and precision as the CSR product in score_postings.
+
+FORMAT_VERSION = 1
+MANIFEST = "lite.json"
+COLUMNS = ("Job Title", "Company")
+
+# ======================== EXPORT ========================
+def tokenizer_spec(tfidf):
+    """The TfidfVectorizer settings the lite vectorizer reproduces; raises on anything else."""
+    params = tfidf.get_params()
+    unsupported = {
+        "analyzer": "word", "input": "content", "preprocessor": None, "tokenizer": None,
+        "strip_accents": None, "binary": False, "norm": ("l2", None)
+    }
+    for name, allowed in unsupported.items():
+        if params[name] not in (allowed if isinstance(allowed, tuple) else (allowed,)):
+            raise ValueError(f"The lite runtime does not support TfidfVectorizer({name}={params[name]!r})")
+    if np.dtype(params["dtype"]) != np.float64:
+        raise ValueError("The lite runtime needs a float64 TfidfVectorizer")
+    stop_words = tfidf.get_stop_words()
+    return {
+        "lowercase": params["lowercase"],
+        "token_pattern": params["token_pattern"],
+        "ngram_range": list(params["ngram_range"]),
+        "stop_words": sorted(stop_words) if stop_words is not None else None,
+        "sublinear_tf": params["sublinear_tf"],
+        "use_idf": params["use_idf"],
+        "norm": params["norm"]
+    }
+
+def _save(dirpath, name, array):
+    np.save(os.path.join(dirpath, f"{name}.npy"), np.ascontiguousarray(array))
+
+def _save_strings(dirpath, name, values):
+    column = StringColumn.from_values(values)
+    _save(dirpath, f"{name}_offsets", column.offsets)
+    _save(dirpath, f"{name}_bytes", column.buffer)
+
+def export_lite_model(dirpath, tfidf, mlb, embeddings, df, version=None):
+    """Writes the lite runtime files of a trained model to dirpath (replaced atomically).
+
+    embeddings may be stored in any precision (see compact_embeddings); the values are
+    kept as stored. The vectorizers are only read through their fitted attributes.
+    """
+    from job_recommendation_model import SKILL_WEIGHT
+
+    tmp_dir = f"{dirpath}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    vocabulary = tfidf.vocabulary_
+    terms = [None] * len(vocabulary)
+    for term, i in vocabulary.items():
+        terms[i] = term
+    _save_strings(tmp_dir, "text_vocabulary", terms)
+    _save(tmp_dir, "idf", tfidf.idf_ if tfidf.use_idf else np.ones(len(terms)))
+    _save_strings(tmp_dir, "skill_classes", list(mlb.classes_))
+
+    # The embeddings by feature: posting lists in posting order, values as stored
+    n_rows, n_features = embeddings.shape
+    indptr, indices = np.asarray(embeddings.indptr), np.asarray(embeddings.indices)
+    order = np.argsort(indices, kind='stable')
+    feature_indptr = np.zeros(n_features + 1, dtype=np.int64)
+    np.cumsum(np.bincount(indices, minlength=n_features), out=feature_indptr[1:])
+    rows = np.repeat(np.arange(n_rows, dtype=np.int32 if n_rows <= np.iinfo(np.int32).max else np.int64), np.diff(indptr))
+    _save(tmp_dir, "feature_indptr", feature_indptr)
+    _save(tmp_dir, "feature_postings", rows[order])
+    _save(tmp_dir, "feature_values", np.asarray(embeddings.data)[order])
+    del order, rows
+    row_scale = getattr(embeddings, "row_scale", None)
+    if row_scale is not None:
+        _save(tmp_dir, "row_scale", row_scale)
+
+    # Each posting's skill ids (the skill block of its embedding row), for missing skills
+    n_text = len(terms)
+    is_skill = np.concatenate([[0], np.cumsum(indices >= n_text)])
+    _save(tmp_dir, "posting_skills_indptr", is_skill[indptr])
+    _save(tmp_dir, "posting_skills_ids", (indices[indices >= n_text] - n_text).astype(np.int32))
+
+    postings = as_posting_table(df)
+    for i, name in enumerate(COLUMNS):
+        _save_strings(tmp_dir, f"column{i}", postings[name] if name in postings else [None] * len(postings))
+    skills = postings['skills_list']
+    if not isinstance(skills, SkillListColumn):
+        skills = SkillListColumn.from_values(list(skills), sorted({s for row in skills for s in row}))
+    _save(tmp_dir, "skills_list_indptr", skills.indptr)
+    _save(tmp_dir, "skills_list_ids", skills.ids)
+    _save_strings(tmp_dir, "skills_list_vocabulary", list(skills.vocabulary))
+    if DUPLICATE_COLUMN in postings:
+        _save(tmp_dir, "duplicate_counts", np.array(duplicate_counts(postings[DUPLICATE_COLUMN]), dtype=np.int32))
+
+    precision = (
+        getattr(embeddings, "precision", None)
+        or ("float32" if embeddings.dtype == np.float32 else "float64")
+    )
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "version": version,
+        "precision": precision,
+        "shape": [n_rows, n_features],
+        "skill_weight": SKILL_WEIGHT,
+        "tokenizer": tokenizer_spec(tfidf)
+    }
+    with open(os.path.join(tmp_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    old_dir = f"{dirpath}.old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(dirpath):
+        os.replace(dirpath, old_dir)
+    os.replace(tmp_dir, dirpath)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    print(f"Lite model exported to {dirpath}")
+    return dirpath
+
+
+# ======================== SERVING ========================
+class LiteVectorizer:
+    """Builds the normalized query row of vectorize_users from the exported spec."""
+
+    def __init__(self, spec, terms, idf, skill_classes, skill_weight):
+        self.lowercase = spec["lowercase"]
+        self.token_pattern = re.compile(spec["token_pattern"])
+        self.ngram_range = tuple(spec["ngram_range"])
+        self.stop_words = frozenset(spec["stop_words"]) if spec["stop_words"] is not None else None
+        self.sublinear_tf = spec["sublinear_tf"]
+        self.norm = spec["norm"]
+        self.vocabulary = {term: i for i, term in enumerate(terms)}
+        self.idf = np.asarray(idf).tolist()
+        self.skill_ids = {skill: i for i, skill in enumerate(skill_classes)}
+        self.skill_weight = float(skill_weight)
+
+    def analyze(self, text):
+        """Tokens and word n-grams of one document, as TfidfVectorizer's analyzer yields them."""
+        if self.lowercase:
+            text = text.lower()
+        tokens = self.token_pattern.findall(text)
+        if self.stop_words is not None:
+            tokens = [t for t in tokens if t not in self.stop_words]
+        min_n, max_n = self.ngram_range
+        terms = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n, len(tokens)) + 1):
+            terms.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return terms
+
+    @staticmethod
+    def _normalize(values):
+        # Sequential sum of squares, as sklearn's inplace_csr_row_normalize_l2
+        total = 0.0
+        for value in values:
+            total += value * value
+        if total == 0.0:
+            return values
+        total = math.sqrt(total)
+        return [value / total for value in values]
+
+    def transform(self, skills):
+        """Feature ids (ascending) and values of one cleaned skill profile."""
+        counts = {}
+        for term in self.analyze(" ".join(skills)):
+            feature = self.vocabulary.get(term)
+            if feature is not None:
+                counts[feature] = counts.get(feature, 0) + 1
+        text_ids = sorted(counts)
+        text_values = [math.log(counts[i]) + 1.0 if self.sublinear_tf else float(counts[i]) for i in text_ids]
+        text_values = [value * self.idf[i] for value, i in zip(text_values, text_ids)]
+        if self.norm == "l2":
+            text_values = self._normalize(text_values)
+
+        # Skills the model knows, weighted like the postings' skill block
+        offset = len(self.vocabulary)
+        skill_ids = sorted({offset + self.skill_ids[s] for s in skills if s in self.skill_ids})
+        values = self._normalize(text_values + [self.skill_weight] * len(skill_ids))
+        return np.array(text_ids + skill_ids, dtype=np.int64), np.array(values, dtype=np.float64)
+
+
+class LiteModel:
+    """A model exported with export_lite_model, opened memory-mapped."""
+
+    def __init__(self, dirpath):
+        with open(os.path.join(dirpath, MANIFEST)) as f:
+            manifest = json.load(f)
+        if manifest["format_version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported lite format {manifest['format_version']} in {dirpath}")
+        load = lambda name: np.load(os.path.join(dirpath, f"{name}.npy"), mmap_mode='r')
+        strings = lambda name: StringColumn(load(f"{name}_offsets"), load(f"{name}_bytes"))
+
+        self.version = manifest["version"]
+        self.precision = manifest["precision"]
+        self.shape = tuple(manifest["shape"])
+        self.skill_classes = list(strings("skill_classes"))
+        self.vectorizer = LiteVectorizer(
+            manifest["tokenizer"], list(strings("text_vocabulary")), load("idf"),
+            self.skill_classes, manifest["skill_weight"]
+        )
+        self.feature_indptr = np.asarray(load("feature_indptr"))
+        self.feature_postings = load("feature_postings")
+        self.feature_values = load("feature_values")
+        self.row_scale = load("row_scale") if self.precision == "int8" else None
+        # Scores come out in the dtype of the CSR product of score_postings
+        self.score_dtype = np.float64 if self.precision == "float64" else np.float32
+
+        self.posting_skills_indptr = np.asarray(load("posting_skills_indptr"))
+        self.posting_skills_ids = load("posting_skills_ids")
+        self.columns = {name: strings(f"column{i}") for i, name in enumerate(COLUMNS)}
+        self.columns['skills_list'] = SkillListColumn(
+            load("skills_list_indptr"), load("skills_list_ids"), list(strings("skills_list_vocabulary"))
+        )
+        # Written only for deduplicated corpora
+        has_counts = os.path.exists(os.path.join(dirpath, "duplicate_counts.npy"))
+        self.duplicate_counts = load("duplicate_counts") if has_counts else None
+
+    def __len__(self):
+        return self.shape[0]
+
+    def score(self, features, values):
+        """Scores of every posting against one query row (see LiteVectorizer.transform)."""
+        starts = self.feature_indptr[features]
+        lengths = self.feature_indptr[features + 1] - starts
+        ends = np.cumsum(lengths)
+        positions = np.arange(ends[-1] if len(ends) else 0) + np.repeat(starts - (ends - lengths), lengths)
+
+        # Features in ascending order: each posting sums its terms in the CSR row's order
+        products = np.asarray(self.feature_values[positions], dtype=self.score_dtype)
+        products *= np.repeat(values.astype(self.score_dtype), lengths)
+        scores = np.zeros(self.shape[0], dtype=self.score_dtype)
+        np.add.at(scores, np.asarray(self.feature_postings[positions]), products)
+        if self.row_scale is not None:
+            scores *= self.row_scale
+        return scores
+
+    def missing_skills(self, indices, user_skill_ids, limit=3):
+        """The first limit skills (in skill id order) of each posting the user lacks."""
+        classes = self.skill_classes
+        user_has = set(user_skill_ids.tolist())
+        missing = []
+        for i in indices.tolist():
+            ids = self.posting_skills_ids[self.posting_skills_indptr[i]:self.posting_skills_indptr[i + 1]]
+            missing.append([classes[s] for s in ids.tolist() if s not in user_has][:limit])
+        return missing
+
+    def recommend(self, user_skills, top_k=3, offset=0):
+        """Same records as get_recommendations with exact retrieval and no filters."""
+        features, values = self.vectorizer.transform([s.strip().lower() for s in user_skills])
+        scores = self.score(features, values)
+        indices = np.asarray(top_k_indices(scores, top_k, offset), dtype=np.int64)
+
+        n_text = len(self.vectorizer.vocabulary)
+        missing = self.missing_skills(indices, features[features >= n_text] - n_text)
+        titles = self.columns['Job Title'].take(indices)
+        companies = self.columns['Company'].take(indices)
+        job_skills = self.columns['skills_list'].take(indices)
+        counts = [1] * len(indices) if self.duplicate_counts is None else self.duplicate_counts[indices].tolist()
+        return [
+            recommendation_record(job_id, title, company, score, gaps, skills, count)
+            for job_id, title, company, score, gaps, skills, count in zip(
+                indices.tolist(), titles, companies, np.asarray(scores[indices], dtype=float).tolist(), missing, job_skills, counts
+            )
+        ]
+
+
+def load_lite_model(dirpath):
+    """Opens a lite model directory, or returns None if there is none."""
+    if not os.path.exists(os.path.join(dirpath, MANIFEST)):
+        return None
+    return LiteModel(dirpath)
+
+
+def _load_model(path):
+    if os.path.isdir(path):
+        from artifact_store import load_mmap_artifacts
+        return load_mmap_artifacts(path)
+    from job_recommendation_model import load_model_artifacts
+    return load_model_artifacts(path)
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export a trained model for the numpy-only lite runtime.")
+    parser.add_argument("model", help="joblib model file or memory-mapped model directory")
+    parser.add_argument("output", help="Directory to write the lite model to")
+    parser.add_argument("--check", type=int, default=200,
+                        help="Postings whose skills are used as profiles to compare against get_recommendations (0 = skip)")
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    from job_recommendation_model import get_recommendations, model_version
+
+    model = _load_model(args.model)
+    version = model.get("version") or model_version(model["embeddings"], model["mlb"])
+    export_lite_model(args.output, model["tfidf"], model["mlb"], model["embeddings"], model["df"], version)
+    if not args.check:
+        return
+
+    lite = LiteModel(args.output)
+    skills_lists = as_posting_table(model["df"])['skills_list']
+    rows = np.linspace(0, len(skills_lists) - 1, min(args.check, len(skills_lists))).astype(int)
+    mismatches = 0
+    for i in rows.tolist():
+        profile = list(skills_lists[i])
+        expected = get_recommendations(profile, model["tfidf"], model["mlb"], model["embeddings"], model["df"], top_k=args.top_k)
+        mismatches += lite.recommend(profile, top_k=args.top_k) != expected
+    print(f"{len(rows) - mismatches}/{len(rows)} profiles give identical recommendations")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+import argparse
+import os
+import time
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+import compact_embeddings
+from compact_embeddings import CompactEmbeddings, row_block, score_postings
+from job_recommendation_model import build_recommendations, clean_user_skills, vectorize_users
+from ranking import top_k_indices
+from stage_timing import timed_stage
+
+
+# Low-Rank Dense Scoring
+# Exact scoring is a sparse product over the whole embedding matrix: few operations per
+# posting, but scattered reads of the query columns. This mode projects every posting into
+# `dim` (64-256) dense dimensions, stored as one contiguous float32 (postings x dim) array,
+# so a batch of queries is scored with a single BLAS matrix product. The projection is
+#   svd    - the top right singular vectors of the embeddings (TruncatedSVD, fitted on a
+#            sample of the postings): the best rank-dim approximation of the scores
+#   random - a sparse random projection, which preserves dot products on average and
+#            needs no fitting
+# Projected scores only approximate the cosine similarity, so the best `rerank` postings
+# of each query are scored again exactly with their sparse rows; with rerank = 0 the
+# approximate ranking and scores are returned as they are. Postings appended after the
+# projection was built are always scored exactly. `python low_rank.py <model>` reports the
+# latency and recall of each setting against the exact path.
+
+DEFAULT_DIM = 128
+DEFAULT_RERANK = 500
+PROJECTIONS = ("svd", "random")
+# Postings the SVD is fitted on (the components of a large corpus barely change beyond this)
+FIT_SAMPLE = 100_000
+# Postings projected per step
+PROJECT_BLOCK = 1 << 16
+
+def _float32_csr(embeddings):
+    return (embeddings.tocsr() if isinstance(embeddings, CompactEmbeddings) else embeddings).astype(np.float32)
+
+def fit_components(embeddings, dim=DEFAULT_DIM, method="svd", seed=0):
+    """(features x dim) float32 matrix projecting embedding rows (and queries) into dim dimensions."""
+    if method not in PROJECTIONS:
+        raise ValueError(f"Unknown projection {method!r}; expected one of {PROJECTIONS}")
+    n, n_features = embeddings.shape
+    if method == "random":
+        from sklearn.random_projection import SparseRandomProjection
+        # Only the number of features is used by the fit
+        projection = SparseRandomProjection(n_components=dim, random_state=seed).fit(csr_matrix((1, n_features)))
+        return np.ascontiguousarray(projection.components_.T.toarray(), dtype=np.float32)
+
+    from sklearn.decomposition import TruncatedSVD
+    rows = np.arange(n)
+    if n > FIT_SAMPLE:
+        rows = np.sort(np.random.default_rng(seed).choice(n, size=FIT_SAMPLE, replace=False))
+    # Cannot keep more dimensions than the sample has features (or rows)
+    svd = TruncatedSVD(n_components=min(dim, n_features - 1, len(rows) - 1), random_state=seed)
+    svd.fit(_float32_csr(embeddings[rows]))
+    return np.ascontiguousarray(svd.components_.T, dtype=np.float32)
+
+def project_postings(embeddings, components):
+    """Contiguous (postings x dim) float32 projections of the embedding rows, in bounded blocks."""
+    if embeddings.shape[1] > components.shape[0]:
+        # Skill columns added since the fit are not projected (as in low_rank_search)
+        components = np.vstack([components, np.zeros((embeddings.shape[1] - components.shape[0], components.shape[1]), np.float32)])
+    projected = np.empty((embeddings.shape[0], components.shape[1]), dtype=np.float32)
+    for start in range(0, embeddings.shape[0], PROJECT_BLOCK):
+        stop = min(start + PROJECT_BLOCK, embeddings.shape[0])
+        projected[start:stop] = row_block(embeddings, start, stop) @ components
+    return projected
+
+def build_low_rank(embeddings, dim=DEFAULT_DIM, method="svd", seed=0):
+    """{"components", "postings"}: the fitted projection and every posting projected with it."""
+    components = fit_components(embeddings, dim, method, seed)
+    return {"components": components, "postings": project_postings(embeddings, components)}
+
+def reproject(low_rank, embeddings):
+    """The same projection applied to re-embedded postings (e.g. after an IDF refresh)."""
+    return {"components": low_rank["components"], "postings": project_postings(embeddings, low_rank["components"])}
+
+def _dense_shortlists(projected, postings, needs, candidates):
+    """Each query's needs[q] best postings by projected score: lists of ids (ascending) and scores.
+
+    Postings are scored in blocks so the (queries x block) float32 scores stay within
+    compact_embeddings.SCORE_BLOCK_BYTES; each block's best are merged into a running top-k.
+    Ids stay in ascending order, so ties go to the lower id as in top_k_indices.
+    """
+    n_queries, covered = projected.shape[0], postings.shape[0]
+    step = max(1, min(PROJECT_BLOCK, compact_embeddings.SCORE_BLOCK_BYTES // (4 * max(n_queries, 1))))
+    best_ids = [np.array([], dtype=np.int64)] * n_queries
+    best_scores = [np.array([], dtype=np.float32)] * n_queries
+    for start in range(0, covered, step):
+        stop = min(start + step, covered)
+        ids = np.arange(start, stop)
+        if candidates is not None:
+            ids = candidates[np.searchsorted(candidates, start):np.searchsorted(candidates, stop)]
+            if not len(ids):
+                continue
+        block = projected @ postings[start:stop].T
+        if candidates is not None:
+            block = block[:, ids - start]
+        for q in range(n_queries):
+            keep = np.sort(top_k_indices(block[q], int(needs[q])))
+            merged_ids = np.concatenate([best_ids[q], ids[keep]])
+            merged_scores = np.concatenate([best_scores[q], block[q, keep]])
+            keep = np.sort(top_k_indices(merged_scores, int(needs[q])))
+            best_ids[q], best_scores[q] = merged_ids[keep], merged_scores[keep]
+    return best_ids, best_scores
+
+def low_rank_search(low_rank, embeddings, queries, top_k, offset=0, candidates=None, rerank=DEFAULT_RERANK):
+    """One page of the best postings for every query row (CSR): a list of (ids, scores).
+
+    The max(rerank, offset + top_k) best postings by projected score are re-scored exactly
+    (rerank = 0 keeps the projected scores). top_k and offset are one value or one per query.
+    """
+    top_ks = np.broadcast_to(top_k, queries.shape[0])
+    offsets = np.broadcast_to(offset, queries.shape[0])
+    covered = low_rank["postings"].shape[0]
+
+    # Postings appended after the projection was built, restricted like the others
+    tail = np.arange(covered, embeddings.shape[0])
+    if candidates is not None:
+        candidates = np.sort(candidates)
+        tail = candidates[candidates >= covered]
+        candidates = candidates[candidates < covered]
+
+    needs = offsets + top_ks
+    if rerank:
+        needs = np.maximum(needs, rerank)
+    with timed_stage("dense_score"):
+        # Skill columns added after the projection was built only count in the exact re-scoring
+        projected = np.asarray(queries[:, :low_rank["components"].shape[0]] @ low_rank["components"], dtype=np.float32)
+        shortlists, approximate = _dense_shortlists(projected, low_rank["postings"], needs, candidates)
+
+    if not rerank:
+        pages = []
+        for col, shortlist in enumerate(shortlists):
+            scores = approximate[col]
+            if len(tail):
+                shortlist = np.concatenate([shortlist, tail])
+                scores = np.concatenate([scores, score_postings(embeddings[tail], queries[col]).ravel()])
+            best = top_k_indices(scores, int(top_ks[col]), int(offsets[col]))
+            pages.append((shortlist[best], scores[best]))
+        return pages
+
+    shortlists = [np.concatenate([shortlist, tail]) for shortlist in shortlists]
+    with timed_stage("rerank"):
+        # All shortlisted rows at once, each multiplied by its own query row
+        lengths = [len(shortlist) for shortlist in shortlists]
+        rows = embeddings[np.concatenate(shortlists)]
+        owners = np.repeat(np.arange(queries.shape[0]), lengths)
+        exact = np.asarray(rows.multiply(queries[owners].astype(rows.dtype)).sum(axis=1)).ravel()
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+    pages = []
+    for col, shortlist in enumerate(shortlists):
+        scores = exact[bounds[col]:bounds[col + 1]]
+        best = top_k_indices(scores, int(top_ks[col]), int(offsets[col]))
+        pages.append((shortlist[best], scores[best]))
+    return pages
+
+def get_recommendations_low_rank(user_skills_batch, tfidf, mlb, embeddings, df, low_rank, top_k=3, offset=0,
+                                 candidates=None, rerank=DEFAULT_RERANK, chunk_size=512):
+    """get_recommendations_batch with low-rank scoring (see low_rank_search)."""
+    with timed_stage("clean"):
+        users_clean = [clean_user_skills(skills) for skills in user_skills_batch]
+    top_ks = np.broadcast_to(top_k, len(users_clean))
+    offsets = np.broadcast_to(offset, len(users_clean))
+    results = []
+    for start in range(0, len(users_clean), chunk_size):
+        chunk = users_clean[start:start + chunk_size]
+        query_matrix = vectorize_users(chunk, tfidf, mlb)
+        pages = low_rank_search(
+            low_rank, embeddings, query_matrix, top_ks[start:start + len(chunk)], offsets[start:start + len(chunk)],
+            candidates, rerank
+        )
+        for col, (ids, scores) in enumerate(pages):
+            with timed_stage("assemble"):
+                results.append(build_recommendations(ids, scores, query_matrix[col], tfidf, mlb, embeddings, df))
+    return results
+
+
+# ======================== LATENCY / RECALL REPORT ========================
+def _recall(reference_scores, ids, k):
+    """Share of the returned ids scoring at least the exact k-th best (ties are not misses)."""
+    want = reference_scores[top_k_indices(reference_scores, k)]
+    if len(want) == 0:
+        return 1.0
+    return float(np.mean(reference_scores[ids[:k]] >= want[-1])) if len(ids) else 0.0
+
+def _per_query_ms(search, queries, batch):
+    start = time.perf_counter()
+    for at in range(0, queries.shape[0], batch):
+        search(queries[at:at + batch])
+    return (time.perf_counter() - start) * 1000 / queries.shape[0]
+
+def low_rank_report(embeddings, low_rank, queries, k=10, rerank=DEFAULT_RERANK, batch=1, reference=None):
+    """Recall@k (mean and worst query) of low-rank search against exact scoring, with both latencies.
+
+    reference is the exact (postings x queries) score block if already computed.
+    """
+    if reference is None:
+        reference = score_postings(embeddings, queries)
+    recalls = [
+        _recall(reference[:, col], ids, k)
+        for col, (ids, _) in enumerate(low_rank_search(low_rank, embeddings, queries, k, rerank=rerank))
+    ]
+    exact_ms = _per_query_ms(
+        lambda block: [top_k_indices(scores, k) for scores in score_postings(embeddings, block).T], queries, batch
+    )
+    dense_ms = _per_query_ms(lambda block: low_rank_search(low_rank, embeddings, block, k, rerank=rerank), queries, batch)
+    return {
+        "dim": low_rank["components"].shape[1],
+        "rerank": rerank,
+        "k": k,
+        "mean_recall": round(float(np.mean(recalls)), 4),
+        "min_recall": round(float(np.min(recalls)), 4),
+        "exact_ms": round(exact_ms, 3),
+        "low_rank_ms": round(dense_ms, 3)
+    }
+
+def main():
+    from compact_embeddings import _load_model
+    from posting_table import take_postings
+
+    parser = argparse.ArgumentParser(description="Latency / recall of low-rank dense scoring against the exact path.")
+    parser.add_argument("model", help="joblib model file or memory-mapped model directory")
+    parser.add_argument("--dims", default="64,128,256")
+    parser.add_argument("--methods", default="svd,random")
+    parser.add_argument("--reranks", default=f"0,{DEFAULT_RERANK}", help="Candidates re-scored exactly (0 = none)")
+    parser.add_argument("--sample", type=int, default=500, help="Postings whose skills are used as profiles")
+    parser.add_argument("--batch", type=int, default=1, help="Queries scored together when timing")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", action="store_true",
+                        help="Store the first --dims / --methods projection in the model directory")
+    args = parser.parse_args()
+    if args.save and not os.path.isdir(args.model):
+        parser.error("--save stores the projection in a memory-mapped model directory; got a file")
+
+    model = _load_model(args.model)
+    embeddings = model["embeddings"]
+    rows = np.random.default_rng(args.seed).choice(embeddings.shape[0], size=min(args.sample, embeddings.shape[0]), replace=False)
+    profiles = [list(skills) for skills in take_postings(model["df"], rows, ['skills_list'])['skills_list']]
+    queries = vectorize_users(profiles, model["tfidf"], model["mlb"])
+    reference = score_postings(embeddings, queries)
+    print(f"{embeddings.shape[0]} postings, {len(rows)} profiles, top {args.k}, batches of {args.batch}")
+
+    for method in args.methods.split(","):
+        for dim in (int(d) for d in args.dims.split(",")):
+            start = time.perf_counter()
+            low_rank = build_low_rank(embeddings, dim, method, args.seed)
+            built = time.perf_counter() - start
+            if args.save and (method, dim) == (args.methods.split(",")[0], int(args.dims.split(",")[0])):
+                from artifact_store import save_low_rank
+                save_low_rank(args.model, low_rank)
+            for rerank in (int(r) for r in args.reranks.split(",")):
+                report = low_rank_report(embeddings, low_rank, queries, args.k, rerank, args.batch, reference)
+                print(f"{method:>6} {dim:>4}d rerank {rerank:>4}: recall@{args.k} mean {report['mean_recall']:.4f} "
+                      f"min {report['min_recall']:.4f} | exact {report['exact_ms']:.2f} ms, "
+                      f"low-rank {report['low_rank_ms']:.2f} ms per query | "
+                      f"{low_rank['postings'].nbytes / 2**20:.0f} MB, built in {built:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from scipy.sparse import vstack
+
+from job_recommendation_model import extract_features, transform_postings
+from streaming_pipeline import count_terms, fit_vectorizers, merge_term_counts
+
+
+# Parallel Feature Extraction
+# Once the vocabulary and IDF are known every posting is embedded on its own, so the
+# postings are cut into contiguous shards, vectorized in worker processes and the CSR
+# blocks are stacked back in order. Fitting is sharded the same way: workers count terms
+# and skills and the parent merges the counts (see streaming_pipeline.fit_vectorizers).
+# Workers are spawned rather than forked so this is safe to call from a threaded server.
+
+SHARDS_PER_WORKER = 4  # smaller shards even out uneven rows across workers
+
+def _resolve_workers(n_jobs):
+    if n_jobs is None or n_jobs < 1:
+        return os.cpu_count() or 1
+    return n_jobs
+
+def shard_postings(df, n_shards):
+    """Cuts the columns transform_postings needs into contiguous shards (dicts of lists)."""
+    titles, skills, skills_lists = (list(df[name]) for name in ('Job Title', 'Required Skills', 'skills_list'))
+    size = -(-len(titles) // max(n_shards, 1)) or 1
+    return [
+        {'Job Title': titles[i:i + size], 'Required Skills': skills[i:i + size], 'skills_list': skills_lists[i:i + size]}
+        for i in range(0, len(titles), size)
+    ]
+
+def _count_shard(shard):
+    return count_terms([shard])
+
+def _transform_shard(shard, tfidf, mlb):
+    return transform_postings(shard, tfidf, mlb).tocsr()
+
+def _executor(n_workers):
+    return ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context("spawn"))
+
+def _transform_sharded(pool, shards, tfidf, mlb):
+    blocks = list(pool.map(_transform_shard, shards, [tfidf] * len(shards), [mlb] * len(shards)))
+    return vstack(blocks, format='csr')
+
+def transform_postings_parallel(df, tfidf, mlb, n_jobs=None):
+    """transform_postings over n_jobs processes (None = all cores); identical result."""
+    n_workers = _resolve_workers(n_jobs)
+    if n_workers == 1 or len(df['skills_list']) < 2:
+        return transform_postings(df, tfidf, mlb)
+    shards = shard_postings(df, n_workers * SHARDS_PER_WORKER)
+    with _executor(n_workers) as pool:
+        return _transform_sharded(pool, shards, tfidf, mlb)
+
+def extract_features_parallel(df, n_jobs=None):
+    """extract_features over n_jobs processes (None = all cores); identical result."""
+    n_workers = _resolve_workers(n_jobs)
+    if n_workers == 1:
+        return extract_features(df)
+    shards = shard_postings(df, n_workers * SHARDS_PER_WORKER)
+    with _executor(n_workers) as pool:
+        tfidf, mlb = fit_vectorizers(merge_term_counts(pool.map(_count_shard, shards)))
+        return tfidf, mlb, _transform_sharded(pool, shards, tfidf, mlb)
@@ -0,0 +1,161 @@
+import re
+import zlib
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from ranking import DUPLICATE_COLUMN
+
+
+# Near-Duplicate Postings
+# Feeds repost the same role with small wording changes. Each posting is reduced to the
+# set of its title words and skills, summarized by a MinHash signature (NUM_PERM minimum
+# hashes, whose agreement rate estimates the Jaccard similarity of two sets). LSH cuts the
+# signature into BANDS bands; postings of the same company sharing any band are
+# candidates, and a candidate joins its bucket's first posting when the signatures agree
+# on at least `threshold` of the hashes. Every step is a vectorized pass or a sort, so the
+# cost grows about linearly with the number of postings. Each group of near-duplicates
+# collapses into its first posting, which records the group size in DUPLICATE_COLUMN.
+
+NUM_PERM = 64
+BANDS = 8  # 8 bands of 8 hashes: pairs above ~0.77 similarity become candidates
+DEFAULT_THRESHOLD = 0.8
+SIGNATURE_CELLS = 1 << 18  # (postings x tokens) hashed per step (bounds the temporary arrays)
+
+_TITLE_WORD = re.compile(r"\w+")
+
+def _permutations(num_perm, seed):
+    # Multiply-shift hashing: h(x) = high 32 bits of (a * x + b) mod 2**64, a odd
+    rng = np.random.default_rng(seed)
+    return (
+        rng.integers(0, 2**63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1),
+        rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+    )
+
+def posting_tokens(title, skills):
+    """The set a posting is compared by: its lowercased title words and its skills."""
+    tokens = {"t:" + word for word in _TITLE_WORD.findall(str(title).lower())}
+    tokens.update("s:" + skill for skill in skills)
+    return tokens
+
+def minhash_signatures(titles, skills_lists, num_perm=NUM_PERM, seed=0):
+    """(postings x num_perm) uint32 MinHash signatures of the posting token sets.
+
+    Tokens are hashed with CRC-32, so signatures do not depend on the process and can be
+    computed chunk by chunk. Every distinct token is hashed once; postings are then
+    processed in blocks of similar token count, padded to a rectangle and reduced with min.
+    """
+    a, b = _permutations(num_perm, seed)
+    token_ids = {}
+    flat, lengths = [], []
+    for title, skills in zip(titles, skills_lists):
+        tokens = posting_tokens(title, skills)
+        flat.extend(token_ids.setdefault(token, len(token_ids)) for token in tokens)
+        lengths.append(len(tokens))
+
+    crc = np.fromiter((zlib.crc32(token.encode("utf-8")) for token in token_ids), dtype=np.uint64, count=len(token_ids))
+    # One extra all-max row pads short postings
+    hashed = np.full((len(token_ids) + 1, num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+    hashed[:-1] = (crc[:, None] * a + b) >> np.uint64(32)
+
+    flat = np.array(flat, dtype=np.int64)
+    lengths = np.array(lengths, dtype=np.int64)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+    order = np.argsort(lengths, kind='stable')
+    signatures = np.empty((len(lengths), num_perm), dtype=np.uint32)
+    position = 0
+    while position < len(order):
+        end = min(len(order), position + max(1, SIGNATURE_CELLS // max(int(lengths[order[position]]), 1)))
+        while end - position > 1 and (end - position) * lengths[order[end - 1]] > SIGNATURE_CELLS:
+            end = position + (end - position) // 2
+        rows = order[position:end]
+        width = max(int(lengths[rows[-1]]), 1)
+        block = np.full((len(rows), width), len(token_ids), dtype=np.int64)
+        row_lengths = lengths[rows]
+        block_rows = np.repeat(np.arange(len(rows)), row_lengths)
+        columns = np.arange(len(block_rows)) - np.repeat(np.cumsum(row_lengths) - row_lengths, row_lengths)
+        block[block_rows, columns] = flat[np.repeat(starts[rows], row_lengths) + columns]
+        signatures[rows] = hashed[block].min(axis=1)
+        position = end
+    return signatures
+
+def company_codes(companies):
+    """Stable 32-bit code of each normalized company (postings of different companies never merge)."""
+    return np.fromiter(
+        (zlib.crc32(("" if c is None or c != c else str(c).strip().lower()).encode("utf-8")) for c in companies),
+        dtype=np.uint64
+    )
+
+def near_duplicate_groups(signatures, companies=None, threshold=DEFAULT_THRESHOLD, bands=BANDS):
+    """Labels every posting with the id of its near-duplicate group."""
+    n, num_perm = signatures.shape
+    rows_per_band = num_perm // bands
+    sources, targets = [], []
+    for band in range(bands):
+        block = signatures[:, band * rows_per_band:(band + 1) * rows_per_band].astype(np.uint64)
+        keys = companies.copy() if companies is not None else np.zeros(n, dtype=np.uint64)
+        for column in block.T:
+            # Wrapping multiply-add: equal bands (and companies) give equal keys
+            keys = keys * np.uint64(0x100000001B3) + column
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        first = np.concatenate([[True], sorted_keys[1:] != sorted_keys[:-1]])
+        # Each posting is compared with the first (lowest) posting of its bucket
+        heads = order[np.flatnonzero(first)[np.cumsum(first) - 1]]
+        candidates = np.flatnonzero(heads != order)
+        members, heads = order[candidates], heads[candidates]
+        similar = (signatures[members] == signatures[heads]).mean(axis=1) >= threshold
+        sources.append(members[similar])
+        targets.append(heads[similar])
+
+    sources, targets = np.concatenate(sources), np.concatenate(targets)
+    graph = coo_matrix((np.ones(len(sources), dtype=np.int8), (sources, targets)), shape=(n, n))
+    return connected_components(graph, directed=False)[1]
+
+def canonical_postings(labels):
+    """Positions of each group's first posting (ascending) and the size of every group."""
+    counts = np.bincount(labels)
+    _, first = np.unique(labels, return_index=True)
+    return np.sort(first), counts
+
+def collapse_near_duplicates(df, threshold=DEFAULT_THRESHOLD):
+    """Keeps the first posting of every near-duplicate group, with the group size in DUPLICATE_COLUMN.
+
+    df is a cleaned DataFrame (see clean_job_frame); the kept rows keep their order.
+    """
+    signatures = minhash_signatures(df['Job Title'], df['skills_list'])
+    companies = company_codes(df['Company']) if 'Company' in df.columns else None
+    labels = near_duplicate_groups(signatures, companies, threshold)
+    keep, counts = canonical_postings(labels)
+    collapsed = df.iloc[keep].copy()
+    collapsed[DUPLICATE_COLUMN] = counts[labels[keep]]
+    return collapsed
+
+def plan_chunk_collapse(chunks, threshold=DEFAULT_THRESHOLD):
+    """Finds the near-duplicates of a chunked corpus (e.g. a streamed CSV) in one pass.
+
+    Only the signatures are kept (NUM_PERM * 4 bytes per posting). Returns the global
+    positions of the postings to keep and their group sizes, for collapse_chunks.
+    """
+    signatures, companies = [], []
+    for chunk in chunks:
+        signatures.append(minhash_signatures(chunk['Job Title'], chunk['skills_list']))
+        companies.append(company_codes(chunk['Company']) if 'Company' in chunk.columns else np.zeros(len(chunk), dtype=np.uint64))
+    if not signatures:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    labels = near_duplicate_groups(np.concatenate(signatures), np.concatenate(companies), threshold)
+    keep, counts = canonical_postings(labels)
+    return keep, counts[labels[keep]]
+
+def collapse_chunks(chunks, keep, duplicate_counts):
+    """Applies a plan_chunk_collapse result to the same chunks streamed again."""
+    offset = position = 0
+    for chunk in chunks:
+        stop = int(np.searchsorted(keep, offset + len(chunk)))
+        collapsed = chunk.iloc[keep[position:stop] - offset].copy()
+        collapsed[DUPLICATE_COLUMN] = duplicate_counts[position:stop]
+        offset += len(chunk)
+        position = stop
+        if len(collapsed):
+            yield collapsed
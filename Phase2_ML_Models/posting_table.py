@@ -0,0 +1,259 @@
+from bisect import bisect_left
+from collections.abc import Mapping
+
+import numpy as np
+
+
+# Posting Metadata
+# Serving reads posting metadata by position only, so it does not need pandas: a
+# PostingTable is a set of equally long columns that support len(), iteration and
+# column[i]. Columns are either plain object arrays (built from a DataFrame) or
+# flat-file columns opened with np.memmap (see artifact_store). Rows appended through the
+# API go to a small object-array tail behind each column (AppendedColumn), so an insert
+# copies the tail only; fold() merges in-memory tails into their columns.
+
+class StringColumn:
+    """Variable-length UTF-8 strings stored Arrow-style as one byte buffer plus offsets."""
+
+    def __init__(self, offsets, buffer):
+        self.offsets = offsets
+        self.buffer = buffer
+
+    @classmethod
+    def from_values(cls, values):
+        encoded = [("" if v is None or v != v else str(v)).encode("utf-8") for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(offsets, buffer)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.buffer[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def take(self, indices):
+        """Decodes the strings at the given positions, gathering their bytes in one pass."""
+        starts, lengths = _ragged_bounds(self.offsets, indices)
+        blob = np.asarray(self.buffer)[_ragged_gather(starts, lengths)].tobytes()
+        ends = np.cumsum(lengths).tolist()
+        return [blob[end - length:end].decode("utf-8") for end, length in zip(ends, lengths.tolist())]
+
+    def slice(self, start, stop):
+        # Offsets point into the shared buffer, so a window of them is a valid column
+        return StringColumn(self.offsets[start:stop + 1], self.buffer)
+
+
+class SkillListColumn:
+    """Per-posting skill lists stored as ids into a skill vocabulary (ragged CSR layout)."""
+
+    def __init__(self, indptr, ids, vocabulary):
+        self.indptr = indptr
+        self.ids = ids
+        self.vocabulary = vocabulary
+
+    @classmethod
+    def from_values(cls, skills_lists, vocabulary):
+        lookup = {skill: i for i, skill in enumerate(vocabulary)}
+        indptr = np.zeros(len(skills_lists) + 1, dtype=np.int64)
+        np.cumsum([len(skills) for skills in skills_lists], out=indptr[1:])
+        ids = np.fromiter(
+            (lookup[s] for skills in skills_lists for s in skills), dtype=np.int32, count=indptr[-1]
+        )
+        return cls(indptr, ids, vocabulary)
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def __getitem__(self, i):
+        return [self.vocabulary[j] for j in self.ids[self.indptr[i]:self.indptr[i + 1]]]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def take(self, indices):
+        starts, lengths = _ragged_bounds(self.indptr, indices)
+        skills = [self.vocabulary[j] for j in np.asarray(self.ids)[_ragged_gather(starts, lengths)].tolist()]
+        ends = np.cumsum(lengths).tolist()
+        return [skills[end - length:end] for end, length in zip(ends, lengths.tolist())]
+
+    def slice(self, start, stop):
+        return SkillListColumn(self.indptr[start:stop + 1], self.ids, self.vocabulary)
+
+
+class AppendedColumn:
+    """A column (head) followed by the values of rows appended since (tail, an object array)."""
+
+    def __init__(self, head, tail):
+        self.head = head
+        self.tail = tail
+
+    def __len__(self):
+        return len(self.head) + len(self.tail)
+
+    def __getitem__(self, i):
+        return self.head[i] if i < len(self.head) else self.tail[i - len(self.head)]
+
+    def __iter__(self):
+        yield from self.head
+        yield from self.tail
+
+    def take(self, indices):
+        indices = np.asarray(indices, dtype=np.int64)
+        in_head = indices < len(self.head)
+        head = _take(self.head, indices[in_head])
+        tail = self.tail[indices[~in_head] - len(self.head)]
+        head, tail = iter(head), iter(tail)
+        return [next(head) if is_head else next(tail) for is_head in in_head.tolist()]
+
+    def slice(self, start, stop):
+        split = len(self.head)
+        if stop <= split:
+            return _slice(self.head, start, stop)
+        return AppendedColumn(_slice(self.head, min(start, split), split), self.tail[max(start - split, 0):stop - split])
+
+
+class ValueIds(Mapping):
+    """Read-only value -> sorted posting ids map over flat arrays (the mapped filter index).
+
+    values is a StringColumn of the distinct values in sorted order, ids the posting ids
+    grouped by value and bounds[i]:bounds[i + 1] the group of values[i]. A lookup is a
+    binary search that decodes O(log n) values, so opening the index decodes none.
+    """
+
+    def __init__(self, values, bounds, ids):
+        self.values = values
+        self.bounds = bounds
+        self.ids = ids
+
+    @classmethod
+    def from_dict(cls, mapping):
+        values = sorted(mapping)
+        bounds = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum([len(mapping[value]) for value in values], out=bounds[1:])
+        ids = np.concatenate([np.zeros(0, dtype=np.int64)] + [mapping[value] for value in values]).astype(np.int64)
+        return cls(StringColumn.from_values(values), bounds, ids)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __getitem__(self, value):
+        i = bisect_left(self.values, value)
+        if i == len(self.values) or self.values[i] != value:
+            raise KeyError(value)
+        return np.asarray(self.ids[self.bounds[i]:self.bounds[i + 1]])
+
+
+def _take(column, indices):
+    return column[indices] if isinstance(column, np.ndarray) else column.take(indices)
+
+def _slice(column, start, stop):
+    return column[start:stop] if isinstance(column, np.ndarray) else column.slice(start, stop)
+
+def _object_array(values, count):
+    # fromiter keeps list values (skills) as single objects instead of broadcasting them
+    return np.fromiter(values, dtype=object, count=count)
+
+def _ragged_bounds(offsets, indices):
+    # Plain ndarray views: indexing np.memmap element by element is slow
+    offsets = np.asarray(offsets)
+    indices = np.asarray(indices, dtype=np.int64)
+    starts = offsets[indices]
+    return starts, offsets[indices + 1] - starts
+
+def _ragged_gather(starts, lengths):
+    """Flat positions of the ragged slices [start, start + length) in order."""
+    ends = np.cumsum(lengths)
+    return np.arange(ends[-1] if len(ends) else 0) + np.repeat(starts - (ends - lengths), lengths)
+
+
+class PostingTable:
+    """Column-oriented posting metadata with positional access."""
+
+    def __init__(self, columns):
+        self._columns = dict(columns)
+        lengths = {len(column) for column in self._columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Posting columns have different lengths: {sorted(lengths)}")
+        self._length = lengths.pop() if lengths else 0
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """Wraps a cleaned DataFrame; the object columns are shared, not copied."""
+        return cls({name: df[name].to_numpy(dtype=object) for name in df.columns})
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, name):
+        return self._columns[name]
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def take(self, indices, columns=None):
+        """Returns the rows at the given positions as a small in-memory table."""
+        return PostingTable({name: _take(self._columns[name], indices) for name in columns or self.columns})
+
+    def rows(self, start, stop):
+        """Rows [start, stop) as a table sharing this one's storage (mapped columns stay mapped)."""
+        return PostingTable({name: _slice(column, start, stop) for name, column in self._columns.items()})
+
+    def append(self, df):
+        """Returns a new table with the DataFrame's rows added at the end.
+
+        The existing columns are shared; only the tail of appended rows is copied.
+        """
+        names = self.columns + [name for name in df.columns if name not in self._columns]
+        columns = {}
+        for name in names:
+            # A column the table did not have yet is None for the existing rows
+            column = self._columns.get(name)
+            if column is None:
+                column = np.full(len(self), None, dtype=object)
+            new = df[name].to_numpy(dtype=object) if name in df.columns else [None] * len(df)
+            if isinstance(column, AppendedColumn):
+                head, tail = column.head, column.tail
+            else:
+                head, tail = column, []
+            columns[name] = AppendedColumn(head, _object_array(
+                (value for part in (tail, new) for value in part), len(tail) + len(df)
+            ))
+        return PostingTable(columns)
+
+    def fold(self):
+        """Returns a table whose in-memory columns hold their appended rows in one array.
+
+        Memory-mapped columns keep their tail until the next rebuild writes them again.
+        """
+        return PostingTable({
+            name: _object_array(iter(column), len(column))
+            if isinstance(column, AppendedColumn) and isinstance(column.head, np.ndarray) else column
+            for name, column in self._columns.items()
+        })
+
+    def to_dataframe(self):
+        import pandas as pd
+        return pd.DataFrame({name: list(column) for name, column in self._columns.items()})
+
+
+def as_posting_table(df):
+    """Accepts either a cleaned DataFrame or an existing PostingTable."""
+    return df if isinstance(df, PostingTable) else PostingTable.from_dataframe(df)
+
+def take_postings(df, indices, columns=None):
+    """Rows of a DataFrame or PostingTable by position, without converting a whole DataFrame."""
+    if isinstance(df, PostingTable):
+        return df.take(indices, columns)
+    return PostingTable.from_dataframe(df.iloc[indices][columns] if columns else df.iloc[indices])
@@ -0,0 +1,51 @@
+import numpy as np
+
+
+# Ranking
+# Picking one page of the best scores and shaping a /recommend record are shared by every
+# scoring path (exact, inverted index, shards, low-rank, similar jobs, lite runtime), so
+# they live here with numpy as their only dependency.
+
+# Size of the near-duplicate group a posting stands for (see posting_dedup)
+DUPLICATE_COLUMN = 'Duplicate Count'
+
+def top_k_indices(scores, top_k, offset=0, candidates=None):
+    """Returns the indices of one page of the best scores, best first, without a full sort.
+
+    Equal scores rank by lower index, so every retrieval path returns the same page.
+    candidates optionally restricts the selection to a subset of posting indices.
+    """
+    if candidates is not None:
+        scores = scores[candidates]
+    end = min(offset + top_k, len(scores))
+    if end <= offset:
+        return np.array([], dtype=int)
+    # partition is O(n); the end-th best score splits the postings that surely make it
+    # from those tied for the last places, which go to the lowest indices
+    cutoff = -np.partition(-scores, end - 1)[end - 1]
+    above = np.flatnonzero(scores > cutoff)
+    best = np.concatenate([above, np.flatnonzero(scores == cutoff)[:end - len(above)]])
+    # Only the offset + top_k survivors (in index order) get sorted
+    best = best[np.argsort(-scores[best], kind='stable')][offset:end]
+    return best if candidates is None else candidates[best]
+
+def duplicate_counts(values):
+    """Group sizes from a DUPLICATE_COLUMN (ints, or strings once memory-mapped) as ints.
+
+    Postings without one (added through the API, or from a corpus that was not
+    deduplicated) stand for themselves only.
+    """
+    return [1 if v is None or v != v or v == "" else int(v) for v in values]
+
+def recommendation_record(job_id, title, company, score, missing_skills, job_skills, duplicate_count=1):
+    """One entry of a /recommend response."""
+    return {
+        "Job ID": job_id, # Position of the posting (e.g. for /jobs/{id}/similar)
+        "Job Title": title,
+        "Company": company,
+        "Match Score": f"{round(score * 100, 1)}%",
+        "Score": round(score, 4),
+        "Missing Skills": missing_skills, # Suggest top 3 missing skills
+        "Required Skills": list(job_skills),  # Include all required skills for frontend
+        "Duplicate Count": duplicate_count  # Near-duplicate reposts collapsed into this posting
+    }
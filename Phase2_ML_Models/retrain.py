@@ -0,0 +1,147 @@
+import os
+import shutil
+import time
+
+from compact_embeddings import PRECISIONS, compact_embeddings
+from job_recommendation_model import clean_job_data, extract_features, save_model_artifacts
+from artifact_store import load_mmap_artifacts, save_low_rank, save_mmap_artifacts, save_similarity_graph
+from lite_runtime import export_lite_model
+from low_rank import PROJECTIONS, build_low_rank
+from similarity_graph import DEFAULT_NEIGHBORS, build_similarity_graph
+from streaming_pipeline import stream_train_to_artifacts
+
+
+# Versioned Model Directories
+# Each rebuild is published as <root>/<name> next to a CURRENT file naming the live one.
+# Old directories are removed best effort: a process may still have them mapped (and on
+# Windows they cannot be deleted while it does), so they are retried on the next publish.
+
+CURRENT = "CURRENT"
+
+def current_model_dir(root):
+    """Path of the live model directory under root, or None."""
+    pointer = os.path.join(root, CURRENT)
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer) as f:
+        name = f.read().strip()
+    path = os.path.join(root, name)
+    return path if os.path.isdir(path) else None
+
+def publish_model(root, tfidf, mlb, embeddings, df, keep=2):
+    """Writes a new versioned model directory and points CURRENT at it."""
+    return _publish(root, lambda path: save_mmap_artifacts(path, tfidf, mlb, embeddings, df), keep)
+
+def _publish(root, write, keep=2):
+    """Calls write(path) for a fresh directory under root, then points CURRENT at it."""
+    os.makedirs(root, exist_ok=True)
+    name = time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}-{time.monotonic_ns() % 10**6:06d}"
+    path = os.path.join(root, name)
+    write(path)
+
+    pointer_tmp = os.path.join(root, CURRENT + ".tmp")
+    with open(pointer_tmp, "w") as f:
+        f.write(name)
+    os.replace(pointer_tmp, os.path.join(root, CURRENT))
+
+    versions = sorted(
+        entry for entry in os.listdir(root)
+        if os.path.isdir(os.path.join(root, entry)) and not entry.endswith((".tmp", ".old"))
+    )
+    for stale in versions[:-keep]:
+        shutil.rmtree(os.path.join(root, stale), ignore_errors=True)
+    return path
+
+def load_current_model(root):
+    """Opens the live model under root (memory-mapped), or returns None."""
+    path = current_model_dir(root)
+    return load_mmap_artifacts(path) if path else None
+
+def add_similarity_graph(model_dir, neighbors=DEFAULT_NEIGHBORS):
+    """Builds the job-to-job similarity graph of a model directory and stores it there."""
+    artifacts = load_mmap_artifacts(model_dir)
+    save_similarity_graph(model_dir, build_similarity_graph(artifacts["embeddings"], neighbors))
+
+def add_low_rank(model_dir, dim, method="svd"):
+    """Fits the low-rank projection of a model directory and stores it there."""
+    artifacts = load_mmap_artifacts(model_dir)
+    save_low_rank(model_dir, build_low_rank(artifacts["embeddings"], dim, method))
+
+def train_and_publish(data_path, root, chunksize=None, n_jobs=1, precision="float64", dedup_threshold=None,
+                      similar_neighbors=DEFAULT_NEIGHBORS, dense_dim=0, dense_method="svd"):
+    """Full rebuild from the postings CSV. Meant to run in a worker process.
+
+    With chunksize the CSV is streamed (see streaming_pipeline) instead of loaded whole,
+    which keeps memory bounded for files that do not fit in RAM. Otherwise n_jobs worker
+    processes vectorize the postings (see parallel_features). The embeddings are stored
+    in the given precision (see compact_embeddings). dedup_threshold collapses
+    near-duplicate postings first (see posting_dedup). similar_neighbors > 0 adds the
+    job-to-job similarity graph (see similarity_graph) and dense_dim > 0 the low-rank
+    projection (see low_rank) before the directory goes live.
+
+    Returns the published directory; the caller opens it with load_mmap_artifacts, which
+    is cheap because nothing is deserialized besides the vectorizers.
+    """
+    def write(path):
+        if chunksize:
+            stream_train_to_artifacts(data_path, path, chunksize, precision, dedup_threshold)
+        else:
+            df = clean_job_data(data_path, dedup_threshold)
+            tfidf, mlb, embeddings = extract_features(df, n_jobs)
+            save_mmap_artifacts(path, tfidf, mlb, compact_embeddings(embeddings, precision), df)
+        if similar_neighbors:
+            add_similarity_graph(path, similar_neighbors)
+        if dense_dim:
+            add_low_rank(path, dense_dim, dense_method)
+    return _publish(root, write)
+
+def train_and_save_joblib(data_path, model_path, n_jobs=1, precision="float64", dedup_threshold=None,
+                          similar_neighbors=DEFAULT_NEIGHBORS, dense_dim=0, dense_method="svd"):
+    """Full rebuild into a single joblib pickle, replaced atomically. Returns model_path."""
+    df = clean_job_data(data_path, dedup_threshold)
+    tfidf, mlb, embeddings = extract_features(df, n_jobs)
+    embeddings = compact_embeddings(embeddings, precision)
+    similar = build_similarity_graph(embeddings, similar_neighbors) if similar_neighbors else None
+    low_rank = build_low_rank(embeddings, dense_dim, dense_method) if dense_dim else None
+    tmp_path = model_path + ".tmp"
+    save_model_artifacts(tmp_path, tfidf, mlb, embeddings, df, similar, low_rank)
+    os.replace(tmp_path, model_path)
+    return model_path
+
+def export_lite(model_dir, lite_dir):
+    """Exports a published model directory for the numpy-only API tier (see lite_runtime)."""
+    artifacts = load_mmap_artifacts(model_dir)
+    return export_lite_model(
+        lite_dir, artifacts["tfidf"], artifacts["mlb"], artifacts["embeddings"], artifacts["df"], artifacts["version"]
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild the recommender and publish a new model directory.")
+    parser.add_argument("data_path", help="Postings CSV (Job Title, Company, Required Skills)")
+    parser.add_argument("root", help="Directory holding the versioned models")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="Stream the CSV in chunks of this many rows (bounded memory)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes used to vectorize the postings (0 = all cores)")
+    parser.add_argument("--precision", choices=PRECISIONS, default="float64",
+                        help="Storage precision of the embedding values")
+    parser.add_argument("--dedup-threshold", type=float, default=None,
+                        help="Collapse postings whose title/skill sets are at least this similar (e.g. 0.8)")
+    parser.add_argument("--similar-neighbors", type=int, default=DEFAULT_NEIGHBORS,
+                        help="Neighbors per posting in the job-to-job similarity graph (0 = do not build it)")
+    parser.add_argument("--dense-dim", type=int, default=0,
+                        help="Dimensions of the low-rank projection for dense scoring (0 = do not build it)")
+    parser.add_argument("--dense-method", choices=PROJECTIONS, default="svd")
+    parser.add_argument("--lite-dir", default=None,
+                        help="Also export the published model here for the lite runtime (lite_runtime)")
+    args = parser.parse_args()
+    path = train_and_publish(
+        args.data_path, args.root, args.chunksize, args.workers, args.precision, args.dedup_threshold,
+        args.similar_neighbors, args.dense_dim, args.dense_method
+    )
+    print(path)
+    if args.lite_dir:
+        export_lite(path, args.lite_dir)
@@ -0,0 +1,206 @@
+import argparse
+import time
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from compact_embeddings import CompactEmbeddings, score_postings
+from ranking import top_k_indices
+
+
+# Job-to-Job Similarity Graph
+# "More like this" for a posting means its nearest other postings by cosine similarity,
+# which is a dot product because every embedding row is L2-normalized. The graph is built
+# offline, one row block of embeddings @ embeddings.T at a time, and row i of the CSR
+# result lists posting i's neighbors, best first, so a lookup reads at most `neighbors`
+# entries.
+#
+# A plain product is dense: a word like "engineer" links almost every pair of postings.
+# Common features (in more than COMMON_SHARE of the postings) are therefore left out of
+# the product that finds the candidates, which stays sparse and is cut into blocks of
+# bounded size. The candidates that could still reach the top get the common features'
+# share of their score added back exactly. A posting that is not a candidate shares only
+# common features, so it scores at most the row's common bound (the row's common weights
+# times each feature's largest weight); a row whose neighbor list does not clear that
+# bound is scored against every posting instead. The graph is therefore exact.
+
+DEFAULT_NEIGHBORS = 10
+# Upper bound on the candidate entries of one block (about 200 MB of scipy temporaries)
+BLOCK_ENTRIES = 1 << 24
+# Features in more than this share of the postings (and at least COMMON_MIN_POSTINGS) are common
+COMMON_SHARE = 0.01
+COMMON_MIN_POSTINGS = 1000
+# Rows scored against every posting at once when their candidates are not enough
+FALLBACK_BATCH = 64
+
+def _row_blocks(matrix, block_entries):
+    """Row ranges whose products with matrix.T have at most block_entries entries (bound).
+
+    A row can only meet the postings that contain one of its features, so its product
+    has at most the sum of its features' posting counts entries.
+    """
+    counts = np.bincount(matrix.indices, minlength=matrix.shape[1]).astype(np.float64)
+    pattern = csr_matrix((np.ones(matrix.nnz), matrix.indices, matrix.indptr), shape=matrix.shape)
+    bound = np.concatenate([[0], np.cumsum(pattern @ counts)])
+    start = 0
+    while start < matrix.shape[0]:
+        end = int(np.searchsorted(bound, bound[start] + block_entries, side='right')) - 1
+        end = min(max(end, start + 1), matrix.shape[0])
+        yield start, end
+        start = end
+
+def _top_neighbors(cols, scores, neighbors):
+    """Positions of the best `neighbors` entries, best first, ties by ascending posting id.
+
+    cols must be sorted, so among equal scores the lower ids come first.
+    """
+    if len(scores) > neighbors:
+        kth = np.partition(scores, len(scores) - neighbors)[len(scores) - neighbors]
+        above = np.flatnonzero(scores > kth)
+        tied = np.flatnonzero(scores == kth)[:neighbors - len(above)]
+        chosen = np.concatenate([above, tied])
+    else:
+        chosen = np.arange(len(scores))
+    return chosen[np.lexsort((cols[chosen], -scores[chosen]))]
+
+def _split_columns(matrix, mask):
+    """(columns where mask is False, columns where it is True) as two CSR matrices of the same shape."""
+    common = mask[matrix.indices]
+    rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    parts = []
+    for keep in (~common, common):
+        indptr = np.zeros(matrix.shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows[keep], minlength=matrix.shape[0]), out=indptr[1:])
+        parts.append(csr_matrix((matrix.data[keep], matrix.indices[keep], indptr), shape=matrix.shape))
+    return parts
+
+def build_similarity_graph(embeddings, neighbors=DEFAULT_NEIGHBORS, block_entries=BLOCK_ENTRIES,
+                           common_share=COMMON_SHARE):
+    """Top `neighbors` most similar other postings of every posting.
+
+    Returns {"indptr", "indices", "scores", "neighbors", "fallback_rows"}: CSR rows over
+    posting ids, best score first (ties by posting id), and how many rows needed a full
+    product. A posting that shares no feature with posting i is never listed as its
+    neighbor. Scores are float32.
+    """
+    matrix = (embeddings.tocsr() if isinstance(embeddings, CompactEmbeddings) else embeddings).astype(np.float32)
+    matrix.sort_indices()
+    n, n_features = matrix.shape
+    counts = np.bincount(matrix.indices, minlength=n_features)
+    common = counts > max(COMMON_MIN_POSTINGS, common_share * n)
+    selective, shared = _split_columns(matrix, common)
+    selective_t = selective.T.tocsr()
+    max_weight = np.zeros(n_features, dtype=np.float32)
+    np.maximum.at(max_weight, matrix.indices, matrix.data)
+    common_bound = shared @ max_weight
+
+    neighbor_ids, neighbor_scores = [None] * n, [None] * n
+    fallback = []
+    for start, end in _row_blocks(selective, block_entries):
+        product = selective[start:end] @ selective_t
+        product.sort_indices()
+
+        # Candidates that could still reach the top once their common share is added
+        pair_rows, pair_cols, partial = [], [], []
+        for row in range(end - start):
+            lo, hi = product.indptr[row], product.indptr[row + 1]
+            cols, values = product.indices[lo:hi], product.data[lo:hi]
+            # A posting is not its own neighbor
+            keep = cols != start + row
+            cols, values = cols[keep], values[keep]
+            if len(values) > neighbors:
+                kth = np.partition(values, len(values) - neighbors)[len(values) - neighbors]
+                keep = values + common_bound[start + row] >= kth
+                cols, values = cols[keep], values[keep]
+            pair_rows.append(np.full(len(cols), row))
+            pair_cols.append(cols)
+            partial.append(values)
+        pair_rows, pair_cols = np.concatenate(pair_rows), np.concatenate(pair_cols)
+        exact = np.concatenate(partial) + np.asarray(
+            shared[start + pair_rows].multiply(shared[pair_cols]).sum(axis=1), dtype=np.float32
+        ).ravel()
+
+        bounds = np.searchsorted(pair_rows, np.arange(end - start + 1))
+        for row in range(end - start):
+            i = start + row
+            cols, values = pair_cols[bounds[row]:bounds[row + 1]], exact[bounds[row]:bounds[row + 1]]
+            best = _top_neighbors(cols, values, neighbors)
+            if common_bound[i] > 0 and (len(best) < neighbors or values[best[-1]] <= common_bound[i]):
+                fallback.append(i)
+                continue
+            neighbor_ids[i], neighbor_scores[i] = cols[best], values[best]
+
+    for at in range(0, len(fallback), FALLBACK_BATCH):
+        rows = fallback[at:at + FALLBACK_BATCH]
+        block = score_postings(matrix, matrix[rows])
+        for col, i in enumerate(rows):
+            scores = block[:, col]
+            scores[i] = 0
+            cols = np.flatnonzero(scores > 0)
+            best = _top_neighbors(cols, scores[cols], neighbors)
+            neighbor_ids[i], neighbor_scores[i] = cols[best], scores[cols][best]
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum([len(ids) for ids in neighbor_ids], out=indptr[1:])
+    return {
+        "indptr": indptr,
+        "indices": np.concatenate(neighbor_ids).astype(np.int32) if n else np.array([], dtype=np.int32),
+        "scores": np.concatenate(neighbor_scores).astype(np.float32) if n else np.array([], dtype=np.float32),
+        "neighbors": neighbors,
+        "fallback_rows": len(fallback)
+    }
+
+def similar_postings(graph, job_id, limit=None, alive=None):
+    """Neighbors of one posting, best first: (posting ids, scores).
+
+    alive (the metadata index's tombstone mask) drops deleted neighbors.
+    """
+    lo, hi = int(graph["indptr"][job_id]), int(graph["indptr"][job_id + 1])
+    ids = np.asarray(graph["indices"][lo:hi], dtype=np.int64)
+    scores = np.asarray(graph["scores"][lo:hi])
+    if alive is not None:
+        keep = alive[ids]
+        ids, scores = ids[keep], scores[keep]
+    return ids[:limit], scores[:limit]
+
+def graph_size(graph):
+    """Number of postings the graph has rows for."""
+    return len(graph["indptr"]) - 1
+
+def similar_jobs(graph, job_id, embeddings, limit=DEFAULT_NEIGHBORS, alive=None):
+    """(posting ids, scores) of the postings most similar to job_id, best first.
+
+    Postings the graph covers are a lookup of one row. Postings appended after it was
+    built (or a model without a graph) are scored against every posting instead.
+    """
+    if graph is not None and job_id < graph_size(graph):
+        return similar_postings(graph, job_id, limit, alive)
+    scores = score_postings(embeddings, embeddings[job_id]).ravel()
+    scores[job_id] = -np.inf
+    if alive is not None:
+        scores[:len(alive)][~alive] = -np.inf
+    best = top_k_indices(scores, limit)
+    best = best[scores[best] > 0]
+    return best, scores[best]
+
+def main():
+    from artifact_store import load_mmap_artifacts, save_similarity_graph
+
+    parser = argparse.ArgumentParser(description="Build the job-to-job similarity graph of a model directory.")
+    parser.add_argument("model_dir", help="Memory-mapped model directory (written by retrain.py)")
+    parser.add_argument("--neighbors", type=int, default=DEFAULT_NEIGHBORS, help="Neighbors kept per posting")
+    parser.add_argument("--block-entries", type=int, default=BLOCK_ENTRIES,
+                        help="Upper bound on the similarity entries computed per block (memory)")
+    args = parser.parse_args()
+
+    artifacts = load_mmap_artifacts(args.model_dir)
+    if artifacts is None:
+        parser.error(f"no model in {args.model_dir}")
+    start = time.perf_counter()
+    graph = build_similarity_graph(artifacts["embeddings"], args.neighbors, args.block_entries)
+    save_similarity_graph(args.model_dir, graph)
+    print(f"{graph_size(graph)} postings, {len(graph['indices'])} edges in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
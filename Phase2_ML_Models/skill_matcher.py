@@ -0,0 +1,181 @@
+from collections import deque
+
+
+# Skill Extraction
+# Finds every known skill (mlb.classes_) and TF-IDF vocabulary term in free text with an
+# Aho-Corasick automaton: one pass over the text, a constant amount of work per character
+# plus the matches reported, however many patterns there are. Text is fed in chunks, so
+# an upload is scanned while it streams in.
+#
+# Matching is case-insensitive and treats any run of whitespace as one space ("Machine
+# \n Learning" finds "machine learning"). A match must not touch a word character on
+# either side ("java" is not found in "javascript", "c" not in "c++"), and a match inside
+# a longer one is dropped ("learning" within "machine learning").
+
+SKILL = 1
+TERM = 2
+# Characters that continue a word for the boundary check (c++, c#, snake_case)
+WORD_SYMBOLS = frozenset("_+#")
+
+def _is_word(char):
+    return char.isalnum() or char in WORD_SYMBOLS
+
+def normalize_text(text):
+    return " ".join(text.lower().split())
+
+
+class SkillMatcher:
+    """Aho-Corasick automaton over normalized skill and vocabulary patterns."""
+
+    def __init__(self, patterns):
+        """patterns maps a phrase to its kind (SKILL | TERM bits)."""
+        self.goto = [{}]
+        self.fail = [0]
+        # Pattern id ending at each node (-1 if none), and the nearest node on the failure
+        # chain that ends a pattern, so all matches at a position are listed without search
+        self.output = [-1]
+        self.dict_link = [0]
+        self.patterns = []
+        self.kinds = []
+
+        for phrase, kind in patterns.items():
+            phrase = normalize_text(phrase)
+            if not phrase:
+                continue
+            node = 0
+            for char in phrase:
+                nxt = self.goto[node].get(char)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][char] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(-1)
+                    self.dict_link.append(0)
+                node = nxt
+            if self.output[node] == -1:
+                self.output[node] = len(self.patterns)
+                self.patterns.append(phrase)
+                self.kinds.append(kind)
+            else:
+                self.kinds[self.output[node]] |= kind
+        self.max_length = max((len(p) for p in self.patterns), default=0)
+
+        # Failure links breadth first: a node's link is the longest proper suffix in the trie
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                link = self.fail[child] = self.goto[state].get(char, 0)
+                self.dict_link[child] = link if self.output[link] != -1 else self.dict_link[link]
+
+    def scanner(self):
+        return SkillScanner(self)
+
+    def extract(self, text):
+        """Matches in a whole document (see SkillScanner.finish)."""
+        scanner = self.scanner()
+        scanner.feed(text)
+        return scanner.finish()
+
+
+class SkillScanner:
+    """Incremental scan of one document; feed() chunks in order, then finish()."""
+
+    def __init__(self, matcher):
+        self.matcher = matcher
+        self.state = 0
+        self.position = 0
+        self.pending_space = False
+        # Whether each of the last max_length + 1 characters was a word character
+        self._window = matcher.max_length + 1
+        self._word = [False] * self._window
+        # (start, end, pattern) of matches waiting for their right boundary (the next character)
+        self._ending = []
+        # Accepted matches that a longer, later match could still contain, in order of end
+        self._open = deque()
+        self.counts = {}
+        self.first_seen = {}
+
+    def _step(self, char):
+        matcher = self.matcher
+        is_word = _is_word(char)
+        if self._ending:
+            if not is_word:
+                for match in self._ending:
+                    self._accept(match)
+            self._ending = []
+
+        goto, fail = matcher.goto, matcher.fail
+        state = self.state
+        while state and char not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(char, 0)
+        self.state = state
+        self._word[self.position % self._window] = is_word
+        self.position += 1
+
+        # Every pattern ending here, longest first
+        node = state if matcher.output[state] != -1 else matcher.dict_link[state]
+        while node:
+            pattern = matcher.output[node]
+            start = self.position - len(matcher.patterns[pattern])
+            if start == 0 or not self._word[(start - 1) % self._window]:
+                self._ending.append((start, self.position, pattern))
+            node = matcher.dict_link[node]
+
+        # A match still to come ends here or later, so it starts after position - max_length
+        while self._open and self._open[0][0] + matcher.max_length < self.position:
+            self._record(self._open.popleft())
+
+    def _accept(self, match):
+        start, end, _ = match
+        # Open matches end no later than this one (longer ones at the same end come first)
+        if any(other[0] <= start and other[1] >= end for other in self._open):
+            return
+        if any(other[0] >= start for other in self._open):
+            self._open = deque(other for other in self._open if other[0] < start)
+        self._open.append(match)
+
+    def _record(self, match):
+        start, _, pattern = match
+        self.counts[pattern] = self.counts.get(pattern, 0) + 1
+        self.first_seen[pattern] = min(self.first_seen.get(pattern, start), start)
+
+    def feed(self, text):
+        """Scans the next chunk of the document."""
+        for char in text.lower():
+            if char.isspace():
+                self.pending_space = True
+                continue
+            if self.pending_space:
+                # Whitespace runs collapse into one space; leading whitespace is dropped
+                if self.position:
+                    self._step(" ")
+                self.pending_space = False
+            self._step(char)
+
+    def finish(self):
+        """Ends the document; returns [(phrase, kind, count)] in order of first occurrence."""
+        for match in self._ending:
+            self._accept(match)
+        self._ending = []
+        while self._open:
+            self._record(self._open.popleft())
+        matcher = self.matcher
+        return [
+            (matcher.patterns[pattern], matcher.kinds[pattern], self.counts[pattern])
+            for pattern in sorted(self.counts, key=self.first_seen.get)
+        ]
+
+
+def build_skill_matcher(tfidf, mlb):
+    """Automaton over a trained model's skills and TF-IDF vocabulary terms."""
+    patterns = {term: TERM for term in tfidf.vocabulary_}
+    for skill in mlb.classes_:
+        patterns[skill] = patterns.get(skill, 0) | SKILL
+    return SkillMatcher(patterns)
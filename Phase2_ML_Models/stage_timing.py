@@ -0,0 +1,29 @@
+import time
+from contextlib import contextmanager
+
+
+# Stage Timing
+# The query path reports how long each of its stages takes (cleaning, vectorizing,
+# scoring, top-k selection, result assembly) to an observer installed by the caller, e.g.
+# the backend's metrics. Without an observer nothing is timed. Batched queries report
+# the shared stages (cleaning, vectorizing, scoring) once per chunk and the rest once per
+# profile.
+
+_observer = None
+
+def set_stage_observer(observer):
+    """Installs observer(stage, seconds), called after every timed stage; None turns timing off."""
+    global _observer
+    _observer = observer
+
+@contextmanager
+def timed_stage(name):
+    observer = _observer
+    if observer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observer(name, time.perf_counter() - start)
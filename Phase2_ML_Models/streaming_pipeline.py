@@ -0,0 +1,111 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import MultiLabelBinarizer
+
+from artifact_store import MmapArtifactWriter
+from compact_embeddings import compact_embeddings
+from job_recommendation_model import TFIDF_PARAMS, clean_job_frame, transform_postings
+from posting_dedup import collapse_chunks, plan_chunk_collapse
+
+
+# Streaming Training
+# Builds the same model as clean_job_data + extract_features without loading the whole
+# CSV. Pass 1 streams the file to collect the statistics TfidfVectorizer and
+# MultiLabelBinarizer are fitted from (term counts, document frequencies, skills); pass 2
+# streams it again, embeds each chunk with the fitted vectorizers and appends it to the
+# memory-mapped model directory. Memory is bounded by the chunk size and the number of
+# distinct terms, not by the number of postings. Collapsing near-duplicates adds a pass
+# before both that keeps one small MinHash signature per posting (see posting_dedup).
+
+CHUNK_SIZE = 50_000
+
+def iter_clean_chunks(file_path, chunksize=CHUNK_SIZE):
+    """Yields the postings CSV as cleaned DataFrame chunks (same rules as clean_job_data).
+
+    Columns are read as strings so a chunk's types do not depend on which rows it holds.
+    """
+    for chunk in pd.read_csv(file_path, chunksize=chunksize, dtype=str):
+        chunk = clean_job_frame(chunk)
+        if len(chunk):
+            yield chunk
+
+def _text_corpus(chunk):
+    # Same text as extract_features: Job Title + Required Skills
+    return (f"{title} {skills}" for title, skills in zip(chunk['Job Title'], chunk['Required Skills']))
+
+def count_terms(chunks):
+    """Pass 1: total term counts, document frequencies and skills over all chunks.
+
+    Chunks are cleaned DataFrames or dicts of column lists.
+    """
+    analyzer = TfidfVectorizer(**TFIDF_PARAMS).build_analyzer()
+    stats = {"n_docs": 0, "term_counts": Counter(), "doc_counts": Counter(), "skills": set()}
+    for chunk in chunks:
+        for doc in _text_corpus(chunk):
+            terms = analyzer(doc)
+            stats["term_counts"].update(terms)
+            stats["doc_counts"].update(set(terms))
+        stats["skills"].update(s for skills in chunk['skills_list'] for s in skills)
+        stats["n_docs"] += len(chunk['skills_list'])
+    return stats
+
+def merge_term_counts(parts):
+    """Combines count_terms results of disjoint chunks (e.g. from parallel workers)."""
+    stats = {"n_docs": 0, "term_counts": Counter(), "doc_counts": Counter(), "skills": set()}
+    for part in parts:
+        stats["n_docs"] += part["n_docs"]
+        stats["term_counts"].update(part["term_counts"])
+        stats["doc_counts"].update(part["doc_counts"])
+        stats["skills"].update(part["skills"])
+    return stats
+
+def fit_vectorizers(stats):
+    """Builds the vectorizers extract_features would fit on the same corpus.
+
+    Vocabulary selection and IDF follow TfidfVectorizer: the max_features terms with the
+    highest total counts (picked with the same argsort over the alphabetically ordered
+    terms, so ties resolve identically) and smoothed idf = ln((1 + n) / (1 + df)) + 1.
+    """
+    terms = sorted(stats["term_counts"])
+    if not terms:
+        raise ValueError("empty vocabulary; perhaps the documents only contain stop words")
+    max_features = TFIDF_PARAMS["max_features"]
+    if max_features is not None and len(terms) > max_features:
+        counts = np.array([stats["term_counts"][t] for t in terms], dtype=np.int64)
+        keep = (-counts).argsort()[:max_features]
+        terms = sorted(terms[i] for i in keep)
+
+    tfidf = TfidfVectorizer(**TFIDF_PARAMS)
+    tfidf.vocabulary_ = {term: i for i, term in enumerate(terms)}
+    doc_counts = np.array([stats["doc_counts"][t] for t in terms], dtype=np.float64)
+    tfidf.idf_ = np.log((stats["n_docs"] + 1) / (doc_counts + 1)) + 1
+
+    mlb = MultiLabelBinarizer().fit([sorted(stats["skills"])])
+    return tfidf, mlb
+
+def stream_train_to_artifacts(file_path, dirpath, chunksize=CHUNK_SIZE, precision="float64", dedup_threshold=None):
+    """Trains on the postings CSV in two streaming passes and writes a model directory.
+
+    The directory matches what save_mmap_artifacts writes for extract_features' output
+    stored in the given precision (see compact_embeddings), on clean_job_data's postings
+    with the same dedup_threshold. Returns the model version.
+    """
+    chunks = lambda: iter_clean_chunks(file_path, chunksize)
+    if dedup_threshold:
+        plan = plan_chunk_collapse(chunks(), dedup_threshold)
+        chunks = lambda: collapse_chunks(iter_clean_chunks(file_path, chunksize), *plan)
+    stats = count_terms(chunks())
+    if not stats["n_docs"]:
+        raise ValueError(f"no postings after cleaning in {file_path}")
+    tfidf, mlb = fit_vectorizers(stats)
+
+    # Pass 2: embed chunk by chunk straight into the memory-mapped layout
+    writer = None
+    for chunk in chunks():
+        if writer is None:
+            writer = MmapArtifactWriter(dirpath, chunk.columns)
+        writer.append(compact_embeddings(transform_postings(chunk, tfidf, mlb), precision), chunk)
+    return writer.close(tfidf, mlb)
@@ -0,0 +1,159 @@
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+import sys
+import os
+import time
+
+# Read-only API tier served from a lite export (see lite_runtime): numpy and the standard
+# library only, no pandas / scikit-learn / scipy, so workers start fast and stay small.
+# Rankings are identical to the full backend's exact retrieval; filters, the inverted
+# index, skill-gap analysis and posting updates stay with the full backend (main.py).
+MODELS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "Phase2_ML_Models"))
+sys.path.append(MODELS_DIR)
+BACKEND_DIR = os.path.abspath(os.path.dirname(__file__))
+sys.path.append(BACKEND_DIR)
+
+from lite_runtime import load_lite_model
+from query_cache import QueryCache, canonical_skills
+from metrics import MetricsRegistry
+
+app = FastAPI(title="SkillSync Job Recommendation API (lite)")
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+PHASE3_DIR = os.path.abspath(os.path.join(MODELS_DIR, "..", "Phase3_Backend_APIs"))
+# Written by retrain.py --lite-dir or python lite_runtime.py <model> <dir>
+LITE_MODEL_DIR = os.environ.get("SKILLSYNC_LITE_MODEL_DIR", os.path.join(PHASE3_DIR, "job_recommendation_model_lite"))
+
+# Most profiles accepted by one /recommend/batch call
+MAX_BATCH_PROFILES = int(os.environ.get("SKILLSYNC_MAX_BATCH_PROFILES", "1000"))
+
+# The installed LiteModel; reloads replace the reference, in-flight requests keep the old one
+model_state = {"model": None}
+
+recommendation_cache = QueryCache(
+    max_entries=int(os.environ.get("SKILLSYNC_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.environ.get("SKILLSYNC_CACHE_TTL", "300"))
+)
+
+metrics = MetricsRegistry()
+request_seconds = metrics.histogram(
+    "skillsync_request_seconds", "HTTP request latency by route and status", ("method", "route", "status")
+)
+model_info = metrics.gauge(
+    "skillsync_model_info", "Version and embedding precision of the installed model (always 1)", ("version", "precision")
+)
+model_postings = metrics.gauge("skillsync_model_postings", "Postings in the installed model")
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        request_seconds.observe(
+            time.perf_counter() - start, method=request.method,
+            route=route.path if route is not None else "unmatched", status=status
+        )
+
+class SkillsRequest(BaseModel):
+    skills: list[str]
+    top_k: int = Field(3, ge=1, le=100)
+    offset: int = Field(0, ge=0)
+
+class BatchSkillsRequest(BaseModel):
+    profiles: list[list[str]] = Field(..., max_length=MAX_BATCH_PROFILES)
+    top_k: int = Field(3, ge=1, le=100)
+
+def install_model():
+    """Opens the lite export (memory-mapped) and swaps it in; returns it (None if missing)."""
+    model = load_lite_model(LITE_MODEL_DIR)
+    if model is not None:
+        model_state["model"] = model
+        recommendation_cache.clear()
+    return model
+
+def current_model():
+    model = model_state["model"]
+    if model is None:
+        raise HTTPException(status_code=503, detail="Model is not loaded")
+    return model
+
+@app.on_event("startup")
+async def load_model():
+    if install_model() is None:
+        print(f"WARNING: No lite model found at {LITE_MODEL_DIR}. API will answer 503.")
+    else:
+        print(f"✅ Lite model {model_state['model'].version} loaded!")
+
+@app.get("/")
+def read_root():
+    return {"status": "SkillSync API is running", "runtime": "lite"}
+
+@app.post("/recommend")
+def recommend_jobs(payload: SkillsRequest):
+    """
+    Get job recommendations based on user skills.
+    Example payload: {"skills": ["python", "data analysis"], "top_k": 10, "offset": 10}
+    """
+    model = current_model()
+    skills = canonical_skills(payload.skills)
+    cache_key = (model.version, tuple(skills), payload.top_k, payload.offset)
+    cached = recommendation_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    response = {
+        "recommendations": model.recommend(skills, top_k=payload.top_k, offset=payload.offset),
+        "total": len(model),
+        "offset": payload.offset
+    }
+    recommendation_cache.put(cache_key, response)
+    return response
+
+@app.post("/recommend/batch")
+def recommend_jobs_batch(payload: BatchSkillsRequest):
+    """
+    Get job recommendations for many skill profiles in one call.
+    Example payload: {"profiles": [["python", "sql"], ["react", "css"]], "top_k": 3}
+    """
+    model = current_model()
+    return {"results": [{"recommendations": model.recommend(canonical_skills(skills), top_k=payload.top_k)} for skills in payload.profiles]}
+
+@app.post("/admin/reload")
+def reload_model():
+    """Re-open the lite export, e.g. after retrain.py --lite-dir replaced it."""
+    model = install_model()
+    if model is None:
+        raise HTTPException(status_code=404, detail=f"No lite model at {LITE_MODEL_DIR}")
+    return {"model_version": model.version}
+
+def collect_metrics():
+    model = model_state["model"]
+    model_info.clear()
+    if model is not None:
+        model_info.set(1, version=model.version, precision=model.precision)
+        model_postings.set(len(model))
+
+metrics.add_collector(collect_metrics)
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Request latency and the installed model in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8000)
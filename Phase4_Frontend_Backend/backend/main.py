@@ -1,24 +1,57 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+from typing import Literal
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import multiprocessing
+import asyncio
+import codecs
 import sys
 import os
-import pandas as pd
+import time
 
 # Add the ML Models directory to path so we can import the model
 # Using relative path assuming we run from 'Phase4_LLM_Frontend' or root
 # Absolute path to be safe based on project structure
 MODELS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "Phase2_ML_Models"))
 sys.path.append(MODELS_DIR)
+# Backend helper modules, importable whether we run as a script or as backend.main
+BACKEND_DIR = os.path.abspath(os.path.dirname(__file__))
+sys.path.append(BACKEND_DIR)
 
 try:
-    from job_recommendation_model import clean_job_data, extract_features, get_recommendations
+    from job_recommendation_model import (
+        get_recommendations, get_recommendations_batch, get_skill_gap, build_metadata_index,
+        filter_candidates, normalize_filters, model_version, is_alive, metadata_mask
+    )
+    from inverted_index import build_inverted_index
+    from artifact_store import load_mmap_artifacts
+    from compact_embeddings import embedding_nbytes, embedding_precision
+    from posting_table import as_posting_table, take_postings
+    from skill_matcher import SKILL, build_skill_matcher
+    from similarity_graph import similar_jobs
+    from low_rank import get_recommendations_low_rank
+    from incremental_index import (
+        make_postings, add_postings, remove_postings, needs_idf_refresh, refresh_idf,
+        posting_key, replay_journal
+    )
+    from retrain import current_model_dir, train_and_publish, train_and_save_joblib
+    from stage_timing import set_stage_observer
 except ImportError as e:
     print(f"Error importing model: {e}")
     # Fallback for development if paths are tricky
     print(f"Attempted to look in: {MODELS_DIR}")
     sys.exit(1)
 
+from query_cache import QueryCache, canonical_skills
+from model_store import ModelSnapshot, ModelStore, ModelReloader, next_generation
+from micro_batcher import MicroBatcher
+from metrics import MetricsRegistry, SLOW_BUCKETS
+from sampling_profiler import SamplingProfiler
+from shard_pool import ShardPool, sharded_recommendations
+
 app = FastAPI(title="SkillSync Job Recommendation API")
 
 # Enable CORS for frontend
@@ -30,109 +63,814 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global variables to hold the model state
-model_state = {
-    "tfidf": None,
-    "mlb": None,
-    "embeddings": None,
-    "df": None
-}
+# The installed model: an immutable snapshot, replaced atomically by reloads and ingestion
+model_store = ModelStore()
+
+# Path to the dataset and model
+DATA_PATH = os.path.join(MODELS_DIR, "job_postings_final.csv")
+# Model now lives in Phase 3
+PHASE3_DIR = os.path.abspath(os.path.join(MODELS_DIR, "..", "Phase3_Backend_APIs"))
+MODEL_PATH = os.path.join(PHASE3_DIR, "job_recommendation_model.pkl")
+# Versioned memory-mapped model directories (see retrain.publish_model)
+MODEL_ROOT = os.path.join(PHASE3_DIR, "job_recommendation_model")
+
+# "mmap" (flat files shared by all workers through the page cache) or "joblib" (single pickle)
+ARTIFACT_FORMAT = os.environ.get("SKILLSYNC_ARTIFACT_FORMAT", "mmap")
+# Rows per chunk when retraining streams the CSV instead of loading it whole (0 = load whole; mmap only)
+TRAIN_CHUNKSIZE = int(os.environ.get("SKILLSYNC_TRAIN_CHUNKSIZE", "0"))
+# Processes that vectorize postings during rebuilds and IDF refreshes (0 = all cores)
+TRAIN_WORKERS = int(os.environ.get("SKILLSYNC_TRAIN_WORKERS", "1"))
+# Storage precision rebuilds write the embedding values in: float64, float32, float16 or int8
+# (see compact_embeddings); a saved model is served in the precision it was written in
+EMBEDDING_PRECISION = os.environ.get("SKILLSYNC_EMBEDDING_PRECISION", "float64")
+# Rebuilds collapse postings whose title/skill sets are at least this similar (0 = keep all; see posting_dedup)
+DEDUP_THRESHOLD = float(os.environ.get("SKILLSYNC_DEDUP_THRESHOLD", "0"))
+# Rebuilds store each posting's this many most similar postings for /jobs/{id}/similar (0 = none)
+SIMILAR_NEIGHBORS = int(os.environ.get("SKILLSYNC_SIMILAR_NEIGHBORS", "10"))
+# Rebuilds store a projection into this many dense dimensions for retrieval="dense" (0 = none; see low_rank)
+DENSE_DIM = int(os.environ.get("SKILLSYNC_DENSE_DIM", "0"))
+DENSE_METHOD = os.environ.get("SKILLSYNC_DENSE_METHOD", "svd")
+# Postings re-scored exactly after dense scoring (0 = answer with the approximate scores)
+DENSE_RERANK = int(os.environ.get("SKILLSYNC_DENSE_RERANK", "500"))
+
+# Re-estimate IDF once this fraction of the corpus has been added/removed since the last refresh
+IDF_REFRESH_RATIO = float(os.environ.get("SKILLSYNC_IDF_REFRESH_RATIO", "0.1"))
+# Background rebuilds: poll the postings CSV for changes / retrain periodically (seconds, 0 = off)
+WATCH_INTERVAL = float(os.environ.get("SKILLSYNC_WATCH_INTERVAL", "0"))
+RETRAIN_INTERVAL = float(os.environ.get("SKILLSYNC_RETRAIN_INTERVAL", "0"))
+# Exact /recommend scoring split over this many shard processes (0 = in-process; mmap only; see shard_pool)
+SHARDS = int(os.environ.get("SKILLSYNC_SHARDS", "0"))
+# A shard that has not answered within this long is left out of the (then partial) response
+SHARD_TIMEOUT = float(os.environ.get("SKILLSYNC_SHARD_TIMEOUT_MS", "250")) / 1000
+# Largest resume body accepted by /resume/skills
+RESUME_MAX_BYTES = int(os.environ.get("SKILLSYNC_RESUME_MAX_BYTES", str(5 * 1024 * 1024)))
+# Most profiles accepted by one /recommend/batch call
+MAX_BATCH_PROFILES = int(os.environ.get("SKILLSYNC_MAX_BATCH_PROFILES", "1000"))
+
+# Repeated /recommend calls (same skills from several pages) are served from here
+recommendation_cache = QueryCache(
+    max_entries=int(os.environ.get("SKILLSYNC_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.environ.get("SKILLSYNC_CACHE_TTL", "300"))
+)
+
+# Prometheus metrics served on GET /metrics
+metrics = MetricsRegistry()
+request_seconds = metrics.histogram(
+    "skillsync_request_seconds", "HTTP request latency by route and status", ("method", "route", "status")
+)
+stage_seconds = metrics.histogram(
+    "skillsync_query_stage_seconds", "Time spent in each stage of the recommendation query path", ("stage",)
+)
+model_build_seconds = metrics.histogram(
+    "skillsync_model_build_seconds", "Model training, artifact loading and index building time", ("phase",),
+    buckets=SLOW_BUCKETS
+)
+model_installs = metrics.counter("skillsync_model_installs_total", "Models installed, by origin", ("source",))
+model_info = metrics.gauge(
+    "skillsync_model_info", "Version and embedding precision of the installed model (always 1)", ("version", "precision")
+)
+model_postings = metrics.gauge("skillsync_model_postings", "Postings in the installed model (tombstones included)")
+model_embedding_bytes = metrics.gauge("skillsync_model_embedding_bytes", "Size of the installed embedding matrix")
+model_artifact_bytes = metrics.gauge("skillsync_model_artifact_bytes", "On-disk size of the last loaded model", ("format",))
+cache_requests = metrics.counter("skillsync_cache_requests_total", "Response cache lookups", ("result",))
+cache_evictions = metrics.counter("skillsync_cache_evictions_total", "Response cache LRU evictions")
+cache_entries = metrics.gauge("skillsync_cache_entries", "Responses currently cached")
+batches = metrics.counter("skillsync_recommend_batches_total", "Micro-batches scored for /recommend")
+batched_requests = metrics.counter("skillsync_recommend_batched_requests_total", "/recommend requests scored in micro-batches")
+profiler_running = metrics.gauge("skillsync_profiler_running", "1 while the sampling profiler is on")
+shard_requests = metrics.counter("skillsync_shard_requests_total", "Scatter-gather requests by shard and outcome", ("shard", "outcome"))
+shard_seconds = metrics.histogram("skillsync_shard_seconds", "Scatter-gather round trip by shard (answered requests)", ("shard",))
+partial_responses = metrics.counter("skillsync_partial_responses_total", "/recommend answers missing at least one shard")
+shards_alive = metrics.gauge("skillsync_shards_alive", "Shard processes loaded and running")
+
+# Each stage of the query path (see stage_timing) feeds skillsync_query_stage_seconds
+if os.environ.get("SKILLSYNC_STAGE_TIMING", "1") == "1":
+    set_stage_observer(lambda stage, seconds: stage_seconds.observe(seconds, stage=stage))
+
+# Opt-in sampling profiler, toggled through /admin/profiler (or on at startup with SKILLSYNC_PROFILER=1)
+profiler = SamplingProfiler(interval_seconds=float(os.environ.get("SKILLSYNC_PROFILER_INTERVAL_MS", "5")) / 1000)
+
+def observe_shard(shard, outcome, seconds):
+    shard_requests.inc(shard=shard, outcome=outcome)
+    if outcome == "ok":
+        shard_seconds.observe(seconds, shard=shard)
+
+shard_pool = ShardPool(
+    SHARDS if ARTIFACT_FORMAT == "mmap" else 0, SHARD_TIMEOUT,
+    max_pending=int(os.environ.get("SKILLSYNC_SHARD_MAX_PENDING", "2")), observe=observe_shard
+)
+
+@contextmanager
+def model_build_timer(phase):
+    start = time.perf_counter()
+    yield
+    model_build_seconds.observe(time.perf_counter() - start, phase=phase)
+
+def record_artifact_size(path, artifact_format):
+    if os.path.isdir(path):
+        size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+    else:
+        size = os.path.getsize(path)
+    model_artifact_bytes.clear()
+    model_artifact_bytes.set(size, format=artifact_format)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Route templates (/jobs/{job_id}) keep the label set bounded
+        route = request.scope.get("route")
+        request_seconds.observe(
+            time.perf_counter() - start, method=request.method,
+            route=route.path if route is not None else "unmatched", status=status
+        )
 
 class SkillsRequest(BaseModel):
     skills: list[str]
+    top_k: int = Field(3, ge=1, le=100)
+    offset: int = Field(0, ge=0)
+    # Case-insensitive exact matches; "SF"/"NY" stand for San Francisco/New York and the
+    # location "Remote" means remote_only (see normalize_filters)
+    location: str | None = None
+    company: str | None = None
+    remote_only: bool = False
+    # "exact" scores every posting, "inverted" only those sharing a token/skill with the
+    # query, "maxscore" additionally stops early once the top-k can no longer change,
+    # "dense" ranks by the low-rank projection and re-scores the best exactly (exact
+    # when the model has no projection). The index modes return only postings with a
+    # positive score; the others fill the page up to top_k with zero-score postings
+    retrieval: Literal["exact", "inverted", "maxscore", "dense"] = "exact"
+
+class JobPostingRequest(BaseModel):
+    job_title: str
+    company: str
+    required_skills: list[str]
+    location: str | None = None
+
+class BatchSkillsRequest(BaseModel):
+    profiles: list[list[str]] = Field(..., max_length=MAX_BATCH_PROFILES)
+    top_k: int = Field(3, ge=1, le=100)
+
+class ProfilerRequest(BaseModel):
+    enabled: bool
+    interval_ms: float = Field(5.0, gt=0, le=1000)
+    # Drop the stacks collected so far
+    reset: bool = False
+
+class SkillGapRequest(BaseModel):
+    skills: list[str]
+    # Size of the pool of most similar postings the missing skills are aggregated over
+    top_n: int = Field(500, ge=1, le=5000)
+    max_skills: int = Field(10, ge=1, le=100)
+    location: str | None = None
+    company: str | None = None
+    remote_only: bool = False
+
+def build_snapshot(tfidf, mlb, embeddings, df, inverted=None, version=None, similar=None, low_rank=None, index=None):
+    """Builds an installable snapshot of a trained model, including its filter and inverted indexes.
+
+    Memory-mapped artifacts already carry their inverted and filter indexes and version. Embeddings are
+    served in the precision they were stored in; rebuilds write them in EMBEDDING_PRECISION.
+    """
+    postings = as_posting_table(df)
+    version = version or model_version(embeddings, mlb)
+    return ModelSnapshot({
+        "tfidf": tfidf,
+        "mlb": mlb,
+        "embeddings": embeddings,
+        "df": postings,
+        "index": index if index is not None else build_metadata_index(postings),
+        "inverted": inverted if inverted is not None else build_inverted_index(embeddings),
+        # Resume skill extraction; rebuilt in the background whenever an update grows the
+        # skill vocabulary (see skill_matcher_reloader)
+        "skill_matcher": build_skill_matcher(tfidf, mlb),
+        # Precomputed nearest postings (see similarity_graph); None if the model has none
+        "similar": similar,
+        # Dense projection of the postings for retrieval="dense" (see low_rank); None if not built
+        "low_rank": low_rank,
+        "version": version,
+        "base_version": version,
+        "generation": 0,
+        "pending_updates": 0,
+        # Postings added/removed through the API, replayed onto every rebuilt model
+        "journal": ()
+    })
+
+def snapshot_from_artifacts(artifacts):
+    return build_snapshot(
+        artifacts["tfidf"], artifacts["mlb"], artifacts["embeddings"], artifacts["df"],
+        inverted=artifacts.get("inverted"), version=artifacts.get("version"), similar=artifacts.get("similar"),
+        low_rank=artifacts.get("low_rank"), index=artifacts.get("index")
+    )
+
+def install_snapshot(snapshot):
+    model_store.install(snapshot)
+    # Responses computed with the previous model are no longer valid
+    recommendation_cache.clear()
+
+def rebuild_skill_matcher():
+    """Builds the resume matcher for the installed skill vocabulary (skill_matcher_reloader thread)."""
+    state = model_store.current
+    return state["mlb"], build_skill_matcher(state["tfidf"], state["mlb"])
+
+def install_skill_matcher(built):
+    mlb, matcher = built
+    with model_store.write_lock:
+        current = model_store.current
+        # A vocabulary that grew again meanwhile has queued another build
+        if current["mlb"] is mlb:
+            model_store.install(current.evolve(skill_matcher=matcher))
+
+# Added postings can bring unseen skills (see grow_skill_vocabulary) that resumes must match
+# too. Building the automaton takes seconds on a large vocabulary, so it happens off the
+# write lock; until it is swapped in, resumes are matched with the previous one.
+skill_matcher_reloader = ModelReloader(rebuild_skill_matcher, install_skill_matcher)
+
+def refresh_skill_matcher(previous):
+    """Queues a matcher rebuild if the installed skill vocabulary is not previous's."""
+    if model_store.current["mlb"] is not previous["mlb"]:
+        skill_matcher_reloader.trigger("skill vocabulary grew")
+
+def apply_model_updates(updates, journal_entry=None):
+    """Installs fields replaced by an incremental update under a new model version.
+
+    Callers hold model_store.write_lock.
+    """
+    current = model_store.current
+    generation = next_generation()
+    journal = current["journal"] + ((journal_entry,) if journal_entry else ())
+    install_snapshot(current.evolve(
+        **updates,
+        generation=generation,
+        version=f"{current['base_version']}.{generation}",
+        journal=journal
+    ))
+    refresh_skill_matcher(current)
+
+def refresh_idf_if_needed():
+    with model_store.write_lock:
+        if needs_idf_refresh(model_store.current, IDF_REFRESH_RATIO):
+            apply_model_updates(refresh_idf(model_store.current, TRAIN_WORKERS))
+            print("🔄 IDF statistics refreshed.")
+
+def rebuild_model():
+    """Retrains from the CSV in a worker process, then opens the result (reloader thread).
+
+    Training never runs on the serving process, so request latency is unaffected;
+    only the cheap load and index build happen here, still off the request path.
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        if ARTIFACT_FORMAT == "mmap":
+            with model_build_timer("train"):
+                path = pool.submit(
+                    train_and_publish, DATA_PATH, MODEL_ROOT, TRAIN_CHUNKSIZE, TRAIN_WORKERS, EMBEDDING_PRECISION,
+                    DEDUP_THRESHOLD, SIMILAR_NEIGHBORS, DENSE_DIM, DENSE_METHOD
+                ).result()
+            with model_build_timer("load"):
+                artifacts = load_mmap_artifacts(path)
+            if shard_pool.enabled:
+                # Ready before the swap; meanwhile the old shards no longer match and requests score in-process
+                with model_build_timer("shards"):
+                    shard_pool.open(path, artifacts)
+        else:
+            with model_build_timer("train"):
+                path = pool.submit(
+                    train_and_save_joblib, DATA_PATH, MODEL_PATH, TRAIN_WORKERS, EMBEDDING_PRECISION, DEDUP_THRESHOLD,
+                    SIMILAR_NEIGHBORS, DENSE_DIM, DENSE_METHOD
+                ).result()
+            from job_recommendation_model import load_model_artifacts
+            with model_build_timer("load"):
+                artifacts = load_model_artifacts(path)
+    record_artifact_size(path, ARTIFACT_FORMAT)
+    with model_build_timer("index"):
+        return snapshot_from_artifacts(artifacts)
+
+def install_rebuilt_model(snapshot):
+    with model_store.write_lock:
+        built = snapshot
+        # Keep postings that only exist through the API (added or removed since startup);
+        # entries the rebuilt corpus already reflects leave the journal
+        journal = model_store.current["journal"]
+        if journal:
+            replayed, pending = replay_journal(built, journal)
+            if pending:
+                generation = next_generation()
+                replayed.update(generation=generation, version=f"{built['base_version']}.{generation}")
+            snapshot = ModelSnapshot({**replayed, "journal": pending})
+        install_snapshot(snapshot)
+        # The rebuilt matcher covers the rebuilt vocabulary, not skills the journal added
+        refresh_skill_matcher(built)
+    model_installs.inc(source="rebuild")
+    print(f"✅ Model {snapshot['version']} trained and swapped in!")
+
+model_reloader = ModelReloader(rebuild_model, install_rebuilt_model)
+
+async def watch_postings_file():
+    """Triggers a rebuild whenever the postings CSV changes on disk."""
+    last_seen = os.path.getmtime(DATA_PATH) if os.path.exists(DATA_PATH) else None
+    while True:
+        await asyncio.sleep(WATCH_INTERVAL)
+        modified = os.path.getmtime(DATA_PATH) if os.path.exists(DATA_PATH) else None
+        if modified != last_seen:
+            last_seen = modified
+            model_reloader.trigger("postings file changed")
+
+async def retrain_on_schedule():
+    while True:
+        await asyncio.sleep(RETRAIN_INTERVAL)
+        model_reloader.trigger("schedule")
 
 @app.on_event("startup")
 async def load_model():
-    """Load and train the model on startup."""
+    """Load the saved model on startup; training happens in the background."""
     print("Loading Job Recommendation Model...")
     
-    # Path to the dataset and model
-    # We use the same path logic as in the script
-    data_path = os.path.join(MODELS_DIR, "job_postings_final.csv")
-    
-    # Model now lives in Phase 3
-    # MODELS_DIR is .../Phase2_ML_Models
-    # We need .../Phase3_Backend_APIs
-    PHASE3_DIR = os.path.abspath(os.path.join(MODELS_DIR, "..", "Phase3_Backend_APIs"))
-    
     if not os.path.exists(PHASE3_DIR):
         os.makedirs(PHASE3_DIR)
-        
-    model_path = os.path.join(PHASE3_DIR, "job_recommendation_model.pkl")
+    
+    if WATCH_INTERVAL > 0:
+        asyncio.create_task(watch_postings_file())
+    if RETRAIN_INTERVAL > 0:
+        asyncio.create_task(retrain_on_schedule())
+    if os.environ.get("SKILLSYNC_PROFILER", "0") == "1":
+        profiler.start()
+    if SHARDS and ARTIFACT_FORMAT != "mmap":
+        print("WARNING: SKILLSYNC_SHARDS needs the mmap artifact format; scoring in-process.")
     
     try:
-        # 1. Try Loading from Disk
-        if os.path.exists(model_path):
+        # 1. Try Loading from Disk (memory-mapped directory first, joblib pickle as fallback)
+        artifacts = model_dir = None
+        if ARTIFACT_FORMAT == "mmap":
+            try:
+                path = current_model_dir(MODEL_ROOT)
+                if path:
+                    with model_build_timer("load"):
+                        artifacts = load_mmap_artifacts(path)
+                    record_artifact_size(path, "mmap")
+                    model_dir = path
+            except Exception as e:
+                print(f"⚠️  Memory-mapped model failed to load ({e}). Trying joblib...")
+        if artifacts is None and os.path.exists(MODEL_PATH):
             from job_recommendation_model import load_model_artifacts
-            artifacts = load_model_artifacts(model_path)
-            
-            if artifacts:
-                model_state["tfidf"] = artifacts["tfidf"]
-                model_state["mlb"] = artifacts["mlb"]
-                model_state["embeddings"] = artifacts["embeddings"]
-                model_state["df"] = artifacts["df"]
-                print("✅ Model loaded from disk successfully!")
-                return
-            else:
-                print("⚠️  Model file exists but failed to load. Retraining...")
-        else:
-            print("ℹ️  No saved model found. Training from scratch...")
-
-        # 2. Train if not loaded
-        if not os.path.exists(data_path):
-            print(f"WARNING: Data file not found at {data_path}. API will fail.")
-            return
-
-        # Clean Data
-        df = clean_job_data(data_path)
-        
-        # Extract Features (Train the model)
-        tfidf, mlb, embeddings = extract_features(df)
+            with model_build_timer("load"):
+                artifacts = load_model_artifacts(MODEL_PATH)
+            record_artifact_size(MODEL_PATH, "joblib")
         
-        # 3. Store in global state
-        model_state["tfidf"] = tfidf
-        model_state["mlb"] = mlb
-        model_state["embeddings"] = embeddings
-        model_state["df"] = df
-        
-        # 4. Save for next time
-        if os.path.exists(MODELS_DIR):
-            from job_recommendation_model import save_model_artifacts
-            save_model_artifacts(model_path, tfidf, mlb, embeddings, df)
-            print("💾 Model saved to disk.")
-        
-        print("✅ Model trained and loaded successfully!")
+        if artifacts:
+            with model_build_timer("index"):
+                snapshot = snapshot_from_artifacts(artifacts)
+            stored = embedding_precision(snapshot["embeddings"])
+            if stored != EMBEDDING_PRECISION:
+                print(f"ℹ️  Saved model stores {stored} embeddings; serving them as stored until a rebuild "
+                      f"writes {EMBEDDING_PRECISION}.")
+            install_snapshot(snapshot)
+            model_installs.inc(source="disk")
+            print("✅ Model loaded from disk successfully!")
+            if shard_pool.enabled and model_dir:
+                # Requests score in-process until the shard processes have loaded
+                asyncio.get_running_loop().run_in_executor(None, shard_pool.open, model_dir, artifacts)
+            return
+        print("ℹ️  No saved model found. Training from scratch in the background...")
     except Exception as e:
-        print(f"❌ Failed to load/train model: {e}")
+        print(f"❌ Failed to load model: {e}. Retraining in the background...")
         import traceback
         traceback.print_exc()
 
+    # 2. Train if not loaded; /recommend answers 503 until the model is swapped in
+    if not os.path.exists(DATA_PATH):
+        print(f"WARNING: Data file not found at {DATA_PATH}. API will fail.")
+        return
+    model_reloader.trigger("initial training")
+
 @app.get("/")
 def read_root():
     return {"status": "SkillSync API is running"}
 
+def _filter_key(payload):
+    return normalize_filters(payload.location, payload.company, payload.remote_only)
+
+def recommend_single(state, payload, skills):
+    """Ranks one /recommend request on its own."""
+    candidates = filter_candidates(
+        state["index"],
+        location=payload.location,
+        company=payload.company,
+        remote_only=payload.remote_only
+    )
+    recommendations = get_recommendations(
+        skills,
+        state["tfidf"],
+        state["mlb"],
+        state["embeddings"],
+        state["df"],
+        top_k=payload.top_k,
+        offset=payload.offset,
+        candidates=candidates,
+        inverted_index=None if payload.retrieval == "exact" else state["inverted"],
+        early_termination=payload.retrieval == "maxscore"
+    )
+    total = state["index"]["size"] if candidates is None else len(candidates)
+    return {"recommendations": recommendations, "total": total, "offset": payload.offset}
+
+def score_recommend_batch(requests):
+    """Scores coalesced /recommend requests (runs on the batcher thread).
+
+    Exact requests against the same snapshot and filters share one stacked query matrix
+    and one sparse product, dense requests one dense product; inverted-index requests are
+    already cheap and run one by one. Returns one response (or exception) per request.
+    """
+    results = [None] * len(requests)
+    groups = {}
+    for i, (state, payload, skills) in enumerate(requests):
+        if payload.retrieval in ("exact", "dense"):
+            dense = payload.retrieval == "dense" and state["low_rank"] is not None
+            groups.setdefault((id(state), _filter_key(payload), dense), []).append(i)
+            continue
+        try:
+            results[i] = recommend_single(state, payload, skills)
+        except Exception as e:
+            results[i] = e
+
+    for (_, _, dense), members in groups.items():
+        state, payload, _ = requests[members[0]]
+        shards = shard_pool.current
+        if not dense and shards is not None and shards.serves(state):
+            try:
+                batch, total, missing = sharded_recommendations(
+                    shards, state, [requests[i][2] for i in members],
+                    [requests[i][1].top_k for i in members], [requests[i][1].offset for i in members],
+                    location=payload.location, company=payload.company, remote_only=payload.remote_only,
+                    timeout=SHARD_TIMEOUT, observe=observe_shard
+                )
+            except Exception as e:
+                for i in members:
+                    results[i] = e
+                continue
+            # With no shard answering at all, the in-process path below still gives a full answer
+            if len(missing) < len(shards.workers):
+                for i, recommendations in zip(members, batch):
+                    results[i] = {"recommendations": recommendations, "total": total, "offset": requests[i][1].offset}
+                    if missing:
+                        results[i].update(partial=True, missing_shards=missing)
+                if missing:
+                    partial_responses.inc(len(members))
+                continue
+        try:
+            candidates = filter_candidates(
+                state["index"],
+                location=payload.location,
+                company=payload.company,
+                remote_only=payload.remote_only
+            )
+            if dense:
+                batch = get_recommendations_low_rank(
+                    [requests[i][2] for i in members],
+                    state["tfidf"],
+                    state["mlb"],
+                    state["embeddings"],
+                    state["df"],
+                    state["low_rank"],
+                    top_k=[requests[i][1].top_k for i in members],
+                    offset=[requests[i][1].offset for i in members],
+                    candidates=candidates,
+                    rerank=DENSE_RERANK
+                )
+            else:
+                batch = get_recommendations_batch(
+                    [requests[i][2] for i in members],
+                    state["tfidf"],
+                    state["mlb"],
+                    state["embeddings"],
+                    state["df"],
+                    top_k=[requests[i][1].top_k for i in members],
+                    offset=[requests[i][1].offset for i in members],
+                    candidates=candidates
+                )
+            total = state["index"]["size"] if candidates is None else len(candidates)
+            for i, recommendations in zip(members, batch):
+                results[i] = {"recommendations": recommendations, "total": total, "offset": requests[i][1].offset}
+        except Exception as e:
+            for i in members:
+                results[i] = e
+    return results
+
+# Concurrent /recommend calls are coalesced over a short window and scored together
+recommend_batcher = MicroBatcher(
+    score_recommend_batch,
+    window_seconds=float(os.environ.get("SKILLSYNC_BATCH_WINDOW_MS", "2")) / 1000,
+    max_batch_size=int(os.environ.get("SKILLSYNC_BATCH_MAX_SIZE", "64"))
+)
+
 @app.post("/recommend")
-def recommend_jobs(payload: SkillsRequest):
+async def recommend_jobs(payload: SkillsRequest):
     """
     Get job recommendations based on user skills.
-    Example payload: {"skills": ["python", "data analysis"]}
+    Example payload: {"skills": ["python", "data analysis"], "top_k": 10, "offset": 10,
+                      "location": "NY", "company": null, "remote_only": false}
     """
-    if model_state["tfidf"] is None:
+    state = model_store.current
+    if state["tfidf"] is None:
         raise HTTPException(status_code=503, detail="Model is not loaded")
     
+    # Canonical skill set + query parameters + model version identify a response
+    skills = canonical_skills(payload.skills)
+    cache_key = (state["version"], tuple(skills), payload.top_k, payload.offset, *_filter_key(payload), payload.retrieval)
+    cached = recommendation_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
-        recommendations = get_recommendations(
-            payload.skills,
-            model_state["tfidf"],
-            model_state["mlb"],
-            model_state["embeddings"],
-            model_state["df"]
-        )
-        return {"recommendations": recommendations}
+        response = await recommend_batcher.submit((state, payload, skills))
+        # A partial answer (some shards missing) is not worth repeating
+        if not response.get("partial"):
+            recommendation_cache.put(cache_key, response)
+        return response
     except Exception as e:
         print(f"Error generating recommendations: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/recommend/batch")
+def recommend_jobs_batch(payload: BatchSkillsRequest):
+    """
+    Get job recommendations for many skill profiles in one call.
+    Example payload: {"profiles": [["python", "sql"], ["react", "css"]], "top_k": 3}
+    """
+    state = model_store.current
+    if state["tfidf"] is None:
+        raise HTTPException(status_code=503, detail="Model is not loaded")
+    
+    try:
+        results = get_recommendations_batch(
+            payload.profiles,
+            state["tfidf"],
+            state["mlb"],
+            state["embeddings"],
+            state["df"],
+            top_k=payload.top_k,
+            candidates=filter_candidates(state["index"])
+        )
+        return {"results": [{"recommendations": recs} for recs in results]}
+    except Exception as e:
+        print(f"Error generating batch recommendations: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/skill-gap")
+def skill_gap(payload: SkillGapRequest):
+    """
+    Rank the skills to learn by score-weighted demand among the top_n most similar postings.
+    Example payload: {"skills": ["python", "sql"], "top_n": 500, "max_skills": 10}
+    """
+    state = model_store.current
+    if state["tfidf"] is None:
+        raise HTTPException(status_code=503, detail="Model is not loaded")
+    
+    skills = canonical_skills(payload.skills)
+    cache_key = ("skill-gap", state["version"], tuple(skills), payload.top_n, payload.max_skills, *_filter_key(payload))
+    cached = recommendation_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    try:
+        candidates = filter_candidates(
+            state["index"],
+            location=payload.location,
+            company=payload.company,
+            remote_only=payload.remote_only
+        )
+        response = get_skill_gap(
+            skills,
+            state["tfidf"],
+            state["mlb"],
+            state["embeddings"],
+            top_n=payload.top_n,
+            max_skills=payload.max_skills,
+            candidates=candidates
+        )
+        recommendation_cache.put(cache_key, response)
+        return response
+    except Exception as e:
+        print(f"Error computing skill gap: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/resume/skills")
+async def resume_skills(request: Request, recommend: bool = False, top_k: int = Query(3, ge=1, le=100)):
+    """
+    Extract the skills the model knows from a plain-text resume sent as the request body.
+    The body is scanned chunk by chunk as it arrives. With recommend=true the extracted
+    skills and keywords are also ranked like /recommend.
+    Example: curl --data-binary @resume.txt -H "Content-Type: text/plain" \
+             "http://localhost:8000/resume/skills?recommend=true&top_k=5"
+    """
+    state = model_store.current
+    if state["tfidf"] is None:
+        raise HTTPException(status_code=503, detail="Model is not loaded")
+    
+    scanner = state["skill_matcher"].scanner()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > RESUME_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"Resume larger than {RESUME_MAX_BYTES} bytes")
+        # Scanning is CPU work; keep it off the event loop
+        await asyncio.to_thread(scanner.feed, decoder.decode(chunk))
+    scanner.feed(decoder.decode(b"", final=True))
+    matches = scanner.finish()
+    
+    skills = [phrase for phrase, kind, _ in matches if kind & SKILL]
+    # Vocabulary terms that are not skills still count towards the text similarity
+    terms = [phrase for phrase, kind, _ in matches if not kind & SKILL]
+    response = {
+        "skills": skills,
+        "terms": terms,
+        "mentions": {phrase: count for phrase, _, count in matches},
+        "characters": scanner.position
+    }
+    if recommend:
+        response["recommendations"] = await asyncio.to_thread(
+            get_recommendations,
+            skills + terms,
+            state["tfidf"],
+            state["mlb"],
+            state["embeddings"],
+            state["df"],
+            top_k=top_k,
+            candidates=filter_candidates(state["index"])
+        )
+    return response
+
+@app.post("/jobs")
+def add_job(payload: JobPostingRequest, background_tasks: BackgroundTasks):
+    """
+    Add a posting to the live index; it is searchable as soon as this returns.
+    Example payload: {"job_title": "Data Engineer", "company": "DataCo",
+                      "required_skills": ["Python", "Spark"], "location": "Remote"}
+    """
+    if model_store.current["tfidf"] is None:
+        raise HTTPException(status_code=503, detail="Model is not loaded")
+    
+    row = {
+        "Job Title": payload.job_title,
+        "Company": payload.company,
+        "Required Skills": ", ".join(payload.required_skills)
+    }
+    if payload.location is not None:
+        row["Location"] = payload.location
+    
+    try:
+        postings = make_postings([row])
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    with model_store.write_lock:
+        updates, job_ids = add_postings(model_store.current, postings)
+        apply_model_updates(updates, journal_entry=("add", row))
+    background_tasks.add_task(refresh_idf_if_needed)
+    return {"id": job_ids[0], "model_version": model_store.current["version"]}
+
+@app.delete("/jobs/{job_id}")
+def delete_job(job_id: int, background_tasks: BackgroundTasks):
+    """Tombstone a posting so it is no longer recommended."""
+    if model_store.current["tfidf"] is None:
+        raise HTTPException(status_code=503, detail="Model is not loaded")
+    
+    with model_store.write_lock:
+        state = model_store.current
+        if not is_alive(state["index"], job_id):
+            raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+        df = state["df"]
+        key = posting_key(df['Job Title'][job_id], df['Company'][job_id], df['Required Skills'][job_id])
+        apply_model_updates(remove_postings(state, [job_id]), journal_entry=("delete", key))
+    background_tasks.add_task(refresh_idf_if_needed)
+    return {"id": job_id, "deleted": True, "model_version": model_store.current["version"]}
+
+@app.get("/jobs/{job_id}/similar")
+def similar_job_postings(job_id: int, limit: int = Query(5, ge=1, le=100)):
+    """
+    Postings most similar to one posting ("more like this"), best first.
+    Served from the similarity graph built with the model; limit is capped by its size.
+    """
+    state = model_store.current
+    if state["tfidf"] is None:
+        raise HTTPException(status_code=503, detail="Model is not loaded")
+    if not is_alive(state["index"], job_id):
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+    ids, scores = similar_jobs(
+        state["similar"], job_id, state["embeddings"], limit, metadata_mask(state["index"], "alive")
+    )
+    rows = take_postings(state["df"], ids, ['Job Title', 'Company', 'skills_list'])
+    similar = [
+        {
+            "Job ID": similar_id,
+            "Job Title": title,
+            "Company": company,
+            "Similarity": f"{round(score * 100, 1)}%",
+            "Score": round(score, 4),
+            "Required Skills": list(job_skills)
+        }
+        for similar_id, title, company, job_skills, score in zip(
+            ids.tolist(), rows['Job Title'], rows['Company'], rows['skills_list'], scores.astype(float).tolist()
+        )
+    ]
+    return {"id": job_id, "similar": similar, "model_version": state["version"]}
+
+@app.post("/jobs/refresh-idf")
+def refresh_job_idf():
+    """Recompute IDF over the live postings now instead of waiting for the threshold."""
+    if model_store.current["tfidf"] is None:
+        raise HTTPException(status_code=503, detail="Model is not loaded")
+    
+    with model_store.write_lock:
+        apply_model_updates(refresh_idf(model_store.current, TRAIN_WORKERS))
+    return {"model_version": model_store.current["version"]}
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Hit/miss counters of the recommendation cache and /recommend micro-batch sizes."""
+    return {
+        "model_version": model_store.current["version"],
+        **recommendation_cache.stats(),
+        "batching": recommend_batcher.stats()
+    }
+
+@app.post("/admin/reload", status_code=202)
+def reload_model():
+    """Retrain from the postings CSV in the background and hot-swap the result."""
+    started = model_reloader.trigger("admin request")
+    return {"started": started, "model_version": model_store.current["version"], **model_reloader.status}
+
+@app.get("/admin/reload")
+def reload_status():
+    """State of the last background rebuild."""
+    return {"model_version": model_store.current["version"], **model_reloader.status}
+
+@app.get("/admin/shards")
+def shard_health():
+    """Per-shard row range, liveness, backlog, timeouts and restarts of the scatter-gather scorers."""
+    return shard_pool.health()
+
+@app.on_event("shutdown")
+def stop_shards():
+    shard_pool.close()
+
+@app.post("/admin/profiler")
+def configure_profiler(payload: ProfilerRequest):
+    """
+    Turn the sampling profiler on or off without a restart.
+    Example payload: {"enabled": true, "interval_ms": 5, "reset": true}
+    """
+    if payload.reset:
+        profiler.reset()
+    if payload.enabled:
+        profiler.start(payload.interval_ms / 1000)
+    else:
+        profiler.stop()
+    return profiler.stats()
+
+@app.get("/admin/profiler")
+def profiler_report(limit: int = 50, format: Literal["json", "collapsed"] = "json"):
+    """Most sampled stacks; format=collapsed returns every stack for flamegraph.pl / speedscope."""
+    if format == "collapsed":
+        return PlainTextResponse(profiler.collapsed())
+    return {
+        **profiler.stats(),
+        "stacks": [{"stack": stack, "count": count} for stack, count in profiler.top(limit)]
+    }
+
+def collect_metrics():
+    """Refreshes the metrics that mirror state kept elsewhere (model, cache, batcher, profiler)."""
+    state = model_store.current
+    embeddings = state["embeddings"]
+    model_info.clear()
+    if embeddings is not None:
+        model_info.set(1, version=state["version"], precision=embedding_precision(embeddings))
+        model_postings.set(embeddings.shape[0])
+        model_embedding_bytes.set(embedding_nbytes(embeddings))
+    
+    cache = recommendation_cache.stats()
+    cache_requests.set(cache["hits"], result="hit")
+    cache_requests.set(cache["misses"], result="miss")
+    cache_evictions.set(cache["evictions"])
+    cache_entries.set(cache["size"])
+    batches.set(recommend_batcher.batches)
+    batched_requests.set(recommend_batcher.items)
+    profiler_running.set(int(profiler.running))
+    shards = shard_pool.current
+    shards_alive.set(sum(worker.alive for worker in shards.workers) if shards is not None else 0)
+
+metrics.add_collector(collect_metrics)
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Counters, gauges and latency histograms in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     # Run the server
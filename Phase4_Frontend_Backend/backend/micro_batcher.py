@@ -0,0 +1,80 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class MicroBatcher:
+    """Coalesces concurrent async calls into batches scored by one function.
+
+    submit(item) waits up to window_seconds for other items (or until max_batch_size are
+    queued), then score_batch(items) runs on a dedicated thread and returns one result
+    per item, in order. While a batch is being scored the next one keeps filling and is
+    sent as soon as the thread is free, so batches grow with load and the added latency
+    stays bounded by the window plus one batch.
+    score_batch may return an Exception in place of a result to fail only that item; an
+    exception it raises fails every item of the batch.
+    """
+
+    def __init__(self, score_batch, window_seconds=0.002, max_batch_size=64):
+        self.score_batch = score_batch
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="micro-batcher")
+        self._pending = []
+        self._timer = None
+        self._running = False
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # One batch at a time: items arriving meanwhile wait for it and go out together
+        if self._running or not self._pending:
+            return
+        batch, self._pending = self._pending[:self.max_batch_size], self._pending[self.max_batch_size:]
+        self._running = True
+        asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch):
+        items = [item for item, _ in batch]
+        results = None
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self._executor, self.score_batch, items)
+            if len(results) != len(batch):
+                raise ValueError(f"score_batch returned {len(results)} results for {len(batch)} items")
+            self.batches += 1
+            self.items += len(batch)
+        except Exception as e:
+            results = [e] * len(batch)
+        finally:
+            self._running = False
+            self._flush()
+            # Every caller is answered, also when the run itself is cancelled (results None)
+            for index, (_, future) in enumerate(batch):
+                # The caller may have gone away (client disconnect cancels its future)
+                if future.done():
+                    continue
+                if results is None:
+                    future.cancel()
+                elif isinstance(results[index], Exception):
+                    future.set_exception(results[index])
+                else:
+                    future.set_result(results[index])
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0
+        }
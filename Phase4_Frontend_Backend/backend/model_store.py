@@ -0,0 +1,126 @@
+import itertools
+import threading
+import time
+import traceback
+from collections.abc import Mapping
+
+
+class ModelSnapshot(Mapping):
+    """Read-only, versioned view of one installed model.
+
+    Fields are the usual model state keys (tfidf, mlb, embeddings, df, index, inverted,
+    version, ...). A request grabs the current snapshot once and uses it to the end, so a
+    swap never changes the model underneath an in-flight request. Updates produce a new
+    snapshot that shares every unchanged field with this one.
+    """
+
+    def __init__(self, fields):
+        self._fields = dict(fields)
+
+    def __getitem__(self, key):
+        return self._fields[key]
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def evolve(self, **updates):
+        return ModelSnapshot({**self._fields, **updates})
+
+
+EMPTY_SNAPSHOT = ModelSnapshot({
+    "tfidf": None,
+    "mlb": None,
+    "embeddings": None,
+    "df": None,
+    "index": None,
+    "inverted": None,
+    "skill_matcher": None,
+    "similar": None,
+    "low_rank": None,
+    "version": None,
+    "base_version": None,
+    "generation": 0,
+    "pending_updates": 0,
+    "journal": ()
+})
+
+
+# Generations of every snapshot derived in this process; versions built from them never repeat
+_generations = itertools.count(1)
+
+def next_generation():
+    return next(_generations)
+
+
+class ModelStore:
+    """Holds the current snapshot; installing a new one is a single reference swap.
+
+    Readers never lock. Writers that derive the next snapshot from the current one hold
+    write_lock so concurrent updates are not lost.
+    """
+
+    def __init__(self):
+        self._current = EMPTY_SNAPSHOT
+        self.write_lock = threading.RLock()
+
+    @property
+    def current(self):
+        return self._current
+
+    def install(self, snapshot):
+        self._current = snapshot
+
+
+class ModelReloader:
+    """Runs model rebuilds in the background, one at a time.
+
+    build() does the expensive work (typically in a worker process) and returns whatever
+    install() needs; install() performs the swap. A trigger that arrives while a rebuild
+    is running schedules exactly one more rebuild afterwards.
+    """
+
+    def __init__(self, build, install):
+        self._build = build
+        self._install = install
+        self._lock = threading.Lock()
+        self._thread = None
+        self._rerun = False
+        self.status = {"state": "idle", "reason": None, "started_at": None,
+                       "finished_at": None, "duration_seconds": None, "error": None}
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def trigger(self, reason):
+        """Starts a rebuild unless one is running; returns True if a new one started."""
+        with self._lock:
+            if self.running:
+                self._rerun = True
+                return False
+            self._thread = threading.Thread(target=self._run, args=(reason,), name="model-reloader", daemon=True)
+            self._thread.start()
+            return True
+
+    def _run(self, reason):
+        while True:
+            started = time.time()
+            self.status.update(state="running", reason=reason, started_at=started, finished_at=None,
+                               duration_seconds=None, error=None)
+            try:
+                self._install(self._build())
+                self.status.update(state="idle")
+            except Exception as e:
+                traceback.print_exc()
+                self.status.update(state="failed", error=str(e))
+            finished = time.time()
+            self.status.update(finished_at=finished, duration_seconds=round(finished - started, 3))
+
+            with self._lock:
+                if not self._rerun:
+                    return
+                self._rerun = False
+                reason = "queued"
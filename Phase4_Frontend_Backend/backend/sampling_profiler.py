@@ -0,0 +1,94 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class SamplingProfiler:
+    """Statistical profiler for the running server, switched on and off at runtime.
+
+    While running, a daemon thread wakes every interval_seconds, reads the Python stack of
+    every other thread (sys._current_frames) and counts identical stacks. Nothing is
+    instrumented, so the cost is one stack walk per thread per sample and zero when
+    stopped. Stacks are reported in the collapsed format ("thread;outer;...;inner count")
+    read by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval_seconds=0.005, max_depth=64):
+        self.interval_seconds = interval_seconds
+        self.max_depth = max_depth
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.samples = 0
+        self.started_at = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_seconds=None):
+        """Starts sampling (keeping earlier samples); returns False if it was already running."""
+        with self._lock:
+            if interval_seconds is not None:
+                self.interval_seconds = interval_seconds
+            if self.running:
+                return False
+            self._stop.clear()
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+            self.samples = 0
+
+    def _frame_label(self, frame):
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval_seconds):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                labels = []
+                while frame is not None and len(labels) < self.max_depth:
+                    labels.append(self._frame_label(frame))
+                    frame = frame.f_back
+                stacks.append(";".join([names.get(ident, str(ident)), *reversed(labels)]))
+            with self._lock:
+                self._counts.update(stacks)
+                self.samples += 1
+
+    def top(self, limit=50):
+        """The most frequent stacks as (stack, count), most frequent first."""
+        with self._lock:
+            return self._counts.most_common(limit)
+
+    def collapsed(self):
+        """All stacks in collapsed format, one "stack count" per line."""
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self._counts.most_common())
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval_seconds,
+            "samples": self.samples,
+            "distinct_stacks": len(self._counts),
+            "started_at": self.started_at
+        }
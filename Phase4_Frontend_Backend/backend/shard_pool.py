@@ -0,0 +1,387 @@
+import itertools
+import threading
+import time
+from concurrent.futures import Future, wait
+
+import numpy as np
+
+from artifact_store import load_mmap_artifacts
+from compact_embeddings import row_block, score_postings
+from job_recommendation_model import (
+    build_recommendations, clean_user_skills, filter_candidates, metadata_mask, vectorize_users
+)
+from ranking import top_k_indices
+from posting_table import as_posting_table
+
+
+# Sharded Scatter-Gather Scoring
+# The postings of a memory-mapped model directory are split into K contiguous row ranges,
+# each served by its own process. A shard maps only its slice of the embeddings and
+# metadata, so its resident memory is its share of the corpus, and the K sparse products
+# run on K cores. The front end vectorizes the queries once and sends them to every shard;
+# each shard answers with the records of its local top offset + top_k, and merging those
+# gives exactly the single-process ranking, since every global top posting is in its
+# shard's local top.
+#
+# Every shard has its own timeout. A shard that misses it (or has too many unanswered
+# requests, or died) is left out of that answer, which is then partial; dead shard
+# processes are restarted in the background.
+
+# Seconds a shard process may take to load its slice before it counts as failed
+READY_TIMEOUT = 120.0
+# Restart backoff of a shard process that keeps dying (seconds, doubled up to the max)
+RESTART_DELAY = 1.0
+MAX_RESTART_DELAY = 30.0
+_READY = "ready"
+
+
+class ShardUnavailable(Exception):
+    """The shard cannot take requests (loading, restarting or too far behind)."""
+
+
+def shard_bounds(size, n_shards):
+    """Row ranges [bounds[i], bounds[i + 1]) of n_shards nearly equal shards."""
+    return np.linspace(0, size, n_shards + 1).astype(np.int64)
+
+def _score_shard(model, queries, tops, candidates, excluded):
+    """Local top postings of every query: [(global ids, scores, records)]."""
+    embeddings, start = model["embeddings"], model["start"]
+    # Skill columns added to the vocabulary after this model was trained are empty here
+    queries = queries[:, :embeddings.shape[1]].tocsr()
+    score_block = score_postings(embeddings, queries)
+    results = []
+    for col, top in enumerate(tops):
+        scores = score_block[:, col]
+        if excluded is not None and len(excluded):
+            scores = scores.copy()
+            scores[excluded] = -np.inf
+        best = top_k_indices(scores, top, 0, candidates)
+        best = best[np.isfinite(scores[best])]
+        records = build_recommendations(
+            best, scores[best], queries[col], model["tfidf"], model["mlb"], embeddings, model["df"], job_ids=best + start
+        )
+        results.append((best + start, scores[best], records))
+    return results
+
+def serve_shard(conn, model_dir, start, stop):
+    """Shard process: serves rows [start, stop) of a model directory until told to stop."""
+    artifacts = load_mmap_artifacts(model_dir)
+    embeddings = row_block(artifacts["embeddings"], start, stop)
+    model = {
+        "tfidf": artifacts["tfidf"],
+        "mlb": artifacts["mlb"],
+        "embeddings": embeddings,
+        "df": as_posting_table(artifacts["df"]).rows(start, stop),
+        "start": start
+    }
+    conn.send((_READY, artifacts["version"]))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        request_id, queries, tops, candidates, excluded = message
+        started = time.perf_counter()
+        try:
+            reply = (request_id, True, _score_shard(model, queries, tops, candidates, excluded))
+        except Exception as e:
+            reply = (request_id, False, f"{type(e).__name__}: {e}")
+        conn.send(reply + (time.perf_counter() - started,))
+
+
+class ShardWorker:
+    """One shard process plus the thread that routes its replies to waiting futures."""
+
+    def __init__(self, shard, model_dir, start, stop, context, max_pending=2):
+        self.shard = shard
+        self.start = start
+        self.stop = stop
+        self._args = (model_dir, start, stop)
+        self._context = context
+        self.max_pending = max_pending
+        self.ready = threading.Event()
+        self.closed = False
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._ids = itertools.count()
+        self.stats = {"requests": 0, "timeouts": 0, "errors": 0, "skipped": 0, "restarts": 0,
+                      "last_seconds": None, "compute_seconds": None}
+        self._spawn()
+        threading.Thread(target=self._read, name=f"shard-{shard}", daemon=True).start()
+
+    def _spawn(self):
+        conn, child = self._context.Pipe()
+        self._process = self._context.Process(
+            target=serve_shard, args=(child, *self._args), name=f"skillsync-shard-{self.shard}", daemon=True
+        )
+        self._process.start()
+        child.close()
+        self._conn = conn
+
+    @property
+    def alive(self):
+        return self.ready.is_set() and self._process.is_alive()
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def _read(self):
+        delay = RESTART_DELAY
+        while not self.closed:
+            try:
+                message = self._conn.recv()
+            except (EOFError, OSError):
+                self._lost()
+                if self.closed:
+                    return
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_RESTART_DELAY)
+                if not self.closed:
+                    self.stats["restarts"] += 1
+                    self._spawn()
+                continue
+            if message[0] == _READY:
+                delay = RESTART_DELAY
+                self.ready.set()
+                continue
+            request_id, ok, result, seconds = message
+            with self._lock:
+                future, sent = self._pending.pop(request_id, (None, None))
+            if future is None:
+                continue
+            self.stats["last_seconds"] = time.perf_counter() - sent
+            self.stats["compute_seconds"] = seconds
+            # A caller that timed out has stopped waiting; the late answer is dropped
+            if ok:
+                future.set_result(result)
+            else:
+                self.stats["errors"] += 1
+                future.set_exception(RuntimeError(f"shard {self.shard}: {result}"))
+
+    def _lost(self):
+        self.ready.clear()
+        self._conn.close()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future, _ in pending.values():
+            future.set_exception(ShardUnavailable(f"shard {self.shard} process exited"))
+
+    def submit(self, queries, tops, candidates, excluded):
+        future = Future()
+        if not self.alive:
+            self.stats["skipped"] += 1
+            future.set_exception(ShardUnavailable(f"shard {self.shard} is not ready"))
+            return future
+        if len(self._pending) >= self.max_pending:
+            # Still busy with requests whose callers gave up: queueing more only adds delay
+            self.stats["skipped"] += 1
+            future.set_exception(ShardUnavailable(f"shard {self.shard} is behind"))
+            return future
+
+        request_id = next(self._ids)
+        with self._lock:
+            self._pending[request_id] = (future, time.perf_counter())
+        self.stats["requests"] += 1
+        try:
+            with self._send_lock:
+                self._conn.send((request_id, queries, tops, candidates, excluded))
+        except (OSError, ValueError) as e:
+            with self._lock:
+                self._pending.pop(request_id, None)
+            future.set_exception(ShardUnavailable(f"shard {self.shard}: {e}"))
+        return future
+
+    def close(self):
+        self.closed = True
+        try:
+            with self._send_lock:
+                self._conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self._process.join(timeout=5)
+        if self._process.is_alive():
+            self._process.terminate()
+
+    def health(self):
+        return {
+            "shard": self.shard,
+            "rows": [int(self.start), int(self.stop)],
+            "alive": self.alive,
+            "pid": self._process.pid,
+            "pending": self.pending,
+            **self.stats
+        }
+
+
+class ShardSet:
+    """The K shard processes serving one model directory."""
+
+    def __init__(self, model_dir, artifacts, n_shards, context, max_pending=2):
+        self.model_dir = model_dir
+        self.version = artifacts["version"]
+        # Front-end snapshots built from these artifacts share this object (see serves)
+        self.tfidf = artifacts["tfidf"]
+        self.size = artifacts["embeddings"].shape[0]
+        bounds = shard_bounds(self.size, n_shards)
+        self.workers = [
+            ShardWorker(i, model_dir, int(bounds[i]), int(bounds[i + 1]), context, max_pending)
+            for i in range(n_shards)
+        ]
+
+    def wait_ready(self, timeout=READY_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        return all(worker.ready.wait(max(deadline - time.monotonic(), 0)) for worker in self.workers)
+
+    def serves(self, state):
+        """True if the shards hold this snapshot's postings (possibly plus appended ones).
+
+        Postings added or removed through the API keep the TF-IDF model; an IDF refresh or
+        a rebuild replaces it, and the shards no longer match.
+        """
+        return state["tfidf"] is self.tfidf
+
+    def search(self, queries, tops, candidates=None, excluded=None, timeout=0.25, observe=None):
+        """Sends the queries to every shard and waits up to timeout.
+
+        candidates (sorted global ids to rank) or excluded (global ids never to return)
+        restrict the postings. Returns the local results of the shards that answered and
+        the ids of those that did not. observe(shard, outcome, seconds) sees every shard.
+        """
+        started = time.perf_counter()
+        futures = []
+        for worker in self.workers:
+            local_candidates = local_excluded = None
+            if candidates is not None:
+                lo, hi = np.searchsorted(candidates, [worker.start, worker.stop])
+                local_candidates = (candidates[lo:hi] - worker.start).astype(np.int32)
+            if excluded is not None:
+                lo, hi = np.searchsorted(excluded, [worker.start, worker.stop])
+                local_excluded = (excluded[lo:hi] - worker.start).astype(np.int32)
+            futures.append(worker.submit(queries, tops, local_candidates, local_excluded))
+        wait(futures, timeout=timeout)
+
+        answered, missing = [], []
+        for worker, future in zip(self.workers, futures):
+            if not future.done():
+                outcome = "timeout"
+                worker.stats["timeouts"] += 1
+            elif future.exception() is not None:
+                outcome = "unavailable" if isinstance(future.exception(), ShardUnavailable) else "error"
+            else:
+                outcome = "ok"
+                answered.append(future.result())
+            if outcome != "ok":
+                missing.append(worker.shard)
+            if observe is not None:
+                observe(worker.shard, outcome, time.perf_counter() - started)
+        return answered, missing
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+    def health(self):
+        return {
+            "model_dir": self.model_dir,
+            "version": self.version,
+            "postings": int(self.size),
+            "shards": [worker.health() for worker in self.workers]
+        }
+
+
+class ShardPool:
+    """Holds the current ShardSet; opening a new model starts a new set and then swaps."""
+
+    def __init__(self, n_shards, timeout_seconds=0.25, max_pending=2, context=None, observe=None):
+        import multiprocessing
+        self.n_shards = n_shards
+        self.timeout_seconds = timeout_seconds
+        self.max_pending = max_pending
+        self.observe = observe
+        self._context = context or multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self.current = None
+
+    @property
+    def enabled(self):
+        return self.n_shards > 0
+
+    def open(self, model_dir, artifacts):
+        """Starts shards for a model directory and swaps them in once loaded (blocks)."""
+        shards = ShardSet(model_dir, artifacts, self.n_shards, self._context, self.max_pending)
+        if not shards.wait_ready():
+            # Serve anyway: missing shards make answers partial and keep restarting
+            print(f"⚠️  Not every shard of {model_dir} loaded within {READY_TIMEOUT:.0f}s")
+        with self._lock:
+            old, self.current = self.current, shards
+        if old is not None:
+            old.close()
+        return shards
+
+    def close(self):
+        with self._lock:
+            old, self.current = self.current, None
+        if old is not None:
+            old.close()
+
+    def health(self):
+        shards = self.current
+        return {"enabled": self.enabled, "shard_count": self.n_shards,
+                **(shards.health() if shards is not None else {"shards": []})}
+
+
+def sharded_recommendations(shards, state, skills_batch, top_ks, offsets, location=None, company=None,
+                            remote_only=False, timeout=0.25, observe=None):
+    """Ranks profiles on the shards plus the snapshot's appended rows; same records as get_recommendations.
+
+    Returns (one recommendation list per profile, number of postings ranked, ids of the shards
+    missing from the answer).
+    """
+    tfidf, mlb, index = state["tfidf"], state["mlb"], state["index"]
+    queries = vectorize_users([clean_user_skills(skills) for skills in skills_batch], tfidf, mlb)
+    tops = [int(top_k) + int(offset) for top_k, offset in zip(top_ks, offsets)]
+
+    candidates = excluded = None
+    if location or company or remote_only:
+        candidates = filter_candidates(index, location=location, company=company, remote_only=remote_only)
+    elif index["deleted"]:
+        # Tombstones only: sending the few deleted ids is cheaper than every live one
+        excluded = np.flatnonzero(~metadata_mask(index, "alive"))
+    total = index["size"] - index["deleted"] if candidates is None else len(candidates)
+    answered, missing = shards.search(queries, tops, candidates, excluded, timeout, observe)
+
+    # Postings appended through the API after the shards were loaded are scored here
+    tail = None
+    if state["embeddings"].shape[0] > shards.size:
+        tail_scores = score_postings(state["embeddings"][shards.size:], queries)
+        tail_ids = np.arange(shards.size, state["embeddings"].shape[0])
+        keep = metadata_mask(index, "alive")[tail_ids]
+        if candidates is not None:
+            keep &= np.isin(tail_ids, candidates)
+        tail = (tail_ids[keep], tail_scores[keep])
+
+    results = []
+    for col, (top_k, offset) in enumerate(zip(top_ks, offsets)):
+        ids = [shard[col][0] for shard in answered]
+        scores = [shard[col][1] for shard in answered]
+        records = [record for shard in answered for record in shard[col][2]]
+        if tail is not None:
+            best = top_k_indices(tail[1][:, col], tops[col])
+            ids.append(tail[0][best])
+            scores.append(tail[1][best, col])
+            records.extend(build_recommendations(
+                tail[0][best], tail[1][best, col], queries[col], tfidf, mlb, state["embeddings"], state["df"]
+            ))
+        if not records:
+            results.append([])
+            continue
+        ids, scores = np.concatenate(ids), np.concatenate(scores)
+        # Best score first, ties by posting id
+        order = np.lexsort((ids, -scores))[offset:offset + top_k]
+        results.append([records[i] for i in order])
+    return results, total, missing
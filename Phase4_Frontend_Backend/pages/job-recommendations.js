@@ -11,7 +11,7 @@ async function renderJobRecommendations(container) {
         </div>
 
         <div style="display: flex; gap: 2rem;">
-            <!-- Sidebar Filters (Visual only for now) -->
+            <!-- Sidebar Filters (applied by the backend) -->
             <div style="width: 280px; flex-shrink: 0;">
                 <div class="card">
                     <h3 class="mb-2">Filters</h3>
@@ -55,6 +55,17 @@ async function renderJobRecommendations(container) {
         return;
     }
 
+    // Re-query the backend whenever a filter changes
+    document.getElementById('locationFilter').addEventListener('change', () => loadJobRecommendations(skills));
+    document.getElementById('remoteOnly').addEventListener('change', () => loadJobRecommendations(skills));
+
+    await loadJobRecommendations(skills);
+}
+
+async function loadJobRecommendations(skills) {
+    const location = document.getElementById('locationFilter').value;
+    const remoteOnly = document.getElementById('remoteOnly').checked;
+
     try {
         // 2. Fetch recommendations from API
         const response = await fetch('http://localhost:8000/recommend', {
@@ -62,7 +73,12 @@ async function renderJobRecommendations(container) {
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify({ skills: skills })
+            body: JSON.stringify({
+                skills: skills,
+                top_k: 10,
+                location: location || null,
+                remote_only: remoteOnly
+            })
         });
 
         if (!response.ok) {
@@ -79,7 +95,7 @@ async function renderJobRecommendations(container) {
             jobListContainer.innerHTML = `
                 <div class="card">
                     <h3>No matches found</h3>
-                    <p>Try adding more diverse skills to your profile.</p>
+                    <p>Try adding more diverse skills to your profile or relaxing the filters.</p>
                 </div>
             `;
             return;
@@ -89,7 +105,7 @@ async function renderJobRecommendations(container) {
             <div style="background: white; padding: 1.25rem; border-radius: var(--border-radius); margin-bottom: 1.5rem; box-shadow: var(--shadow-sm); display: flex; justify-content: space-between; align-items: center;">
                 <div>
                     <h3 style="margin: 0;">Top Matches</h3>
-                    <p style="color: var(--gray-dark); margin: 0;">${jobs.length} jobs found for your profile</p>
+                    <p style="color: var(--gray-dark); margin: 0;">Showing ${jobs.length} of ${data.total} jobs for your profile</p>
                 </div>
             </div>
 
@@ -112,8 +128,8 @@ async function renderJobRecommendations(container) {
 }
 
 function renderJobCard(job) {
-    // Parse "95%" -> 95
-    const scoreVal = parseInt(job['Match Score']);
+    // Numeric score (0-1) from the API; older responses only have the "95%" string
+    const scoreVal = job['Score'] !== undefined ? job['Score'] * 100 : parseInt(job['Match Score']);
     const scoreColor = scoreVal >= 80 ? 'var(--success)' : (scoreVal >= 50 ? 'var(--warning)' : 'var(--danger)');
 
     return `
@@ -154,7 +170,51 @@ function renderJobCard(job) {
             <div style="display: flex; gap: 1rem; margin-top: 1rem;">
                 <button class="btn-primary">Apply Now</button>
                 <button class="btn-outline">View details</button>
+                ${job['Job ID'] !== undefined ? `<button class="btn-outline" onclick="toggleSimilarJobs(this, ${job['Job ID']})">More like this</button>` : ''}
             </div>
+            <div class="similar-jobs" style="display: none; margin-top: 1rem;"></div>
         </div>
     `;
 }
+
+// "More like this": the backend answers from the similarity graph stored with the model
+async function toggleSimilarJobs(button, jobId) {
+    const panel = button.closest('.job-card').querySelector('.similar-jobs');
+    if (panel.style.display === 'block') {
+        panel.style.display = 'none';
+        return;
+    }
+    panel.style.display = 'block';
+    if (panel.dataset.loaded) {
+        return;
+    }
+    panel.innerHTML = '<p style="color: var(--gray-dark);">Loading similar jobs...</p>';
+
+    try {
+        const response = await fetch(`http://localhost:8000/jobs/${jobId}/similar?limit=5`);
+        if (!response.ok) {
+            throw new Error(`API Error: ${response.statusText}`);
+        }
+        const data = await response.json();
+        panel.dataset.loaded = 'true';
+
+        if (data.similar.length === 0) {
+            panel.innerHTML = '<p style="color: var(--gray-dark);">No similar jobs found.</p>';
+            return;
+        }
+        panel.innerHTML = `
+            <div style="background: #f8f9fb; padding: 0.75rem; border-radius: 6px;">
+                <strong style="display: block; margin-bottom: 0.5rem; font-size: 0.875rem; color: var(--gray-dark);">More like this:</strong>
+                ${data.similar.map(similar => `
+                    <div style="display: flex; justify-content: space-between; gap: 1rem; padding: 0.25rem 0;">
+                        <span><strong>${similar['Job Title']}</strong> <span style="color: var(--primary);">${similar['Company']}</span></span>
+                        <span style="color: var(--gray-dark);">${similar['Similarity']}</span>
+                    </div>
+                `).join('')}
+            </div>
+        `;
+    } catch (error) {
+        console.error('Failed to fetch similar jobs:', error);
+        panel.innerHTML = `<p style="color: var(--danger);">Could not load similar jobs: ${error.message}</p>`;
+    }
+}
@@ -44,7 +44,7 @@ function renderResumeAnalyzer(container) {
         </div>
     `;
 
-    window.analyzeResume = function () {
+    window.analyzeResume = async function () {
         const resumeText = document.getElementById('resumeText').value.trim();
 
         if (!resumeText) {
@@ -52,20 +52,35 @@ function renderResumeAnalyzer(container) {
             return;
         }
 
-        const mockSkills = [
-            'Python', 'JavaScript', 'React', 'Node.js', 'SQL', 'MongoDB',
-            'Machine Learning', 'Data Analysis', 'Git', 'Docker',
-            'Communication', 'Leadership', 'Problem Solving'
-        ];
+        let extractedSkills;
+        try {
+            // The backend scans the text for every skill the model knows
+            const response = await fetch('http://localhost:8000/resume/skills', {
+                method: 'POST',
+                headers: { 'Content-Type': 'text/plain' },
+                body: resumeText
+            });
 
-        const extractedSkills = mockSkills.filter(() => Math.random() > 0.5).slice(0, 8);
+            if (!response.ok) {
+                throw new Error(`API Error: ${response.statusText}`);
+            }
+
+            extractedSkills = (await response.json()).skills;
+        } catch (error) {
+            console.error('Failed to analyze resume:', error);
+            alert('Could not analyze your resume. Please make sure the backend is running.');
+            return;
+        }
+
+        // Job recommendations and the skill gap analysis read the profile from here
+        localStorage.setItem('userSkills', JSON.stringify(extractedSkills));
 
         const resultsDiv = document.getElementById('analysisResults');
         const skillsDiv = document.getElementById('extractedSkills');
 
-        skillsDiv.innerHTML = extractedSkills.map(skill =>
-            `<span class="tag success">${skill}</span>`
-        ).join('');
+        skillsDiv.innerHTML = extractedSkills.length > 0
+            ? extractedSkills.map(skill => `<span class="tag success">${skill}</span>`).join('')
+            : '<p style="color: var(--gray-dark);">No known skills found in this text.</p>';
 
         resultsDiv.style.display = 'block';
     };
@@ -31,11 +31,11 @@ async function renderSkillGapAnalysis(container) {
     `;
 
     try {
-        // Fetch recommendations to get the missing skills data
-        const response = await fetch('http://localhost:8000/recommend', {
+        // The backend ranks missing skills over a large pool of similar postings
+        const response = await fetch('http://localhost:8000/skill-gap', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ skills: userSkills })
+            body: JSON.stringify({ skills: userSkills, top_n: 500, max_skills: 5 })
         });
 
         if (!response.ok) {
@@ -43,7 +43,6 @@ async function renderSkillGapAnalysis(container) {
         }
 
         const data = await response.json();
-        const recommendations = data.recommendations;
 
         // --- Process Data for Gap Analysis ---
 
@@ -56,29 +55,16 @@ async function renderSkillGapAnalysis(container) {
             status: 'matched'
         }));
 
-        // 2. Identify Top Missing Skills (Skills to Develop)
-        // Aggregate missing skills from all recommendations
-        const missingSkillCounts = {};
-        recommendations.forEach(job => {
-            if (job['Missing Skills']) {
-                job['Missing Skills'].forEach(skill => {
-                    missingSkillCounts[skill] = (missingSkillCounts[skill] || 0) + 1;
-                });
-            }
-        });
-
-        // Convert to array and sort by frequency
-        const skillsToDevelopData = Object.entries(missingSkillCounts)
-            .map(([name, count]) => ({
-                name: name,
-                frequency: count,
-                status: 'develop',
-                // Calculate a "priority" based on frequency relative to total recommendations
-                priority: count > (recommendations.length * 0.5) ? 'High Priority' : 'Medium Priority',
-                description: `Required by ${Math.round((count / recommendations.length) * 100)}% of your recommended jobs`
-            }))
-            .sort((a, b) => b.frequency - a.frequency)
-            .slice(0, 5); // Take top 5
+        // 2. Top Missing Skills (Skills to Develop), already ranked by score-weighted demand
+        const topPriority = data.skills_to_develop.length > 0 ? data.skills_to_develop[0].priority : 0;
+        const skillsToDevelopData = data.skills_to_develop.map(skill => ({
+            name: skill.skill,
+            share: skill.share,
+            status: 'develop',
+            // High priority: at least half as much weighted demand as the top skill
+            priority: skill.priority >= topPriority / 2 ? 'High Priority' : 'Medium Priority',
+            description: `Required by ${Math.round(skill.share * 100)}% of the ${data.pool_size} jobs closest to your profile`
+        }));
 
         // Combine for the chart list
         const allSkillsForChart = [...matchedSkillsData, ...skillsToDevelopData.map(s => ({ ...s, level: 0 }))];
@@ -130,7 +116,7 @@ async function renderSkillGapAnalysis(container) {
                                 <span style="color: var(--danger);">Missing</span>
                             </div>
                             <div class="progress-bar">
-                                <div class="progress-fill" style="width: ${Math.max(10, (skill.frequency / recommendations.length) * 100)}%; background: linear-gradient(90deg, #EF4444 0%, #DC2626 100%);"></div>
+                                <div class="progress-fill" style="width: ${Math.max(10, skill.share * 100)}%; background: linear-gradient(90deg, #EF4444 0%, #DC2626 100%);"></div>
                             </div>
                         </div>
                     `).join('')}
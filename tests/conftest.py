@@ -0,0 +1,85 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# The model and backend modules import each other as top-level modules, as when run as scripts
+sys.path[:0] = [os.path.join(ROOT, "Phase2_ML_Models"), os.path.join(ROOT, "Phase4_Frontend_Backend", "backend")]
+
+from job_recommendation_model import clean_job_frame, extract_features, get_recommendations
+
+# Small enough to train in a second, large enough for duplicates, ties and filters
+N_POSTINGS = 1500
+TEST_DATA_PATH = os.path.join(ROOT, "Phase2_ML_Models", "job_postings_test.csv")
+LOCATIONS = np.array(["Remote", "New York", "London", "Bangalore", "Berlin", "Pune"], dtype=object)
+
+
+def load_vocabulary():
+    """Roles (title + skills) and the skill vocabulary of the hand-labelled test postings."""
+    df = pd.read_csv(TEST_DATA_PATH).dropna(subset=['Job Title', 'Required Skills'])
+    roles = [(title, [s.strip() for s in skills.split(',')]) for title, skills in zip(df['Job Title'], df['Required Skills'])]
+    return roles, sorted({s for _, role_skills in roles for s in role_skills})
+
+
+def skill_popularity(n_skills, rng):
+    # Zipf-like: a few skills appear everywhere, most are rare
+    weights = 1.0 / np.arange(1, n_skills + 1) ** 0.8
+    return rng.permutation(weights / weights.sum())
+
+
+def synthetic_postings(n, seed=0):
+    """n postings built from the test roles plus popularity-weighted extra skills."""
+    rng = np.random.default_rng(seed)
+    roles, skills = load_vocabulary()
+    popularity = skill_popularity(len(skills), rng)
+    levels = np.array(["", "Senior ", "Junior ", "Lead ", "Associate "], dtype=object)
+    role_ids = rng.integers(len(roles), size=n)
+    n_extra = rng.integers(0, 4, size=n)
+    extra = rng.choice(len(skills), size=(n, 3), p=popularity)
+    required = []
+    for role_id, k, extra_ids in zip(role_ids, n_extra, extra):
+        role_skills = roles[role_id][1]
+        picked = role_skills[:rng.integers(2, len(role_skills) + 1)] + [skills[i] for i in extra_ids[:k]]
+        required.append(", ".join(dict.fromkeys(picked)))
+    return pd.DataFrame({
+        "Job Title": levels[rng.integers(len(levels), size=n)] + np.array([roles[i][0] for i in role_ids], dtype=object),
+        "Company": np.char.add("Company ", rng.integers(max(n // 20, 1), size=n).astype(str)).astype(object),
+        "Required Skills": required,
+        "Location": LOCATIONS[rng.integers(len(LOCATIONS), size=n)]
+    })
+
+
+def synthetic_profiles(n, seed=1):
+    """n user skill profiles of 2-6 popularity-weighted skills."""
+    rng = np.random.default_rng(seed)
+    _, skills = load_vocabulary()
+    popularity = skill_popularity(len(skills), np.random.default_rng(0))
+    return [
+        [skills[i] for i in rng.choice(len(skills), size=rng.integers(2, 7), replace=False, p=popularity)]
+        for _ in range(n)
+    ]
+
+
+@pytest.fixture(scope="session")
+def postings():
+    return clean_job_frame(synthetic_postings(N_POSTINGS, seed=0))
+
+
+@pytest.fixture(scope="session")
+def model(postings):
+    tfidf, mlb, embeddings = extract_features(postings)
+    return {"tfidf": tfidf, "mlb": mlb, "embeddings": embeddings, "df": postings}
+
+
+@pytest.fixture(scope="session")
+def profiles(postings):
+    """Synthetic profiles plus a posting's own skills, an unknown skill and an empty profile."""
+    return synthetic_profiles(40, seed=1) + [list(postings['skills_list'].iloc[0]), ["no such skill"], []]
+
+
+def exact_recommendations(model, skills, **kwargs):
+    """get_recommendations with exact retrieval over a model dict."""
+    return get_recommendations(skills, model["tfidf"], model["mlb"], model["embeddings"], model["df"], **kwargs)
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from artifact_store import MmapArtifactWriter, load_mmap_artifacts, save_mmap_artifacts
+from conftest import exact_recommendations
+from inverted_index import build_inverted_index
+from incremental_index import add_postings, make_postings, refresh_idf
+from job_recommendation_model import build_metadata_index, filter_candidates
+from posting_table import ValueIds, as_posting_table
+
+
+@pytest.fixture(scope="module")
+def loaded(model, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("artifacts") / "model")
+    save_mmap_artifacts(path, model["tfidf"], model["mlb"], model["embeddings"], model["df"])
+    return load_mmap_artifacts(path)
+
+
+def test_round_trip_keeps_matrix_and_postings(model, loaded):
+    for name in ("data", "indices", "indptr"):
+        np.testing.assert_array_equal(getattr(loaded["embeddings"], name), getattr(model["embeddings"], name))
+    for name in ("Job Title", "Company", "Location"):
+        assert list(loaded["df"][name]) == list(model["df"][name])
+    assert [list(skills) for skills in loaded["df"]['skills_list']] == list(model["df"]['skills_list'])
+
+
+def test_stored_inverted_index_matches_rebuilt(model, loaded):
+    expected = build_inverted_index(model["embeddings"])
+    for name in ("indptr", "indices", "data", "max_weights"):
+        np.testing.assert_array_equal(loaded["inverted"][name], expected[name])
+
+
+def test_mapped_model_recommends_like_in_memory(model, loaded, profiles):
+    for skills in profiles:
+        assert exact_recommendations(loaded, skills, top_k=10) == exact_recommendations(model, skills, top_k=10)
+
+
+def _assert_same_index(stored, expected):
+    assert isinstance(stored["location"], ValueIds)
+    for field in ("location", "company"):
+        assert sorted(stored[field]) == sorted(expected[field])
+        for value, ids in expected[field].items():
+            np.testing.assert_array_equal(stored[field][value], ids)
+    np.testing.assert_array_equal(stored["remote"], expected["remote"])
+    assert stored["size"] == expected["size"] and stored["alive"].all()
+
+
+def test_stored_filter_index_matches_rebuilt(model, loaded):
+    _assert_same_index(loaded["index"], build_metadata_index(model["df"]))
+    assert "atlantis" not in loaded["index"]["location"]
+    for location, company, remote_only in (("new york", None, False), (None, "company 3", True), ("Mars", None, False)):
+        np.testing.assert_array_equal(
+            filter_candidates(loaded["index"], location=location, company=company, remote_only=remote_only),
+            filter_candidates(build_metadata_index(model["df"]), location=location, company=company, remote_only=remote_only)
+        )
+
+
+def test_writer_blocks_offset_the_filter_index(model, tmp_path):
+    postings = as_posting_table(model["df"])
+    writer = MmapArtifactWriter(str(tmp_path / "model"), postings.columns)
+    for start in range(0, len(postings), 400):
+        stop = min(start + 400, len(postings))
+        writer.append(model["embeddings"][start:stop], postings.rows(start, stop))
+    writer.close(model["tfidf"], model["mlb"])
+    _assert_same_index(load_mmap_artifacts(str(tmp_path / "model"))["index"], build_metadata_index(postings))
+
+
+def test_stored_filter_index_takes_updates(loaded):
+    state = dict(loaded)
+    remote = filter_candidates(state["index"], location="Remote").tolist()
+    state.update(add_postings(state, make_postings([
+        {"Job Title": "Quantum Developer", "Company": "Qubit Labs", "Required Skills": "Qiskit", "Location": "Remote"}
+    ]))[0])
+    new_id = len(loaded["df"])
+    assert filter_candidates(state["index"], location="Remote").tolist() == remote + [new_id]
+    state.update(refresh_idf(state))
+    assert state["index"]["tail"] is None
+    assert filter_candidates(state["index"], location="Remote").tolist() == remote + [new_id]
+    assert filter_candidates(state["index"], company="qubit labs").tolist() == [new_id]
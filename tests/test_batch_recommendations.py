@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+import compact_embeddings
+import job_recommendation_model
+from conftest import exact_recommendations
+from job_recommendation_model import build_metadata_index, filter_candidates, get_recommendations_batch
+
+
+def _batch(model, profiles, **kwargs):
+    return get_recommendations_batch(profiles, model["tfidf"], model["mlb"], model["embeddings"], model["df"], **kwargs)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 512])
+def test_batch_matches_single_profile_calls(model, profiles, chunk_size):
+    rng = np.random.default_rng(2)
+    top_ks = rng.integers(1, 20, size=len(profiles))
+    offsets = rng.integers(0, 30, size=len(profiles))
+    results = _batch(model, profiles, top_k=top_ks, offset=offsets, chunk_size=chunk_size)
+    assert results == [
+        exact_recommendations(model, skills, top_k=int(top_k), offset=int(offset))
+        for skills, top_k, offset in zip(profiles, top_ks, offsets)
+    ]
+
+
+def test_batch_matches_single_profile_calls_with_filters(model, profiles):
+    candidates = filter_candidates(build_metadata_index(model["df"]), location="London")
+    assert _batch(model, profiles, top_k=5, candidates=candidates) == [
+        exact_recommendations(model, skills, top_k=5, candidates=candidates) for skills in profiles
+    ]
+
+
+def test_score_block_stays_within_budget(model, profiles, monkeypatch):
+    n_postings = model["embeddings"].shape[0]
+    # Room for three profiles' float64 scores per block
+    monkeypatch.setattr(compact_embeddings, "SCORE_BLOCK_BYTES", 3 * 8 * n_postings)
+    assert compact_embeddings.score_chunk_size(n_postings, 512) == 3
+    assert compact_embeddings.score_chunk_size(n_postings, 2) == 2
+
+    widths = []
+    score_postings = compact_embeddings.score_postings
+
+    def recording(embeddings, queries):
+        widths.append(queries.shape[0])
+        return score_postings(embeddings, queries)
+
+    monkeypatch.setattr(job_recommendation_model, "score_postings", recording)
+    assert _batch(model, profiles, top_k=3) == [exact_recommendations(model, skills, top_k=3) for skills in profiles]
+    assert max(widths) == 3
@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+
+from benchmark import compare_runs, generate_postings, generate_profiles, parse_scale
+from conftest import ROOT
+
+
+def test_parse_scale():
+    assert [parse_scale(text) for text in ("300", "10k", "1.5M", " 2m ")] == [300, 10_000, 1_500_000, 2_000_000]
+
+
+def test_synthetic_corpus_is_reproducible():
+    postings = generate_postings(200, seed=3)
+    assert len(postings) == 200 and postings.equals(generate_postings(200, seed=3))
+    assert postings['Required Skills'].str.len().min() > 0
+    profiles = generate_profiles(20, seed=4)
+    assert len(profiles) == 20 and all(2 <= len(skills) <= 6 for skills in profiles)
+
+
+def test_compare_runs_flags_only_worse_metrics():
+    before = {"scales": [{"postings": 100, "train": {"extract_features_s": 1.0}, "api": {"qps": 100.0, "p50_ms": 5.0}}]}
+    after = {"scales": [{"postings": 100, "train": {"extract_features_s": 1.5}, "api": {"qps": 70.0, "p50_ms": 5.5}}]}
+    # p50 is 10% worse, under the threshold
+    regressions = compare_runs(after, before, threshold=0.2)
+    assert {r["metric"] for r in regressions} == {"train.extract_features_s", "api.qps"}
+    assert compare_runs(before, before, threshold=0.2) == []
+
+
+def test_smoke_run_writes_results(tmp_path):
+    output = tmp_path / "results.json"
+    completed = subprocess.run(
+        [sys.executable, "benchmark.py", "--scales", "300", "--queries", "5", "--concurrency", "2", "--skip-joblib",
+         "--workdir", str(tmp_path / "work"), "--output", str(output), "--compare", str(_previous_run(tmp_path))],
+        cwd=os.path.join(ROOT, "Phase2_ML_Models"), capture_output=True, text=True, timeout=300
+    )
+    # Compared against a run that was infinitely fast, so it reports regressions
+    assert completed.returncode == 1, completed.stderr
+    with open(output) as f:
+        results = json.load(f)
+    scale = results["scales"][0]
+    assert scale["postings"] == 300
+    assert scale["train"]["extract_features_s"] >= 0 and scale["train"]["nnz"] > 0
+    assert scale["cold_start"]["startup_s"] > 0
+    for mode in ("exact", "maxscore"):
+        assert set(scale["get_recommendations"][mode]) == {"p50_ms", "p95_ms", "p99_ms", "qps"}
+    assert scale["api_recommend"]["concurrent"]["qps"] > 0
+    assert [r["metric"] for r in results["regressions"]] == ["train.extract_features_s"]
+
+
+def _previous_run(tmp_path):
+    path = tmp_path / "previous.json"
+    path.write_text(json.dumps({"scales": [{"postings": 300, "train": {"extract_features_s": 1e-9}}]}))
+    return path
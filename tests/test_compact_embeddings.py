@@ -0,0 +1,57 @@
+import pickle
+import sys
+
+import numpy as np
+import pytest
+
+import compact_embeddings
+from artifact_store import save_mmap_artifacts
+from compact_embeddings import embedding_precision, score_postings
+from job_recommendation_model import clean_user_skills, vectorize_users
+
+
+@pytest.fixture(scope="module")
+def queries(model, profiles):
+    return vectorize_users([clean_user_skills(skills) for skills in profiles], model["tfidf"], model["mlb"])
+
+
+@pytest.mark.parametrize("precision", ["float16", "int8"])
+def test_compact_scores_match_restored_values(model, queries, precision):
+    compact = compact_embeddings.compact_embeddings(model["embeddings"], precision)
+    np.testing.assert_allclose(
+        score_postings(compact, queries), score_postings(compact.tocsr(), queries), rtol=1e-6, atol=1e-7
+    )
+    np.testing.assert_allclose(
+        score_postings(compact, queries), score_postings(model["embeddings"], queries), atol=0.01
+    )
+
+
+@pytest.mark.parametrize("precision", ["float16", "int8"])
+def test_block_scoring_matches_one_block(model, queries, monkeypatch, precision):
+    compact = compact_embeddings.compact_embeddings(model["embeddings"], precision)
+    whole = score_postings(compact, queries)
+    vector = compact @ np.ones(compact.shape[1], dtype=np.float32)
+    # A few rows per block, with a cut inside most rows
+    monkeypatch.setattr(compact_embeddings, "SCORE_BLOCK_NNZ", 37)
+    assert len(compact._score_blocks()) > 100
+    np.testing.assert_array_equal(score_postings(compact, queries), whole)
+    np.testing.assert_array_equal(compact @ np.ones(compact.shape[1], dtype=np.float32), vector)
+
+
+def test_compact_matrix_pickles_without_float32_values(model):
+    compact = compact_embeddings.compact_embeddings(model["embeddings"], "int8")
+    compact @ np.ones(compact.shape[1], dtype=np.float32)
+    restored = pickle.loads(pickle.dumps(compact))
+    assert embedding_precision(restored) == "int8"
+    # Only the compact values and their row scales are held, before and after scoring
+    assert set(vars(restored)) == {"matrix", "row_scale"} and restored.matrix.dtype == np.int8
+    np.testing.assert_array_equal(restored.data, compact.data)
+    np.testing.assert_array_equal(restored.row_scale, compact.row_scale)
+
+
+def test_agreement_report_on_model_directory(model, tmp_path, monkeypatch, capsys):
+    path = str(tmp_path / "model")
+    save_mmap_artifacts(path, model["tfidf"], model["mlb"], model["embeddings"], model["df"])
+    monkeypatch.setattr(sys, "argv", ["compact_embeddings.py", path, "--sample", "50"])
+    compact_embeddings.main()
+    assert "50 profiles" in capsys.readouterr().out
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+import job_recommendation_model
+from conftest import synthetic_profiles
+from evaluate_model import (
+    create_test_dataset, evaluate, ranking_metrics, relevance_matrix, sweep, train_model
+)
+from job_recommendation_model import SKILL_WEIGHT, TFIDF_PARAMS, clean_user_skills, vectorize_users
+
+
+@pytest.fixture(scope="module")
+def synthetic(postings):
+    """Profiles labelled with the postings that require one of their skills."""
+    ground_truth = {}
+    for i, skills in enumerate(synthetic_profiles(12, seed=5)):
+        wanted = set(clean_user_skills(skills))
+        relevant = [job for job, job_skills in enumerate(postings['skills_list']) if wanted & set(job_skills)]
+        ground_truth[f"profile {i}"] = {"skills": skills, "relevant_jobs": relevant[:25]}
+    return postings[['Job Title', 'Company', 'Required Skills']], ground_truth
+
+
+def _production_metrics(jobs_df, ground_truth):
+    """Averaged metrics of the production pipeline (what evaluate() reports per profile)."""
+    tfidf, mlb, embeddings, jobs_df = train_model(jobs_df)
+    users = vectorize_users([clean_user_skills(data["skills"]) for data in ground_truth.values()], tfidf, mlb)
+    scores = (users @ embeddings.T).toarray()
+    _, per_k, reciprocal_ranks = ranking_metrics(scores, relevance_matrix(ground_truth, len(jobs_df)))
+    row = {f"{name}@{k}": values.mean() for k, metrics in per_k.items() for name, values in metrics.items()}
+    row["MRR"] = reciprocal_ranks.mean()
+    return row
+
+
+def _sweep_row(results, max_features, ngram_range, weight):
+    match = results[
+        (results["max_features"] == max_features) & (results["ngram_range"] == f"{ngram_range[0]}-{ngram_range[1]}")
+        & (results["skill_weight"] == weight)
+    ]
+    assert len(match) == 1
+    return match.iloc[0]
+
+
+@pytest.mark.parametrize("dataset", ["built-in", "synthetic"])
+def test_sweep_matches_the_production_pipeline(dataset, synthetic, monkeypatch):
+    jobs_df, ground_truth = create_test_dataset() if dataset == "built-in" else synthetic
+    configs = [(TFIDF_PARAMS["max_features"], TFIDF_PARAMS["ngram_range"], SKILL_WEIGHT), (50, (1, 1), 1.0), (300, (1, 3), 3.0)]
+    results = sweep(
+        jobs_df, ground_truth, max_features=sorted({c[0] for c in configs}),
+        ngram_ranges=sorted({c[1] for c in configs}), skill_weights=sorted({c[2] for c in configs}), n_jobs=1
+    )
+    assert len(results) == 27
+    for max_features, ngram_range, weight in configs:
+        # Training with these settings is what the sweep shortcuts
+        monkeypatch.setattr(job_recommendation_model, "TFIDF_PARAMS",
+                            {**TFIDF_PARAMS, "max_features": max_features, "ngram_range": ngram_range})
+        monkeypatch.setattr(job_recommendation_model, "SKILL_WEIGHT", weight)
+        expected = _production_metrics(jobs_df, ground_truth)
+        row = _sweep_row(results, max_features, ngram_range, weight)
+        for name, value in expected.items():
+            assert row[name] == pytest.approx(value, abs=1e-9), name
+
+
+def test_worker_processes_give_the_same_results(synthetic):
+    settings = {"max_features": [100, 500], "ngram_ranges": [(1, 1), (1, 2)], "skill_weights": [1.0, 2.0]}
+    serial = sweep(*synthetic, n_jobs=1, **settings)
+    parallel = sweep(*synthetic, n_jobs=2, **settings)
+    assert serial.equals(parallel)
+    assert list(serial["NDCG@10"]) == sorted(serial["NDCG@10"], reverse=True)
+
+
+def test_evaluate_reports_the_production_metrics(tmp_path):
+    jobs_df, ground_truth = create_test_dataset()
+    report = evaluate(jobs_df, ground_truth, output=str(tmp_path / "metrics.csv"))
+    expected = _production_metrics(jobs_df, ground_truth)
+    for k in (3, 5, 10):
+        subset = report[report["K"] == k]
+        for name in ("Precision", "Recall", "F1", "NDCG"):
+            # evaluate rounds every profile's value to 3 places
+            assert np.isclose(subset[name].mean(), expected[f"{name}@{k}"], atol=1e-3)
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import LOCATIONS, exact_recommendations
+from job_recommendation_model import build_metadata_index, filter_candidates, normalize_filters
+
+
+@pytest.fixture(scope="module")
+def index(postings):
+    return build_metadata_index(postings)
+
+
+def test_location_and_company_match_case_insensitively(postings, index):
+    candidates = filter_candidates(index, location="  new YORK ", company="COMPANY 3")
+    expected = np.flatnonzero((postings['Location'] == "New York") & (postings['Company'] == "Company 3"))
+    assert len(expected) and candidates.tolist() == expected.tolist()
+    assert filter_candidates(index, location="Atlantis").tolist() == []
+    assert filter_candidates(index) is None
+
+
+def test_frontend_location_values():
+    df = pd.DataFrame({
+        "Company": ["A", "B", "C", "D", "E"],
+        "Location": ["San Francisco", "SF", "New York", "NYC", "Remote - US"],
+        "Remote": [None, "yes", None, None, None],
+    })
+    index = build_metadata_index(df)
+    assert filter_candidates(index, location="SF").tolist() == [0, 1]
+    assert filter_candidates(index, location="NY").tolist() == [2, 3]
+    # "Remote" is the remote filter, not a literal location
+    assert filter_candidates(index, location="Remote").tolist() == [1, 4]
+    assert filter_candidates(index, location="Remote").tolist() == filter_candidates(index, remote_only=True).tolist()
+    assert normalize_filters("Remote", None, False) == normalize_filters(None, "", True)
+
+
+def test_corpus_without_location_matches_no_location(postings):
+    index = build_metadata_index(postings.drop(columns=["Location"]))
+    assert filter_candidates(index, location="SF").tolist() == []
+    assert filter_candidates(index, location="Remote").tolist() == []
+    assert len(filter_candidates(index, company="Company 3"))
+
+
+def test_remote_only_combines_with_company(postings, index):
+    candidates = filter_candidates(index, company="Company 5", remote_only=True)
+    expected = np.flatnonzero((postings['Location'] == "Remote") & (postings['Company'] == "Company 5"))
+    assert candidates.tolist() == expected.tolist()
+
+
+@pytest.mark.parametrize("location", [None, *LOCATIONS[:3]])
+def test_pages_concatenate_to_the_full_ranking(model, index, profiles, location):
+    candidates = filter_candidates(index, location=location)
+    for skills in profiles[:10]:
+        full = exact_recommendations(model, skills, top_k=30, candidates=candidates)
+        pages = [
+            record
+            for offset in range(0, 30, 7)
+            for record in exact_recommendations(model, skills, top_k=min(7, 30 - offset), offset=offset, candidates=candidates)
+        ]
+        assert pages == full
+        if candidates is not None:
+            assert {r["Job ID"] for r in full} <= set(candidates.tolist())
+
+
+def test_offset_past_the_candidates_is_empty(model, index):
+    candidates = filter_candidates(index, company="Company 3")
+    assert exact_recommendations(model, ["Python"], top_k=5, offset=len(candidates), candidates=candidates) == []
+    tail = exact_recommendations(model, ["Python"], top_k=5, offset=len(candidates) - 2, candidates=candidates)
+    assert len(tail) == 2
@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+
+from conftest import exact_recommendations
+from incremental_index import add_postings, make_postings, refresh_idf, remove_postings
+from inverted_index import build_inverted_index
+from similarity_graph import build_similarity_graph
+from job_recommendation_model import (
+    build_metadata_index, filter_candidates, is_alive, metadata_mask, transform_postings
+)
+
+# Postings trained on; the rest are added through add_postings
+N_TRAINED = 1200
+NEW_POSTING = {"Job Title": "Quantum Developer", "Company": "Qubit Labs", "Required Skills": "Qiskit, Python",
+               "Location": "Remote"}
+
+
+def _state(tfidf, mlb, embeddings, df):
+    return {"tfidf": tfidf, "mlb": mlb, "embeddings": embeddings, "df": df,
+            "index": build_metadata_index(df), "inverted": build_inverted_index(embeddings)}
+
+
+def _recommend(state, skills, retrieval, **kwargs):
+    candidates = filter_candidates(state["index"], **kwargs)
+    return exact_recommendations(
+        state, skills, top_k=10, candidates=candidates,
+        inverted_index=None if retrieval == "exact" else state["inverted"], early_termination=retrieval == "maxscore"
+    )
+
+
+@pytest.fixture(scope="module")
+def trained(model, postings):
+    """A model trained on the first N_TRAINED postings, vectorizers from the full corpus."""
+    df = postings.iloc[:N_TRAINED].reset_index(drop=True)
+    return _state(model["tfidf"], model["mlb"], transform_postings(df, model["tfidf"], model["mlb"]), df)
+
+
+@pytest.fixture(scope="module")
+def added(trained, postings):
+    rows = postings[["Job Title", "Company", "Required Skills", "Location"]].iloc[N_TRAINED:].to_dict("records")
+    updates, job_ids = add_postings(trained, make_postings(rows + [NEW_POSTING]))
+    assert job_ids == list(range(N_TRAINED, len(postings) + 1))
+    return {**trained, **updates}
+
+
+@pytest.fixture(scope="module")
+def rebuilt(added, postings):
+    """Every posting embedded at once with the grown vocabularies."""
+    df = make_postings(postings[["Job Title", "Company", "Required Skills", "Location"]].to_dict("records") + [NEW_POSTING])
+    return _state(added["tfidf"], added["mlb"], transform_postings(df, added["tfidf"], added["mlb"]), df)
+
+
+def test_add_grows_skill_vocabulary(trained, added):
+    assert list(added["mlb"].classes_) == list(trained["mlb"].classes_) + ["qiskit"]
+
+
+def test_added_rows_match_rebuild(added, rebuilt):
+    combined = added["embeddings"].tocsr()
+    for name in ("data", "indices", "indptr"):
+        np.testing.assert_array_equal(getattr(combined, name), getattr(rebuilt["embeddings"], name))
+    assert metadata_mask(added["index"], "remote").tolist() == rebuilt["index"]["remote"].tolist()
+
+
+def test_added_rows_leave_the_main_arrays_shared(trained, added):
+    # Only the appended tail is new; the trained rows are the same objects
+    assert added["embeddings"].main is trained["embeddings"]
+    assert len(added["df"]["Job Title"].tail) == len(added["df"]) - N_TRAINED
+    for field in ("remote", "alive"):
+        assert added["index"][field] is trained["index"][field]
+    # Further inserts extend the same tail
+    more, job_ids = add_postings(added, make_postings([NEW_POSTING]))
+    assert more["embeddings"].main is trained["embeddings"]
+    assert more["embeddings"].shape[0] == added["embeddings"].shape[0] + 1
+    assert more["df"]["Job Title"][job_ids[0]] == NEW_POSTING["Job Title"]
+    assert filter_candidates(more["index"], company="Qubit Labs").tolist() == [len(added["df"]) - 1, job_ids[0]]
+
+
+def test_deleting_added_postings(added):
+    job_id = len(added["df"]) - 1
+    state = {**added, **remove_postings(added, [job_id, job_id, 3])}
+    assert state["index"]["deleted"] == 2
+    assert not is_alive(state["index"], job_id) and not is_alive(state["index"], 3)
+    assert is_alive(state["index"], job_id - 1) and not is_alive(state["index"], job_id + 1)
+    assert job_id not in filter_candidates(state["index"]).tolist()
+
+
+def test_refresh_folds_added_postings(added):
+    refreshed = {**added, **refresh_idf(added)}
+    assert refreshed["index"]["tail"] is None
+    assert len(refreshed["index"]["alive"]) == refreshed["embeddings"].shape[0] == len(refreshed["df"])
+    assert isinstance(refreshed["df"]["Job Title"], np.ndarray)
+    assert filter_candidates(refreshed["index"], location="Remote").tolist() == \
+        filter_candidates(added["index"], location="Remote").tolist()
+
+
+def test_refresh_drops_the_stale_similarity_graph(trained):
+    state = {**trained, "similar": build_similarity_graph(trained["embeddings"], 5)}
+    assert refresh_idf(state)["similar"] is None
+    assert "similar" not in refresh_idf(trained)
+
+
+@pytest.mark.parametrize("row", [
+    {**NEW_POSTING, "Job Title": "  "},
+    {**NEW_POSTING, "Required Skills": ""},
+    {**NEW_POSTING, "Required Skills": " , "},
+])
+def test_postings_without_title_or_skills_are_rejected(row):
+    with pytest.raises(ValueError):
+        make_postings([row])
+
+
+@pytest.mark.parametrize("retrieval", ["exact", "inverted", "maxscore"])
+def test_add_recommends_like_rebuild(added, rebuilt, profiles, retrieval):
+    for skills in profiles + [["qiskit"]]:
+        assert _recommend(added, skills, retrieval) == _recommend(rebuilt, skills, retrieval)
+        assert _recommend(added, skills, retrieval, location="Remote") == _recommend(rebuilt, skills, retrieval, location="Remote")
+
+
+@pytest.mark.parametrize("retrieval", ["exact", "inverted", "maxscore"])
+def test_delete_recommends_like_rebuild(trained, profiles, retrieval):
+    deleted = np.arange(0, N_TRAINED, 7)
+    state = {**trained, **remove_postings(trained, deleted)}
+    kept = np.setdiff1d(np.arange(N_TRAINED), deleted)
+    df = trained["df"].iloc[kept].reset_index(drop=True)
+    rebuilt = _state(trained["tfidf"], trained["mlb"], transform_postings(df, trained["tfidf"], trained["mlb"]), df)
+
+    for skills in profiles:
+        expected = _recommend(rebuilt, skills, retrieval)
+        # Tombstoned postings keep their ids; the rebuild renumbers the survivors
+        for record in expected:
+            record["Job ID"] = int(kept[record["Job ID"]])
+        assert _recommend(state, skills, retrieval) == expected
+        assert not set(r["Job ID"] for r in _recommend(state, skills, retrieval)) & set(deleted.tolist())
@@ -0,0 +1,42 @@
+import pytest
+
+from conftest import exact_recommendations
+from inverted_index import build_inverted_index
+from job_recommendation_model import build_metadata_index, filter_candidates
+
+
+@pytest.fixture(scope="module")
+def inverted(model):
+    return build_inverted_index(model["embeddings"])
+
+
+def matching(recommendations):
+    """The part of an exact page the index can return: postings sharing a feature with the query."""
+    return [record for record in recommendations if record["Score"] > 0]
+
+
+@pytest.mark.parametrize("early_termination", [False, True])
+@pytest.mark.parametrize("top_k, offset", [(1, 0), (10, 0), (10, 15), (100, 0)])
+def test_index_matches_exact(model, profiles, inverted, early_termination, top_k, offset):
+    for skills in profiles:
+        expected = matching(exact_recommendations(model, skills, top_k=top_k, offset=offset))
+        assert exact_recommendations(
+            model, skills, top_k=top_k, offset=offset, inverted_index=inverted, early_termination=early_termination
+        ) == expected
+
+
+@pytest.mark.parametrize("early_termination", [False, True])
+def test_index_matches_exact_with_filters(model, profiles, inverted, early_termination):
+    candidates = filter_candidates(build_metadata_index(model["df"]), location="Berlin")
+    for skills in profiles:
+        expected = matching(exact_recommendations(model, skills, top_k=10, candidates=candidates))
+        assert exact_recommendations(
+            model, skills, top_k=10, candidates=candidates, inverted_index=inverted, early_termination=early_termination
+        ) == expected
+
+
+def test_exact_pads_the_page_with_zero_scores(model, inverted):
+    padded = exact_recommendations(model, ["no such skill"], top_k=10)
+    assert [record["Job ID"] for record in padded] == list(range(10))
+    assert all(record["Score"] == 0 for record in padded)
+    assert exact_recommendations(model, ["no such skill"], top_k=10, inverted_index=inverted) == []
@@ -0,0 +1,17 @@
+import pytest
+
+from compact_embeddings import compact_embeddings
+from conftest import exact_recommendations
+from lite_runtime import LiteModel, export_lite_model
+
+
+@pytest.mark.parametrize("precision", ["float64", "float32", "float16", "int8"])
+def test_lite_model_matches_exact(model, profiles, tmp_path, precision):
+    compact = {**model, "embeddings": compact_embeddings(model["embeddings"], precision)}
+    export_lite_model(str(tmp_path / "lite"), compact["tfidf"], compact["mlb"], compact["embeddings"], compact["df"])
+    lite = LiteModel(str(tmp_path / "lite"))
+
+    for skills in profiles:
+        for top_k, offset in ((10, 0), (5, 12)):
+            assert lite.recommend(skills, top_k=top_k, offset=offset) == \
+                exact_recommendations(compact, skills, top_k=top_k, offset=offset)
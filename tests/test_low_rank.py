@@ -0,0 +1,58 @@
+import sys
+
+import numpy as np
+import pytest
+
+import compact_embeddings
+import low_rank as low_rank_module
+from conftest import N_POSTINGS, exact_recommendations
+from job_recommendation_model import build_metadata_index, filter_candidates, vectorize_users
+from low_rank import build_low_rank, get_recommendations_low_rank, low_rank_search
+
+
+@pytest.fixture(scope="module", params=["svd", "random"])
+def low_rank(model, request):
+    return build_low_rank(model["embeddings"], dim=64, method=request.param)
+
+
+def _low_rank_recommendations(model, low_rank, profiles, **kwargs):
+    return get_recommendations_low_rank(
+        profiles, model["tfidf"], model["mlb"], model["embeddings"], model["df"], low_rank, **kwargs
+    )
+
+
+@pytest.mark.parametrize("top_k, offset", [(10, 0), (5, 12)])
+def test_full_rerank_matches_exact(model, profiles, low_rank, top_k, offset):
+    # Re-scoring every posting leaves nothing to the approximation
+    results = _low_rank_recommendations(model, low_rank, profiles, top_k=top_k, offset=offset, rerank=N_POSTINGS)
+    for skills, recommendations in zip(profiles, results):
+        assert recommendations == exact_recommendations(model, skills, top_k=top_k, offset=offset)
+
+
+def test_full_rerank_matches_exact_with_filters(model, profiles, low_rank):
+    candidates = filter_candidates(build_metadata_index(model["df"]), location="London")
+    results = _low_rank_recommendations(model, low_rank, profiles, top_k=10, candidates=candidates, rerank=N_POSTINGS)
+    for skills, recommendations in zip(profiles, results):
+        assert recommendations == exact_recommendations(model, skills, top_k=10, candidates=candidates)
+
+
+@pytest.mark.parametrize("rerank", [0, 50])
+@pytest.mark.parametrize("filtered", [False, True])
+def test_blocked_search_matches_one_block(model, profiles, low_rank, monkeypatch, rerank, filtered):
+    queries = vectorize_users(profiles, model["tfidf"], model["mlb"])
+    candidates = filter_candidates(build_metadata_index(model["df"]), remote_only=True) if filtered else None
+    whole = low_rank_search(low_rank, model["embeddings"], queries, 10, 3, candidates, rerank)
+    # Room for about a hundred postings per block
+    monkeypatch.setattr(compact_embeddings, "SCORE_BLOCK_BYTES", 4 * len(profiles) * 97)
+    blocked = low_rank_search(low_rank, model["embeddings"], queries, 10, 3, candidates, rerank)
+    for (ids, scores), (whole_ids, whole_scores) in zip(blocked, whole):
+        np.testing.assert_array_equal(ids, whole_ids)
+        np.testing.assert_array_equal(scores, whole_scores)
+
+
+def test_save_needs_a_model_directory(tmp_path, monkeypatch):
+    model_file = tmp_path / "model.pkl"
+    model_file.write_bytes(b"")
+    monkeypatch.setattr(sys, "argv", ["low_rank.py", str(model_file), "--save"])
+    with pytest.raises(SystemExit):
+        low_rank_module.main()
@@ -0,0 +1,111 @@
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import stage_timing
+from conftest import exact_recommendations
+from metrics import MetricsRegistry
+from model_store import ModelStore
+from query_cache import QueryCache
+
+
+def test_registry_renders_the_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("app_requests_total", "Requests", ("route",))
+    entries = registry.gauge("app_entries", "Entries")
+    latency = registry.histogram("app_seconds", "Latency", ("stage",), buckets=(0.1, 1.0))
+    requests.inc(route='/a"b')
+    requests.inc(2, route='/a"b')
+    entries.set(7)
+    for seconds in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(seconds, stage="score")
+
+    assert registry.render().splitlines() == [
+        "# HELP app_requests_total Requests",
+        "# TYPE app_requests_total counter",
+        'app_requests_total{route="/a\\"b"} 3',
+        "# HELP app_entries Entries",
+        "# TYPE app_entries gauge",
+        "app_entries 7",
+        "# HELP app_seconds Latency",
+        "# TYPE app_seconds histogram",
+        'app_seconds_bucket{stage="score",le="0.1"} 1',
+        'app_seconds_bucket{stage="score",le="1.0"} 3',
+        'app_seconds_bucket{stage="score",le="+Inf"} 4',
+        'app_seconds_sum{stage="score"} 4.05',
+        'app_seconds_count{stage="score"} 4',
+    ]
+    with pytest.raises(ValueError):
+        requests.inc(method="GET")
+
+
+def test_collectors_run_before_rendering():
+    registry = MetricsRegistry()
+    gauge = registry.gauge("app_value", "Value")
+    registry.add_collector(lambda: gauge.set(42))
+    assert "app_value 42" in registry.render()
+
+
+def test_stage_observer_sees_every_stage_of_a_query(model, monkeypatch):
+    observed = []
+    monkeypatch.setattr(stage_timing, "_observer", None)
+    exact_recommendations(model, ["python", "sql"], top_k=5)
+
+    stage_timing.set_stage_observer(lambda stage, seconds: observed.append((stage, seconds)))
+    exact_recommendations(model, ["python", "sql"], top_k=5)
+    assert [stage for stage, _ in observed] == [
+        "clean", "tfidf_transform", "mlb_transform", "combine", "score", "top_k", "assemble"
+    ]
+    assert all(seconds >= 0 for _, seconds in observed)
+
+    stage_timing.set_stage_observer(None)
+    exact_recommendations(model, ["python"], top_k=5)
+    assert len(observed) == 7
+
+
+@pytest.fixture
+def client(model, monkeypatch):
+    monkeypatch.setattr(main, "model_store", ModelStore())
+    monkeypatch.setattr(main, "recommendation_cache", QueryCache())
+    main.install_snapshot(main.build_snapshot(model["tfidf"], model["mlb"], model["embeddings"], model["df"]))
+    # Not entered as a context manager: startup (training / loading a model) does not run
+    return TestClient(main.app)
+
+
+def _sample(text, name, **labels):
+    selector = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf"^{re.escape(name)}{re.escape('{' + selector + '}' if selector else '')} (\S+)$", text, re.M)
+    assert match, f"{name} {labels} not exported"
+    return float(match.group(1))
+
+
+def test_metrics_endpoint_reports_requests_stages_and_model(client, model):
+    before = client.get("/metrics").text
+    stages_before = _sample(before, "skillsync_query_stage_seconds_count", stage="tfidf_transform") \
+        if 'stage="tfidf_transform"' in before else 0
+    for _ in range(2):
+        assert client.post("/recommend", json={"skills": ["python", "sql"], "top_k": 5}).status_code == 200
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert _sample(text, "skillsync_request_seconds_count", method="POST", route="/recommend", status=200) >= 2
+    # The second request was answered from the cache
+    assert _sample(text, "skillsync_query_stage_seconds_count", stage="tfidf_transform") == stages_before + 1
+    assert _sample(text, "skillsync_cache_requests_total", result="hit") == 1
+    assert _sample(text, "skillsync_model_postings") == len(model["df"])
+    assert _sample(text, "skillsync_model_embedding_bytes") > 0
+
+
+def test_profiler_can_be_toggled_at_runtime(client):
+    try:
+        assert client.post("/admin/profiler", json={"enabled": True, "interval_ms": 1}).json()["running"]
+        assert _sample(client.get("/metrics").text, "skillsync_profiler_running") == 1
+        client.post("/recommend", json={"skills": ["python"], "top_k": 5})
+    finally:
+        stats = client.post("/admin/profiler", json={"enabled": False}).json()
+    assert not stats["running"]
+    assert _sample(client.get("/metrics").text, "skillsync_profiler_running") == 0
+    assert "stacks" in client.get("/admin/profiler").json()
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+
+import pytest
+
+import main
+from conftest import exact_recommendations
+from micro_batcher import MicroBatcher
+
+
+def _submit_all(batcher, items):
+    async def run():
+        return await asyncio.gather(*(batcher.submit(item) for item in items), return_exceptions=True)
+    return asyncio.run(run())
+
+
+def test_concurrent_calls_are_coalesced():
+    batches = []
+
+    def score(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(score, window_seconds=0.05, max_batch_size=64)
+    assert _submit_all(batcher, range(10)) == [item * 2 for item in range(10)]
+    assert batches == [list(range(10))]
+    assert batcher.stats() == {"batches": 1, "items": 10, "mean_batch_size": 10.0}
+
+
+def test_full_batch_is_sent_without_waiting_for_the_window():
+    batches = []
+
+    def score(items):
+        batches.append(list(items))
+        return list(items)
+
+    # A window this long would time the test out if a full batch waited for it
+    batcher = MicroBatcher(score, window_seconds=60, max_batch_size=4)
+    assert _submit_all(batcher, range(8)) == list(range(8))
+    assert batches == [[0, 1, 2, 3], [4, 5, 6, 7]]
+
+
+def test_item_errors_fail_only_their_item():
+    def score(items):
+        return [ValueError(item) if item % 3 == 0 else item for item in items]
+
+    results = _submit_all(MicroBatcher(score, window_seconds=0.01), range(6))
+    assert [type(result) for result in results] == [ValueError, int, int, ValueError, int, int]
+
+
+def test_raising_or_wrong_length_fails_the_whole_batch():
+    def raising(items):
+        raise RuntimeError("scoring failed")
+
+    assert all(isinstance(r, RuntimeError) for r in _submit_all(MicroBatcher(raising, window_seconds=0.01), range(3)))
+    short = MicroBatcher(lambda items: items[:-1], window_seconds=0.01)
+    assert all(isinstance(r, ValueError) for r in _submit_all(short, range(3)))
+
+
+def test_pending_callers_are_cancelled_with_the_run():
+    started, release = threading.Event(), threading.Event()
+
+    def score(items):
+        started.set()
+        release.wait(5)
+        return list(items)
+
+    async def run():
+        batcher = MicroBatcher(score, window_seconds=0)
+        callers = [asyncio.ensure_future(batcher.submit(item)) for item in range(3)]
+        while not started.is_set():
+            await asyncio.sleep(0.001)
+        runs = [task for task in asyncio.all_tasks() if task is not asyncio.current_task() and task not in callers]
+        for task in runs:
+            task.cancel()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        release.set()
+        return results
+
+    assert all(isinstance(result, asyncio.CancelledError) for result in asyncio.run(run()))
+
+
+@pytest.fixture(scope="module")
+def snapshot(model):
+    return main.build_snapshot(model["tfidf"], model["mlb"], model["embeddings"], model["df"])
+
+
+def test_failing_group_does_not_fail_the_others(snapshot, model, monkeypatch):
+    filter_candidates = main.filter_candidates
+
+    def failing_for_one_company(index, location=None, company=None, remote_only=False):
+        if company == "Company 3":
+            raise RuntimeError("filter failed")
+        return filter_candidates(index, location=location, company=company, remote_only=remote_only)
+
+    monkeypatch.setattr(main, "filter_candidates", failing_for_one_company)
+    requests = [
+        (snapshot, main.SkillsRequest(skills=skills, company=company, top_k=5), skills)
+        for skills in (["python", "sql"], ["react"]) for company in (None, "Company 3", "Company 4")
+    ]
+    results = main.score_recommend_batch(requests)
+    for (_, payload, skills), result in zip(requests, results):
+        if payload.company == "Company 3":
+            assert isinstance(result, RuntimeError)
+        else:
+            candidates = filter_candidates(snapshot["index"], company=payload.company)
+            assert result["recommendations"] == exact_recommendations(model, skills, top_k=5, candidates=candidates)
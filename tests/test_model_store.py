@@ -0,0 +1,130 @@
+import threading
+
+import pandas as pd
+import pytest
+
+import main
+from conftest import exact_recommendations
+from incremental_index import make_postings, replay_journal
+from job_recommendation_model import clean_job_frame, filter_candidates, is_alive, transform_postings
+from model_store import ModelReloader, ModelStore
+
+NEW_ROW = {"Job Title": "Quantum Developer", "Company": "Qubit Labs", "Required Skills": "Qiskit, Python"}
+
+
+@pytest.fixture
+def store(model, monkeypatch):
+    """A fresh ModelStore serving the test model through main's update functions."""
+    store = ModelStore()
+    monkeypatch.setattr(main, "model_store", store)
+    main.install_snapshot(main.build_snapshot(model["tfidf"], model["mlb"], model["embeddings"], model["df"]))
+    yield store
+    # Skill matcher rebuilds queued by the updates read this store
+    if main.skill_matcher_reloader.running:
+        main.skill_matcher_reloader._thread.join()
+
+
+def _delete_key(state, job_id):
+    df = state["df"]
+    return main.posting_key(df['Job Title'][job_id], df['Company'][job_id], df['Required Skills'][job_id])
+
+
+def test_readers_keep_their_snapshot_across_swaps(store):
+    before = store.current
+    with store.write_lock:
+        updates, _ = main.add_postings(before, make_postings([NEW_ROW]))
+        main.apply_model_updates(updates, journal_entry=("add", NEW_ROW))
+    after = store.current
+    assert after is not before
+    assert before["embeddings"].shape[0] + 1 == after["embeddings"].shape[0]
+    assert before["index"]["size"] + 1 == after["index"]["size"]
+    # Unchanged fields are shared, not copied
+    assert after["tfidf"] is before["tfidf"] and after["inverted"] is before["inverted"]
+    assert after["journal"] == (("add", NEW_ROW),)
+
+
+def test_versions_never_repeat(store, model):
+    seen = [store.current["version"]]
+    for _ in range(3):
+        with store.write_lock:
+            updates, _ = main.add_postings(store.current, make_postings([NEW_ROW]))
+            main.apply_model_updates(updates, journal_entry=("add", NEW_ROW))
+        seen.append(store.current["version"])
+        # A rebuild of the same corpus restarts from the same base version
+        main.install_rebuilt_model(main.build_snapshot(model["tfidf"], model["mlb"], model["embeddings"], model["df"]))
+        seen.append(store.current["version"])
+    assert len(set(seen)) == len(seen)
+
+
+def test_rebuild_replays_the_journal(store, model):
+    with store.write_lock:
+        updates, (added_id,) = main.add_postings(store.current, make_postings([NEW_ROW]))
+        main.apply_model_updates(updates, journal_entry=("add", NEW_ROW))
+        key = _delete_key(store.current, 5)
+        main.apply_model_updates(main.remove_postings(store.current, [5]), journal_entry=("delete", key))
+    incremental = store.current
+
+    main.install_rebuilt_model(main.build_snapshot(model["tfidf"], model["mlb"], model["embeddings"], model["df"]))
+    rebuilt = store.current
+    assert rebuilt["journal"] == incremental["journal"]
+    assert rebuilt["version"] != incremental["version"]
+    assert not is_alive(rebuilt["index"], 5) and is_alive(rebuilt["index"], added_id)
+    assert "qiskit" in rebuilt["mlb"].classes_
+    for skills in (["qiskit", "python"], ["python", "sql"]):
+        expected = exact_recommendations(incremental, skills, top_k=10, candidates=filter_candidates(incremental["index"]))
+        assert exact_recommendations(rebuilt, skills, top_k=10, candidates=filter_candidates(rebuilt["index"])) == expected
+
+
+def test_journal_entries_absorbed_by_the_corpus_are_dropped(model, postings):
+    state = main.build_snapshot(model["tfidf"], model["mlb"], model["embeddings"], model["df"])
+    deleted_key = _delete_key(state, 7)
+    journal = (("add", NEW_ROW), ("delete", deleted_key), ("delete", ("Gone", "Nowhere", "nothing")))
+    replayed, pending = replay_journal(state, journal)
+    # The unknown posting's delete has nothing to remove
+    assert pending == journal[:2]
+    assert replayed["index"]["size"] == len(postings) + 1
+
+    # The CSV now holds the added posting and no longer the deleted one
+    rows = postings[["Job Title", "Company", "Required Skills"]].to_dict("records")
+    rows = rows[:7] + rows[8:] + [NEW_ROW]
+    corpus = clean_job_frame(pd.DataFrame(rows))
+    mlb = replayed["mlb"]
+    rebuilt = main.build_snapshot(model["tfidf"], mlb, transform_postings(corpus, model["tfidf"], mlb), corpus)
+    again, pending = replay_journal(rebuilt, journal)
+    assert pending == ()
+    assert again["index"]["size"] == len(corpus) and again["index"]["deleted"] == 0
+
+
+def test_reloader_runs_one_more_build_for_triggers_during_a_build():
+    release = threading.Event()
+    builds, installed = [], []
+
+    def build():
+        builds.append(len(builds))
+        release.wait(5)
+        return builds[-1]
+
+    reloader = ModelReloader(build, installed.append)
+    assert reloader.trigger("first")
+    # Both arrive while the first build runs and coalesce into one rerun
+    assert not reloader.trigger("second") and not reloader.trigger("third")
+    release.set()
+    while reloader.running:
+        reloader._thread.join()
+    assert installed == [0, 1]
+    assert reloader.status["state"] == "idle" and reloader.status["reason"] == "queued"
+
+
+def test_reloader_reports_failed_builds():
+    def build():
+        raise RuntimeError("training failed")
+
+    installed = []
+    reloader = ModelReloader(build, installed.append)
+    reloader.trigger("manual")
+    reloader._thread.join()
+    assert installed == []
+    assert reloader.status["state"] == "failed" and reloader.status["error"] == "training failed"
+    # A failed build does not block the next one
+    assert reloader.trigger("retry")
+    reloader._thread.join()
@@ -0,0 +1,12 @@
+import numpy as np
+
+from job_recommendation_model import extract_features
+
+
+def test_parallel_extraction_matches_serial(model, postings):
+    tfidf, mlb, embeddings = extract_features(postings, n_jobs=2)
+    assert tfidf.vocabulary_ == model["tfidf"].vocabulary_
+    np.testing.assert_array_equal(tfidf.idf_, model["tfidf"].idf_)
+    assert list(mlb.classes_) == list(model["mlb"].classes_)
+    for name in ("data", "indices", "indptr"):
+        np.testing.assert_array_equal(getattr(embeddings, name), getattr(model["embeddings"], name))
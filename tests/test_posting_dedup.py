@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from artifact_store import load_mmap_artifacts, save_mmap_artifacts
+from conftest import exact_recommendations
+from job_recommendation_model import clean_job_frame, extract_features
+from lite_runtime import LiteModel, export_lite_model
+from posting_dedup import (
+    DUPLICATE_COLUMN, collapse_chunks, collapse_near_duplicates, minhash_signatures, near_duplicate_groups,
+    plan_chunk_collapse
+)
+
+
+def _frame(rows):
+    return clean_job_frame(pd.DataFrame(rows, columns=["Job Title", "Company", "Required Skills"]))
+
+
+def test_reposts_group_and_distinct_postings_stay_apart():
+    df = _frame([
+        ("Senior Data Engineer", "Acme", "Python, SQL, Spark, Airflow"),
+        ("senior data engineer", "Acme", "SQL, Python, Airflow, Spark"),  # reworded repost
+        ("Frontend Developer", "Acme", "React, CSS, TypeScript"),
+        ("Senior Data Engineer", "Acme", "Python, SQL, Spark, Airflow"),
+    ])
+    labels = near_duplicate_groups(minhash_signatures(df['Job Title'], df['skills_list']))
+    assert labels[0] == labels[1] == labels[3] != labels[2]
+
+    collapsed = collapse_near_duplicates(df)
+    assert list(collapsed['Job Title']) == ["Senior Data Engineer", "Frontend Developer"]
+    assert list(collapsed[DUPLICATE_COLUMN]) == [3, 1]
+
+
+def test_same_posting_at_different_companies_is_kept():
+    df = _frame([
+        ("Data Engineer", "Acme", "Python, SQL"),
+        ("Data Engineer", "Globex", "Python, SQL"),
+        ("Data Engineer", " ACME ", "Python, SQL"),
+    ])
+    collapsed = collapse_near_duplicates(df)
+    assert list(collapsed['Company']) == ["Acme", "Globex"]
+    assert list(collapsed[DUPLICATE_COLUMN]) == [2, 1]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 97, 5000])
+def test_chunked_collapse_matches_in_memory(postings, chunk_size):
+    chunks = [postings.iloc[start:start + chunk_size] for start in range(0, len(postings), chunk_size)]
+    keep, counts = plan_chunk_collapse(chunks)
+    chunked = pd.concat(list(collapse_chunks(chunks, keep, counts)))
+    expected = collapse_near_duplicates(postings)
+    # The synthetic corpus repeats roles within companies
+    assert len(expected) < len(postings)
+    assert list(chunked.index) == list(expected.index)
+    assert list(chunked[DUPLICATE_COLUMN]) == list(expected[DUPLICATE_COLUMN])
+    assert expected[DUPLICATE_COLUMN].sum() == len(postings)
+
+
+def test_recommendations_report_duplicate_counts(postings, profiles, tmp_path):
+    collapsed = collapse_near_duplicates(postings).reset_index(drop=True)
+    tfidf, mlb, embeddings = extract_features(collapsed)
+    model = {"tfidf": tfidf, "mlb": mlb, "embeddings": embeddings, "df": collapsed}
+    save_mmap_artifacts(str(tmp_path / "model"), tfidf, mlb, embeddings, collapsed)
+    export_lite_model(str(tmp_path / "lite"), tfidf, mlb, embeddings, collapsed)
+    mapped, lite = load_mmap_artifacts(str(tmp_path / "model")), LiteModel(str(tmp_path / "lite"))
+
+    counts = collapsed[DUPLICATE_COLUMN].to_numpy()
+    for skills in profiles[:10]:
+        records = exact_recommendations(model, skills, top_k=10)
+        assert [r["Duplicate Count"] for r in records] == counts[[r["Job ID"] for r in records]].tolist()
+        assert exact_recommendations(mapped, skills, top_k=10) == records
+        assert lite.recommend(skills, top_k=10) == records
+
+
+def test_postings_without_counts_stand_for_themselves(model):
+    records = exact_recommendations(model, ["Python"], top_k=5)
+    assert [r["Duplicate Count"] for r in records] == [1] * 5
@@ -0,0 +1,88 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import main
+import query_cache
+from incremental_index import make_postings
+from model_store import ModelStore
+from query_cache import QueryCache, canonical_skills
+
+
+@pytest.fixture
+def cache(model, monkeypatch):
+    """main serving the test model from a fresh store, with an empty cache."""
+    cache = QueryCache(max_entries=16, ttl_seconds=60)
+    monkeypatch.setattr(main, "recommendation_cache", cache)
+    monkeypatch.setattr(main, "model_store", ModelStore())
+    main.install_snapshot(main.build_snapshot(model["tfidf"], model["mlb"], model["embeddings"], model["df"]))
+    yield cache
+    if main.skill_matcher_reloader.running:
+        main.skill_matcher_reloader._thread.join()
+
+
+def _recommend(**fields):
+    return asyncio.run(main.recommend_jobs(main.SkillsRequest(**fields)))
+
+
+def test_canonical_skills():
+    assert canonical_skills([" Python", "sql", "python ", "", "  "]) == ["python", "sql"]
+
+
+def test_equivalent_requests_share_an_entry(cache):
+    first = _recommend(skills=["Python", "SQL"], top_k=5)
+    assert _recommend(skills=["sql ", "python", "Python"], top_k=5) is first
+    # "NY" and "new york" resolve to the same candidates
+    assert _recommend(skills=["python", "sql"], top_k=5, location="NY") is \
+        _recommend(skills=["python", "sql"], top_k=5, location=" New York")
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 2
+
+
+@pytest.mark.parametrize("change", [
+    {"top_k": 6}, {"offset": 5}, {"location": "London"}, {"company": "Company 3"}, {"remote_only": True},
+    {"retrieval": "inverted"}, {"skills": ["python"]},
+])
+def test_request_fields_are_part_of_the_key(cache, change):
+    request = {"skills": ["python", "sql"], "top_k": 5}
+    first = _recommend(**request)
+    assert _recommend(**{**request, **change}) is not first
+    assert cache.stats()["misses"] == 2
+
+
+def test_entries_expire_after_the_ttl(cache, monkeypatch):
+    now = [1000.0]
+    # Only the cache's clock: the event loop keeps the real one
+    monkeypatch.setattr(query_cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    first = _recommend(skills=["python"])
+    now[0] += cache.ttl_seconds - 1
+    assert _recommend(skills=["python"]) is first
+    now[0] += 2
+    assert _recommend(skills=["python"]) is not first
+    assert cache.stats()["size"] == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = QueryCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_model_swaps_invalidate_the_cache(cache):
+    first = _recommend(skills=["python", "qiskit"])
+    version = main.model_store.current["version"]
+    with main.model_store.write_lock:
+        updates, _ = main.add_postings(main.model_store.current, make_postings([
+            {"Job Title": "Quantum Developer", "Company": "Qubit Labs", "Required Skills": "Qiskit, Python"}
+        ]))
+        main.apply_model_updates(updates)
+    assert cache.stats()["size"] == 0
+    assert main.model_store.current["version"] != version
+
+    second = _recommend(skills=["python", "qiskit"])
+    assert second is not first
+    assert second["recommendations"][0]["Job Title"] == "Quantum Developer"
@@ -0,0 +1,39 @@
+from conftest import exact_recommendations
+from job_recommendation_model import clean_user_skills, vectorize_users
+
+
+def _scores(model, skills):
+    user_vec = vectorize_users([clean_user_skills(skills)], model["tfidf"], model["mlb"])
+    return (model["embeddings"] @ user_vec.T).toarray().ravel()
+
+
+def test_score_is_the_rounded_cosine_similarity(model, profiles):
+    for skills in profiles:
+        scores = _scores(model, skills)
+        records = exact_recommendations(model, skills, top_k=10)
+        assert [r["Score"] for r in records] == [round(float(scores[r["Job ID"]]), 4) for r in records]
+        assert [r["Match Score"] for r in records] == [f"{round(float(scores[r['Job ID']]) * 100, 1)}%" for r in records]
+        assert all(isinstance(r["Score"], float) for r in records)
+        assert [r["Score"] for r in records] == sorted((r["Score"] for r in records), reverse=True)
+
+
+def test_missing_skills_are_the_first_three_the_user_lacks(model, profiles):
+    classes = list(model["mlb"].classes_)
+    for skills in profiles:
+        user_has = set(clean_user_skills(skills))
+        for record in exact_recommendations(model, skills, top_k=20):
+            job_skills = model["df"]['skills_list'].iloc[record["Job ID"]]
+            # Skill vocabulary order, not the order the posting lists them in
+            expected = sorted((s for s in job_skills if s not in user_has), key=classes.index)[:3]
+            assert record["Missing Skills"] == expected
+            assert record["Required Skills"] == list(job_skills)
+            assert record["Job Title"] == model["df"]['Job Title'].iloc[record["Job ID"]]
+            assert record["Company"] == model["df"]['Company'].iloc[record["Job ID"]]
+
+
+def test_a_posting_with_every_skill_has_none_missing(model, postings):
+    job_skills = list(postings['skills_list'].iloc[0])
+    records = exact_recommendations(model, job_skills, top_k=50)
+    own = [r for r in records if r["Job ID"] == 0]
+    assert own and own[0]["Missing Skills"] == []
+    assert own[0]["Score"] > 0
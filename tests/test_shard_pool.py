@@ -0,0 +1,55 @@
+import pytest
+
+from artifact_store import load_mmap_artifacts, save_mmap_artifacts
+from conftest import exact_recommendations
+from incremental_index import add_postings, make_postings, remove_postings
+from job_recommendation_model import build_metadata_index, filter_candidates
+from shard_pool import ShardPool, sharded_recommendations
+
+# Generous: only the first requests wait for the spawned shards to warm up
+TIMEOUT = 30.0
+
+
+@pytest.fixture(scope="module")
+def sharded(model, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("shards") / "model")
+    save_mmap_artifacts(path, model["tfidf"], model["mlb"], model["embeddings"], model["df"])
+    artifacts = load_mmap_artifacts(path)
+    pool = ShardPool(n_shards=3)
+    shards = pool.open(path, artifacts)
+    assert shards.wait_ready()
+    state = {**artifacts, "index": build_metadata_index(artifacts["df"])}
+    yield shards, state
+    pool.close()
+
+
+def _check(shards, state, profiles, top_k, offset, **filters):
+    results, total, missing = sharded_recommendations(
+        shards, state, profiles, [top_k] * len(profiles), [offset] * len(profiles), timeout=TIMEOUT, **filters
+    )
+    assert missing == []
+    candidates = filter_candidates(state["index"], **filters)
+    assert total == (state["index"]["size"] if candidates is None else len(candidates))
+    for skills, recommendations in zip(profiles, results):
+        assert recommendations == exact_recommendations(state, skills, top_k=top_k, offset=offset, candidates=candidates)
+
+
+@pytest.mark.parametrize("top_k, offset", [(1, 0), (10, 0), (5, 12)])
+def test_scatter_gather_matches_exact(sharded, profiles, top_k, offset):
+    _check(*sharded, profiles, top_k, offset)
+
+
+def test_scatter_gather_matches_exact_with_filters(sharded, profiles):
+    _check(*sharded, profiles, 10, 0, location="Pune")
+    _check(*sharded, profiles, 10, 0, remote_only=True)
+
+
+def test_scatter_gather_covers_added_and_deleted_postings(sharded, profiles, postings):
+    shards, state = sharded
+    rows = postings[["Job Title", "Company", "Required Skills", "Location"]].iloc[:50].to_dict("records")
+    updates, _ = add_postings(state, make_postings(rows))
+    state = {**state, **updates}
+    # Deletions on both sides of the shard boundaries and in the appended rows
+    state = {**state, **remove_postings(state, list(range(0, state["index"]["size"], 11)))}
+    _check(shards, state, profiles, 10, 0)
+    _check(shards, state, profiles, 10, 0, location="Remote")
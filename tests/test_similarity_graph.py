@@ -0,0 +1,17 @@
+import numpy as np
+import pytest
+
+from compact_embeddings import compact_embeddings
+from similarity_graph import BLOCK_ENTRIES, build_similarity_graph, similar_jobs, similar_postings
+
+
+@pytest.mark.parametrize("block_entries, common_share", [(BLOCK_ENTRIES, 0.01), (1 << 16, 0.01), (1 << 16, 0.2)])
+def test_graph_matches_brute_force(model, block_entries, common_share):
+    graph = build_similarity_graph(model["embeddings"], 10, block_entries, common_share)
+    # The graph scores in float32; brute force over the same values ranks identically
+    embeddings = compact_embeddings(model["embeddings"], "float32")
+    for job_id in range(embeddings.shape[0]):
+        ids, scores = similar_postings(graph, job_id)
+        expected_ids, expected_scores = similar_jobs(None, job_id, embeddings, 10)
+        np.testing.assert_array_equal(ids, expected_ids)
+        np.testing.assert_array_equal(scores, expected_scores)
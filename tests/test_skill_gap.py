@@ -0,0 +1,56 @@
+from collections import Counter, defaultdict
+
+import pytest
+
+import main
+from conftest import exact_recommendations
+from job_recommendation_model import build_metadata_index, clean_user_skills, filter_candidates, get_skill_gap
+from model_store import ModelStore
+
+
+def _naive_skill_gap(model, skills, top_n, candidates=None):
+    """Aggregates the pool record by record, as the frontend used to from /recommend."""
+    pool = [r for r in exact_recommendations(model, skills, top_k=top_n, candidates=candidates) if r["Score"] > 0]
+    user_has = set(clean_user_skills(skills))
+    demand, frequency = defaultdict(float), Counter()
+    scores = {r["Job ID"]: r["Score"] for r in pool}
+    for job_id in scores:
+        for skill in model["df"]['skills_list'].iloc[job_id]:
+            demand[skill] += scores[job_id]
+            frequency[skill] += 1
+    return len(pool), demand, frequency, sum(scores.values()), user_has
+
+
+@pytest.mark.parametrize("top_n", [1, 50, 5000])
+def test_aggregation_matches_the_pool(model, profiles, top_n):
+    for skills in profiles:
+        gap = get_skill_gap(skills, model["tfidf"], model["mlb"], model["embeddings"], top_n=top_n, max_skills=100)
+        pool_size, demand, frequency, total, user_has = _naive_skill_gap(model, skills, top_n)
+        assert gap["pool_size"] == pool_size
+        assert {s["skill"] for s in gap["skills_to_develop"]} == set(frequency) - user_has
+        assert {s["skill"] for s in gap["matched_skills"]} == set(frequency) & user_has
+        for entry in gap["skills_to_develop"] + gap["matched_skills"]:
+            assert entry["frequency"] == frequency[entry["skill"]]
+            assert entry["share"] == round(frequency[entry["skill"]] / pool_size, 4)
+            # Record scores are rounded to 4 places
+            assert entry["priority"] == pytest.approx(demand[entry["skill"]] / total, abs=1e-3)
+        priorities = [s["priority"] for s in gap["skills_to_develop"]]
+        assert priorities == sorted(priorities, reverse=True)
+
+
+def test_unknown_skills_leave_an_empty_pool(model):
+    gap = get_skill_gap(["no such skill"], model["tfidf"], model["mlb"], model["embeddings"])
+    assert gap == {"pool_size": 0, "skills_to_develop": [], "matched_skills": []}
+
+
+def test_endpoint_limits_and_filters_the_pool(model, postings, monkeypatch):
+    monkeypatch.setattr(main, "model_store", ModelStore())
+    main.install_snapshot(main.build_snapshot(model["tfidf"], model["mlb"], model["embeddings"], model["df"]))
+    skills = ["Python", "SQL"]
+    response = main.skill_gap(main.SkillGapRequest(skills=skills, top_n=200, max_skills=3, company="Company 3"))
+
+    candidates = filter_candidates(build_metadata_index(postings), company="Company 3")
+    pool_size, demand, _, _, user_has = _naive_skill_gap(model, skills, 200, candidates)
+    assert response["pool_size"] == pool_size <= len(candidates)
+    assert len(response["skills_to_develop"]) == 3
+    assert response["skills_to_develop"][0]["skill"] == max(set(demand) - user_has, key=demand.get)
@@ -0,0 +1,38 @@
+import main
+from incremental_index import add_postings, make_postings
+from model_store import ModelStore
+from skill_matcher import SKILL, build_skill_matcher
+
+
+def _skills(matcher, text):
+    return [phrase for phrase, kind, _ in matcher.extract(text) if kind & SKILL]
+
+
+def test_extracts_known_skills(model):
+    matcher = build_skill_matcher(model["tfidf"], model["mlb"])
+    assert _skills(matcher, "Built dashboards in  SQL\nand Python; learning JavaScript.") == ["sql", "python", "javascript"]
+
+
+def test_matcher_follows_grown_skill_vocabulary(model, monkeypatch):
+    store = ModelStore()
+    monkeypatch.setattr(main, "model_store", store)
+    main.install_snapshot(main.build_snapshot(model["tfidf"], model["mlb"], model["embeddings"], model["df"]))
+    text = "Experienced with Qiskit and Python"
+    before = store.current
+    assert _skills(before["skill_matcher"], text) == ["python"]
+
+    with store.write_lock:
+        updates, _ = add_postings(before, make_postings([
+            {"Job Title": "Quantum Developer", "Company": "Qubit Labs", "Required Skills": "Qiskit, Python"}
+        ]))
+        main.apply_model_updates(updates)
+    # The automaton is rebuilt in the background; the update itself keeps the old one
+    main.skill_matcher_reloader._thread.join()
+    assert _skills(store.current["skill_matcher"], text) == ["qiskit", "python"]
+    assert _skills(before["skill_matcher"], text) == ["python"]
+
+    # Updates that keep the vocabulary keep the matcher
+    matcher = store.current["skill_matcher"]
+    with store.write_lock:
+        main.apply_model_updates({"pending_updates": 1})
+    assert store.current["skill_matcher"] is matcher and not main.skill_matcher_reloader.running
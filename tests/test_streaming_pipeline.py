@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from artifact_store import load_mmap_artifacts
+from streaming_pipeline import stream_train_to_artifacts
+
+
+@pytest.fixture(scope="module")
+def postings_csv(postings, tmp_path_factory):
+    path = tmp_path_factory.mktemp("csv") / "postings.csv"
+    postings.drop(columns='skills_list').to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize("chunksize", [256, 100_000])
+def test_streaming_matches_in_memory_training(model, postings_csv, tmp_path, chunksize):
+    stream_train_to_artifacts(postings_csv, str(tmp_path / "model"), chunksize=chunksize)
+    streamed = load_mmap_artifacts(str(tmp_path / "model"))
+
+    assert streamed["tfidf"].vocabulary_ == model["tfidf"].vocabulary_
+    np.testing.assert_array_equal(streamed["tfidf"].idf_, model["tfidf"].idf_)
+    assert list(streamed["mlb"].classes_) == list(model["mlb"].classes_)
+    for name in ("data", "indices", "indptr"):
+        np.testing.assert_array_equal(getattr(streamed["embeddings"], name), getattr(model["embeddings"], name))
+
+
+def test_no_postings_after_cleaning(tmp_path):
+    path = tmp_path / "empty.csv"
+    path.write_text("Job Title,Company,Required Skills\n,Acme,\nEngineer,Acme,\n")
+    with pytest.raises(ValueError, match="no postings after cleaning"):
+        stream_train_to_artifacts(str(path), str(tmp_path / "model"))